@@ -0,0 +1,211 @@
+"""
+Deterministic stand-ins for the LLM providers, Spring Initializr and the app-start check,
+so the graph can be benchmarked without network access or a JDK.
+"""
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_function
+
+from src.utils.spring_initializr import skeleton_archive
+
+# Order in which the scripted supervisor dispatches workers
+SCRIPTED_FLOW = ["Initialization", "Testing", "File_reader", "Code_converter", "Controller_Writer"]
+
+SCRIPTED_JAVA = (
+    "// CONTROLLER\n@PostMapping(\"/save\")\npublic String save() {\n    return service.save();\n}\n"
+    "// SERVICE\npublic String save() {\n    return \"ok\";\n}\n"
+    "// REPOSITORY\n"
+)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that answers from a fixed script instead of a provider:
+
+    - with bound functions (the supervisor), it routes to the next member of SCRIPTED_FLOW
+      that is in the graph and has not reported yet, then FINISH;
+    - with bound tools (a worker agent), it first calls the agent's tool with scripted
+      arguments, then answers with a summary of the tool output;
+    - otherwise (per-method conversion), it returns a fixed Java snippet.
+
+    Args:
+        latency (float): Seconds to sleep per call, to model provider latency.
+        base_dir (str): Project directory used in the scripted tool arguments.
+    """
+
+    latency: float = 0.0
+    base_dir: str = "./generated_spring_app"
+    members: List[str] = SCRIPTED_FLOW
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_functions(self, functions, function_call=None, **kwargs):
+        return self.bind(
+            functions=[convert_to_openai_function(f) for f in functions], **kwargs
+        )
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=tools, **kwargs)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if kwargs.get("functions"):
+            message = self._route(messages)
+        elif kwargs.get("tools"):
+            message = self._act(messages, kwargs["tools"][0]["function"]["name"])
+        else:
+            message = AIMessage(content=SCRIPTED_JAVA)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _route(self, messages):
+        reported = {m.name for m in messages if isinstance(m, HumanMessage) and m.name}
+        next_member = next(
+            (m for m in SCRIPTED_FLOW if m in self.members and m not in reported),
+            "FINISH",
+        )
+        return AIMessage(
+            content="",
+            additional_kwargs={
+                "function_call": {
+                    "name": "route",
+                    "arguments": json.dumps({"next": next_member}),
+                }
+            },
+        )
+
+    def _act(self, messages, tool_name):
+        if isinstance(messages[-1], ToolMessage):
+            return AIMessage(content=f"{tool_name} finished: {str(messages[-1].content)[:200]}")
+        task = next(m for m in messages if isinstance(m, HumanMessage))
+        php_file = str(task.content).split("`")[-2] if "`" in str(task.content) else ""
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {
+                    "name": tool_name,
+                    "args": self._tool_args(tool_name, php_file, messages),
+                    "id": f"call_{self.calls}",
+                }
+            ],
+        )
+
+    def _tool_args(self, tool_name, php_file, messages=()):
+        if tool_name == "initialize_spring_boot_app":
+            return {
+                "group_id": "com.example",
+                "artifact_id": "myapp",
+                "name": "MyApp",
+                "description": "Migrated application",
+                "package_name": "com.example.myapp",
+                "dependencies": "web,data-jpa",
+                "java_version": "17",
+                "type": "maven-project",
+                "language": "java",
+                "boot_version": "3.3.3",
+                "packaging": "jar",
+                "base_dir": self.base_dir,
+            }
+        if tool_name == "spring_boot_code_exists_test":
+            return {"project_path": os.path.join(self.base_dir, "myapp")}
+        if tool_name == "read_file_content":
+            return {"file_path": php_file}
+        if tool_name == "write_java_files":
+            # Like the real writer: the handles of the converted classes, when there are any
+            converted = [m for m in messages if getattr(m, "name", None) == "Code_converter"]
+            handles = re.findall(
+                r"^File: (\S+)\nContent: (artifact:\w+)$",
+                str(converted[-1].content) if converted else "",
+                re.M,
+            )
+            if handles:
+                return {
+                    "files": {
+                        os.path.join(self.base_dir, "myapp", path): handle
+                        for path, handle in handles
+                    }
+                }
+            package_dir = os.path.join(self.base_dir, "myapp/src/main/java/com/example/myapp")
+            return {
+                "files": {
+                    os.path.join(package_dir, "controller/ScriptedController.java"):
+                        "package com.example.myapp.controller;\n\npublic class ScriptedController {\n}\n",
+                    os.path.join(package_dir, "service/ScriptedService.java"):
+                        "package com.example.myapp.service;\n\npublic class ScriptedService {\n}\n",
+                }
+            }
+        if tool_name == "write_controller_code":
+            return {
+                "file_path": os.path.join(
+                    self.base_dir,
+                    "myapp/src/main/java/com/example/myapp/controller/ScriptedController.java",
+                ),
+                "java_code": "package com.example.myapp.controller;\n\npublic class ScriptedController {\n}\n",
+            }
+        return {}
+
+
+def fake_fetch_template(latency: float = 0.0):
+    """Stand-in for `fetch_template`: a generated skeleton instead of start.spring.io."""
+    directory = tempfile.mkdtemp(prefix="templates-")
+
+    def fetch_template(params, offline=False):
+        if latency:
+            time.sleep(latency)
+        path = os.path.join(directory, f"{params['artifactId']}.zip")
+        if not os.path.exists(path):
+            with open(path, "wb") as file:
+                file.write(skeleton_archive(params))
+        return path
+
+    return fetch_template
+
+
+def fake_afetch_template(latency: float = 0.0):
+    """Stand-in for `afetch_template`, the async variant of fake_fetch_template."""
+    fetch_template = fake_fetch_template()
+
+    async def afetch_template(params, offline=False):
+        if latency:
+            await asyncio.sleep(latency)
+        return fetch_template(params)
+
+    return afetch_template
+
+
+def fake_verify_project(latency: float = 0.0):
+    """Stand-in for `verify_project`: reports a successful start after `latency` seconds."""
+
+    def verify_project(project_path, deadline_seconds=None):
+        if latency:
+            time.sleep(latency)
+        return {
+            "compiled": True,
+            "changed_files": [],
+            "compile_errors": [],
+            "app_starts": True,
+            "timed_out": False,
+            "log_tail": ["Started MyAppApplication in 0.1 seconds"],
+            "seconds": latency,
+        }
+
+    return verify_project
@@ -0,0 +1,234 @@
+"""
+Offline benchmark of the migration graph with a scripted chat model and local stand-ins
+for Spring Initializr and the app-start check.
+
+Reports per-node latency, supervisor overhead, steps per migration, message and state
+size growth, and throughput under N concurrent runs, in threads and on one event loop.
+Every run has a workspace of its own, like the threads of the server. Graph overhead is
+what remains when the model and tools take no time, so regressions show up without live
+providers.
+
+Usage:
+    python -m benchmarks.offline --runs 20 --concurrency 4 --llm-latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest import mock
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.load import dumps
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import (  # noqa: E402
+    ScriptedChatModel,
+    fake_afetch_template,
+    fake_fetch_template,
+    fake_verify_project,
+)
+from constants import DEFAULT_BASE_DIR  # noqa: E402
+from src import agent  # noqa: E402
+from src.utils import conversion, nodes, tools  # noqa: E402
+
+PHP_FILE = os.path.join(ROOT, "src", "ApsAdminCompliaceController.php")
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Wall time of every graph node run, keyed by node name."""
+
+    def __init__(self):
+        self.started = {}
+        self.durations = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self.started[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if run_id in self.started:
+            node, start = self.started.pop(run_id)
+            self.durations[node].append(time.perf_counter() - start)
+
+
+@contextmanager
+def offline_environment(model: ScriptedChatModel, tool_latency: float):
+    with mock.patch.object(nodes, "get_model", lambda *args, **kwargs: model), mock.patch.object(
+        conversion, "get_model", lambda *args, **kwargs: model
+    ), mock.patch.object(
+        tools, "fetch_template", fake_fetch_template(tool_latency)
+    ), mock.patch.object(
+        tools, "afetch_template", fake_afetch_template(tool_latency)
+    ), mock.patch.object(
+        tools, "verify_project", fake_verify_project(tool_latency)
+    ):
+        nodes._get_supervisor_chain.cache_clear()
+        try:
+            yield
+        finally:
+            nodes._get_supervisor_chain.cache_clear()
+
+
+def _run_config(workdir, thread_id, timer):
+    # The scripted tool calls name DEFAULT_BASE_DIR, which is mapped into the run's workspace
+    return {
+        "callbacks": [timer],
+        "configurable": {
+            "thread_id": thread_id,
+            "workspace": os.path.join(workdir, "workspaces", thread_id),
+        },
+    }
+
+
+def _growth(state):
+    return {
+        "messages": len(state.get("messages", [])),
+        "message_chars": sum(len(str(m.content)) for m in state.get("messages", [])),
+        "state_bytes": len(dumps(state)),
+    }
+
+
+def _run_report(start, timer, state, growth):
+    return {
+        "seconds": time.perf_counter() - start,
+        "nodes": timer.durations,
+        "steps": sum(len(d) for d in timer.durations.values()),
+        "fast_path_hits": state.get("fast_path_hits", 0),
+        "growth": growth,
+    }
+
+
+def run_once(graph, workdir, thread_id):
+    timer = NodeTimer()
+    config = _run_config(workdir, thread_id, timer)
+    growth = []
+    start = time.perf_counter()
+    request = agent.migration_request(PHP_FILE, DEFAULT_BASE_DIR)
+    for state in graph.stream(request, config, stream_mode="values"):
+        growth.append(_growth(state))
+    return _run_report(start, timer, state, growth)
+
+
+async def arun_once(graph, workdir, thread_id):
+    timer = NodeTimer()
+    config = _run_config(workdir, thread_id, timer)
+    growth = []
+    start = time.perf_counter()
+    request = agent.migration_request(PHP_FILE, DEFAULT_BASE_DIR)
+    async for state in graph.astream(request, config, stream_mode="values"):
+        growth.append(_growth(state))
+    return _run_report(start, timer, state, growth)
+
+
+async def _arun_concurrently(graph, workdir, runs, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(i):
+        async with semaphore:
+            return await arun_once(graph, workdir, f"async-{i}")
+
+    return await asyncio.gather(*(run(i) for i in range(runs)))
+
+
+def _ms(samples):
+    return round(statistics.median(samples) * 1000, 2) if samples else None
+
+
+def benchmark(runs, concurrency, llm_latency, tool_latency, fast_path):
+    workdir = tempfile.mkdtemp(prefix="offline-bench-")
+    model = ScriptedChatModel(
+        latency=llm_latency, base_dir=DEFAULT_BASE_DIR, members=agent.DEFAULT_CONFIG["members"]
+    )
+    config = {
+        "checkpoint_db": os.path.join(workdir, "checkpoints.sqlite"),
+        "routing_rules": agent.DEFAULT_RULES if fast_path else [],
+    }
+    cwd = os.getcwd()
+    # Keeps relative paths (workspace template pool, caches) inside the scratch directory
+    os.chdir(workdir)
+    try:
+        with offline_environment(model, tool_latency):
+            graph = agent.build_graph(config)
+            single = [run_once(graph, workdir, f"single-{i}") for i in range(runs)]
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(
+                    executor.map(
+                        lambda i: run_once(graph, workdir, f"concurrent-{i}"), range(runs)
+                    )
+                )
+            concurrent_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            async_runs = asyncio.run(_arun_concurrently(graph, workdir, runs, concurrency))
+            async_seconds = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+    node_samples = defaultdict(list)
+    for run in single:
+        for node, durations in run["nodes"].items():
+            node_samples[node].extend(durations)
+    supervisor_ms = [sum(run["nodes"].get("supervisor", [])) for run in single]
+    total_ms = [run["seconds"] for run in single]
+    return {
+        "runs": runs,
+        "concurrency": concurrency,
+        "llm_latency": llm_latency,
+        "tool_latency": tool_latency,
+        "fast_path": fast_path,
+        "run_median_ms": _ms(total_ms),
+        "node_median_ms": {node: _ms(samples) for node, samples in sorted(node_samples.items())},
+        "supervisor_share": round(sum(supervisor_ms) / sum(total_ms), 3),
+        "steps_per_migration": statistics.median(run["steps"] for run in single),
+        "llm_calls_per_migration": model.calls / (3 * runs),
+        "fast_path_hits_per_migration": statistics.median(run["fast_path_hits"] for run in single),
+        "state_growth": single[0]["growth"],
+        "throughput_runs_per_s": round(runs / concurrent_seconds, 2),
+        "async_steps_per_migration": statistics.median(run["steps"] for run in async_runs),
+        "async_throughput_runs_per_s": round(runs / async_seconds, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per model call")
+    parser.add_argument("--tool-latency", type=float, default=0.0, help="Seconds per stand-in tool call")
+    parser.add_argument("--no-fast-path", action="store_true", help="Route every step through the LLM")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = benchmark(
+        args.runs, args.concurrency, args.llm_latency, args.tool_latency, not args.no_fast_path
+    )
+    for key, value in report.items():
+        if key == "state_growth":
+            print("state growth (step: messages / message chars / state bytes):")
+            for step, size in enumerate(value):
+                print(f"  {step:>3}: {size['messages']} / {size['message_chars']} / {size['state_bytes']}")
+        elif key == "node_median_ms":
+            print("node median ms:")
+            for node, ms in value.items():
+                print(f"  {node:<18} {ms}")
+        else:
+            print(f"{key}: {value}")
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Startup benchmark: cold import of `src.agent` and graph compile time.
+
+Every LangGraph server worker restart pays for both, so neither should touch the
+network or instantiate model clients.
+
+Usage:
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_IMPORT = """
+import time
+start = time.perf_counter()
+import src.agent
+imported = time.perf_counter()
+src.agent.build_graph()
+compiled = time.perf_counter()
+print(imported - start, compiled - imported)
+"""
+
+
+def _summary(samples):
+    return (
+        f"median={statistics.median(samples) * 1000:.1f}ms"
+        f" min={min(samples) * 1000:.1f}ms max={max(samples) * 1000:.1f}ms"
+    )
+
+
+def cold_start(runs: int):
+    """Run the import + compile in a fresh interpreter `runs` times."""
+    import_times, compile_times = [], []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_IMPORT],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+        import_times.append(float(output[-2]))
+        compile_times.append(float(output[-1]))
+    return import_times, compile_times
+
+
+def warm_compile(runs: int):
+    """Compile the graph repeatedly in this interpreter, with imports already paid for."""
+    sys.path.insert(0, ROOT)
+    from src.agent import build_graph
+
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        build_graph()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    import_times, compile_times = cold_start(args.runs)
+    print(f"cold import   {_summary(import_times)}")
+    print(f"cold compile  {_summary(compile_times)}")
+    print(f"warm compile  {_summary(warm_compile(args.runs))}")
+
+
+if __name__ == "__main__":
+    main()
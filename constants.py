@@ -1,12 +1,126 @@
+import os
 from typing import Literal
 
+from dotenv import load_dotenv
+
+# The settings below are read from the environment at import, so a .env file is loaded first
+load_dotenv()
+
 MEMBERS = [
     "Initialization",
     "Testing",
     "File_reader",
-    # "Code_converter",
+    "Code_converter",
     "Controller_Writer",
 ]
 OPTIONS = ["FINISH"] + MEMBERS
 
 LLM_PLATFORM: Literal["openai", "ollama", "groq"] = "groq"
+
+# Model used when a spec only names the provider, see src/utils/models.py
+DEFAULT_MODELS = {
+    "openai": "gpt-4o",
+    "groq": "llama-3.1-70b-versatile",
+    "ollama": "llama3.1",
+}
+# Per-agent models as "Member=provider[:model]" (or "Member=tier") pairs separated by commas,
+# e.g. "supervisor=groq:llama-3.1-8b-instant,Code_converter=openai:gpt-4o";
+# agents not listed use their tier from AGENT_TIERS, or LLM_PLATFORM
+AGENT_MODELS = dict(
+    pair.strip().split("=", 1) for pair in os.getenv("AGENT_MODELS", "").split(",") if pair.strip()
+)
+# Model tiers: a spec naming a tier resolves to its models in order, each one a fallback
+# for the previous when it is rate limited or slower than the tier's latency threshold
+# (seconds); providers without an API key in the environment are skipped. ChatOllama has
+# no function calling for the supervisor, so it is only usable for agents, e.g. in a custom tier
+MODEL_TIERS = {
+    "small": ["groq:llama-3.1-8b-instant", "openai:gpt-4o-mini"],
+    "large": ["groq:llama-3.1-70b-versatile", "openai:gpt-4o"],
+}
+TIER_LATENCY_THRESHOLDS = {"small": 15, "large": 120}
+# Tier of each agent when AGENT_MODELS doesn't name a model for it: routing and simple
+# tool calls go to the small tier, code generation to the large one
+AGENT_TIERS = {
+    "supervisor": "small",
+    "Initialization": "small",
+    "Testing": "small",
+    "File_reader": "small",
+    "Code_converter": "large",
+    "Controller_Writer": "large",
+}
+# Keep-alive connection pool shared by all models of a provider
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", 120))
+
+RECURSION_LIMIT = 20
+
+# Supervisor loop guard, see src/utils/loop_guard.py: a worker whose last STALL_REPEATS runs
+# gave identical results, or a cycle of steps repeated LOOP_CYCLE_REPEATS times, isn't run again
+STALL_REPEATS = 2
+LOOP_CYCLE_REPEATS = 3
+
+# SQLite checkpoints used to resume interrupted runs, set to an empty string to disable them
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", ".cache/checkpoints.sqlite")
+
+# Batch runs skip PHP files whose source, dependencies, prompts and models are unchanged
+# since their last successful migration, see src/utils/incremental.py
+INCREMENTAL_MANIFEST = os.getenv("INCREMENTAL_MANIFEST", ".cache/incremental_manifest.json")
+
+# Requests per second allowed per provider, across all concurrent runs (None = unlimited)
+RATE_LIMITS = {"groq": 0.5, "openai": 5, "ollama": None}
+
+# On-disk LLM response cache, set LLM_CACHE_PATH to an empty string to disable it
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite")
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Symbol indexes of the PHP projects queried by the agents' lookup tools, one JSON file per project
+PHP_INDEX_DIR = os.getenv("PHP_INDEX_DIR", ".cache/php_index")
+
+# Content-addressed store for bulky payloads; messages and state only carry their handles
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", ".cache/artifacts")
+
+# Message history compaction, see compact_messages in src/utils/state.py (~4 chars per token)
+MESSAGE_TOKEN_BUDGET = int(os.getenv("MESSAGE_TOKEN_BUDGET", 12000))
+BULKY_MESSAGE_TOKENS = 500
+KEEP_RECENT_MESSAGES = 2
+
+# Per-thread workspaces: graph threads without a configured "workspace" each get their own
+# directory under WORKSPACE_ROOT (empty disables them), see src/utils/workspace.py. Agent paths
+# under DEFAULT_BASE_DIR are mapped into it. At most WORKSPACE_MAX_ACTIVE exist at once, each
+# limited to WORKSPACE_MAX_BYTES (build output not counted); those unused for
+# WORKSPACE_TTL_SECONDS are removed, and when all are taken the least recently used one idle
+# for WORKSPACE_IDLE_SECONDS makes room. WORKSPACE_POOL_SIZE extracted project templates
+# are kept ready per template
+DEFAULT_BASE_DIR = "./generated_spring_app"
+WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", "./workspaces")
+WORKSPACE_MAX_ACTIVE = int(os.getenv("WORKSPACE_MAX_ACTIVE", 16))
+WORKSPACE_MAX_BYTES = int(os.getenv("WORKSPACE_MAX_BYTES", 1024 * 1024 * 1024))
+WORKSPACE_TTL_SECONDS = float(os.getenv("WORKSPACE_TTL_SECONDS", 24 * 3600))
+WORKSPACE_IDLE_SECONDS = float(os.getenv("WORKSPACE_IDLE_SECONDS", 15 * 60))
+WORKSPACE_POOL_SIZE = int(os.getenv("WORKSPACE_POOL_SIZE", 2))
+
+# Spring Initializr: point the URL at `python -m src.utils.spring_initializr` for a local
+# stand-in; offline mode only uses templates already in the cache
+SPRING_INITIALIZR_URL = os.getenv("SPRING_INITIALIZR_URL", "https://start.spring.io/starter.zip")
+SPRING_TEMPLATE_CACHE_DIR = os.getenv("SPRING_TEMPLATE_CACHE_DIR", ".cache/spring_templates")
+SPRING_INITIALIZR_OFFLINE = os.getenv("SPRING_INITIALIZR_OFFLINE", "") not in ("", "0", "false")
+
+# App verification: deadline for one compile + start check, and Maven settings used to
+# resolve the classpath (offline reuses an already populated ~/.m2 or MAVEN_REPO_LOCAL)
+VERIFY_DEADLINE_SECONDS = float(os.getenv("VERIFY_DEADLINE_SECONDS", 180))
+MAVEN_OFFLINE = os.getenv("MAVEN_OFFLINE", "") not in ("", "0", "false")
+MAVEN_REPO_LOCAL = os.getenv("MAVEN_REPO_LOCAL", "")
+# Last lines of the app's log (stdout and stderr interleaved) the app-start check returns
+APP_LOG_TAIL_LINES = int(os.getenv("APP_LOG_TAIL_LINES", 20))
+# Structural check and batch javac run on files as soon as a write tool writes them
+VALIDATE_DEADLINE_SECONDS = float(os.getenv("VALIDATE_DEADLINE_SECONDS", 30))
+
+# Code_converter: PHP methods converted concurrently, and the package of the generated classes
+CONVERSION_CONCURRENCY = int(os.getenv("CONVERSION_CONCURRENCY", 4))
+JAVA_BASE_PACKAGE = os.getenv("JAVA_BASE_PACKAGE", "com.example.myapp")
+
+# Observability: JSON-lines span log (empty disables it), Prometheus text file written at the
+# end of CLI and batch runs, and an optional port serving /metrics while they run
+TRACE_PATH = os.getenv("TRACE_PATH", "")
+METRICS_PATH = os.getenv("METRICS_PATH", "metrics.prom")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
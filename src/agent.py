@@ -1,143 +1,320 @@
-from dotenv import load_dotenv
-
-load_dotenv()
+import argparse
 import functools
+import hashlib
+import json
+import logging
+import uuid
+from functools import lru_cache
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph, START
 from src.utils.nodes import (
-    _get_model,
+    LazyAgent,
+    aagent_node,
     agent_node,
-    create_agent,
-    update_application_structure,
+    asupervisor_node,
+    supervisor_node,
+)
+from src.utils.checkpointer import SqliteCheckpointSaver
+from src.utils.conversion import (
+    UNIT_INSTRUCTIONS,
+    acode_converter_node,
+    code_converter_node,
 )
+from src.utils.llm_cache import get_llm_cache
+from src.utils.metrics import METRICS, atimed_node, timed_node
+from src.utils.models import warm_models
+from src.utils.prompt import system_prompt as supervisor_system_prompt
+from src.utils.router import DEFAULT_RULES, next_members
 from src.utils.state import AgentState
+from src.utils.streaming import StreamingFileWriter, TokenPrinter
 from src.utils.tools import (
+    PHP_INDEX_TOOLS,
     initialize_spring_boot_app,
+    read_artifact,
     read_file_content,
     spring_boot_code_exists_test,
     write_controller_code,
-    default_tool,
-    # tavily_tool,
+    write_java_files,
+    # get_tavily_tool,
+)
+from constants import (
+    AGENT_MODELS,
+    AGENT_TIERS,
+    CHECKPOINT_DB,
+    DEFAULT_BASE_DIR,
+    JAVA_BASE_PACKAGE,
+    LLM_PLATFORM,
+    MEMBERS,
+    METRICS_PATH,
+    METRICS_PORT,
+    MODEL_TIERS,
+    RECURSION_LIMIT,
 )
-from src.utils.function_definition import function_def
-from src.utils.prompt import supervisor_prompt
-from constants import LLM_PLATFORM, MEMBERS
-from langchain_core.output_parsers.openai_functions import JsonOutputFunctionsParser
 from langchain_core.messages import HumanMessage
 
 
-model = _get_model(LLM_PLATFORM)
+# Worker name -> (system prompt, tools). Agents are only built when a node first runs.
+# NOTE: THIS PERFORMS ARBITRARY CODE EXECUTION. PROCEED WITH CAUTION
+WORKERS = {
+    "Initialization": (
+        "You are an expert in initializing Spring Boot applications. Your task is to set up the application"
+        " with the provided parameters and ensure it is generated correctly.",
+        [initialize_spring_boot_app],
+    ),
+    "Testing": (
+        "You are an expert in testing Spring Boot applications. Your task is to perform"
+        " tests on the initialized application and ensure everything is functioning as expected.",
+        [spring_boot_code_exists_test],
+    ),
+    "File_reader": (
+        "You are an expert in reading and analyzing PHP code. Your task is to read the PHP file from the specified path and extract its entire content as text."
+        " The extracted code will then be used for transformation or migration to a different language or framework."
+        " Please ensure that the content is read accurately, preserving all code details, comments, and structure."
+        " When only part of the code is needed, or the file belongs to a larger project, use the PHP index tools"
+        " instead: outline the file, then fetch just the methods, callers, routes or SQL statements you need.",
+        [read_file_content, *PHP_INDEX_TOOLS],
+    ),
+    # Converts the PHP file method by method, see src/utils/conversion.py
+    "Code_converter": (
+        "You are an expert in code transformation and migration, particularly in converting"
+        " PHP applications to Spring Boot. Your task is to read the PHP file from the specified"
+        " path and convert it into a fully functional Spring Boot application."
+        " The converted application should follow Spring Boot best practices, including"
+        " the use of appropriate annotations, configuration, and structuring. Ensure that all"
+        " functionalities, endpoints, and business logic present in the PHP code are accurately"
+        " replicated in the Spring Boot application. Additionally, handle any necessary"
+        " dependency injections, database migrations, and security configurations required"
+        " for a smooth transition from PHP to Spring Boot. After completing the conversion,"
+        " output the transformed code in the appropriate Java classes, preserving the application's"
+        " functionality and improving maintainability.",
+        [],
+    ),
+    # Define the agent for writing the controller code
+    "Controller_Writer": (
+        "You are an expert in code transformation and migration, particularly in converting"
+        " PHP applications to Spring Boot"
+        " You are an expert in generating and writing Spring Boot controller code. Generate"
+        " the controller code based on the provided inputs and write it to the specified file."
+        " When Code_converter already produced the Java classes, write all of them unchanged"
+        " to their files under the project directory with a single write_java_files call,"
+        " passing each class's artifact handle as its content."
+        " Use read_artifact to see the content behind a handle when you need it.",
+        [write_java_files, write_controller_code, read_artifact],
+    ),
+}
+
+# Workers whose write tool calls are streamed to disk while being generated
+STREAMING_WRITERS = {
+    "Controller_Writer": [
+        StreamingFileWriter("write_controller_code"),
+        StreamingFileWriter("write_java_files", files_key="files"),
+    ]
+}
+
+DEFAULT_CONFIG = {
+    "llm_platform": LLM_PLATFORM,
+    # Member (or "supervisor") -> "provider[:model]" or tier; members not listed
+    # use their tier from agent_tiers, then llm_platform
+    "agent_models": AGENT_MODELS,
+    "agent_tiers": AGENT_TIERS,
+    "members": MEMBERS,
+    # Fast-path routing rules tried before the LLM supervisor, see src/utils/router.py
+    "routing_rules": DEFAULT_RULES,
+    # SQLite file for checkpoints; an empty string compiles the graph without a checkpointer
+    "checkpoint_db": CHECKPOINT_DB,
+}
+
+
+@lru_cache(maxsize=4)
+def get_checkpointer(path: str) -> SqliteCheckpointSaver:
+    return SqliteCheckpointSaver(path)
+
+
+def model_specs(config: dict) -> dict:
+    """Model spec of every node in the graph, keyed by node name."""
+    return {
+        name: config["agent_models"].get(name)
+        or config["agent_tiers"].get(name)
+        or config["llm_platform"]
+        for name in [*config["members"], "supervisor"]
+    }
 
-supervisor_node = (
-    supervisor_prompt
-    | model.bind_functions(
-        functions=[function_def],
+
+def pipeline_versions(config: dict = None) -> dict:
+    """
+    Prompt and model versions the generated code depends on, recorded by incremental
+    batches (see src/utils/incremental.py) so a prompt or model change re-migrates everything.
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    prompts = [WORKERS[member][0] for member in sorted(WORKERS)]
+    prompts += [supervisor_system_prompt, UNIT_INSTRUCTIONS, JAVA_BASE_PACKAGE]
+    return {
+        "prompt_version": hashlib.sha256(json.dumps(prompts).encode("utf-8")).hexdigest()[:16],
+        "models": {
+            name: MODEL_TIERS.get(spec, spec) for name, spec in model_specs(config).items()
+        },
+    }
+
+
+def _worker_node(member: str, model_spec: str):
+    system_prompt, tools = WORKERS[member]
+    if member == "Code_converter":
+        node, anode = code_converter_node, acode_converter_node
+        node_kwargs = {"model_spec": model_spec, "system_prompt": system_prompt}
+    else:
+        node, anode = agent_node, aagent_node
+        node_kwargs = {
+            "agent": LazyAgent(model_spec, system_prompt, tools),
+            "name": member,
+            "callbacks": STREAMING_WRITERS.get(member, ()),
+        }
+    return RunnableLambda(
+        timed_node(member, functools.partial(node, **node_kwargs)),
+        afunc=atimed_node(member, functools.partial(anode, **node_kwargs)),
     )
-    | JsonOutputFunctionsParser()
-)
 
-# NOTE: THIS PERFORMS ARBITRARY CODE EXECUTION. PROCEED WITH CAUTION
-initialization_agent = create_agent(
-    LLM_PLATFORM,
-    "You are an expert in initializing Spring Boot applications. Your task is to set up the application"
-    " with the provided parameters and ensure it is generated correctly.",
-    [initialize_spring_boot_app],
-)
-initialization_node = functools.partial(
-    agent_node, agent=initialization_agent, name="Initialization"
-)
 
-testing_agent = create_agent(
-    LLM_PLATFORM,
-    "You are an expert in testing Spring Boot applications. Your task is to perform"
-    " tests on the initialized application and ensure everything is functioning as expected.",
-    [spring_boot_code_exists_test],
-)
-testing_node = functools.partial(agent_node, agent=testing_agent, name="Testing")
+def build_graph(config: dict = None):
+    """
+    Build and compile the migration graph.
 
-file_reader_agent = create_agent(
-    LLM_PLATFORM,
-    "You are an expert in reading and analyzing PHP code. Your task is to read the PHP file from the specified path and extract its entire content as text."
-    " The extracted code will then be used for transformation or migration to a different language or framework."
-    " Please ensure that the content is read accurately, preserving all code details, comments, and structure.",
-    [read_file_content],
-)
-file_reader_node = functools.partial(
-    agent_node, agent=file_reader_agent, name="File_reader"
-)
+    Args:
+        config (dict): Overrides for `DEFAULT_CONFIG`. A RunnableConfig is accepted too,
+            in which case its "configurable" section is used.
 
-Code_converter_agent = create_agent(
-    LLM_PLATFORM,
-    "You are an expert in code transformation and migration, particularly in converting"
-    " PHP applications to Spring Boot. Your task is to read the PHP file from the specified"
-    " path and convert it into a fully functional Spring Boot application."
-    " The converted application should follow Spring Boot best practices, including"
-    " the use of appropriate annotations, configuration, and structuring. Ensure that all"
-    " functionalities, endpoints, and business logic present in the PHP code are accurately"
-    " replicated in the Spring Boot application. Additionally, handle any necessary"
-    " dependency injections, database migrations, and security configurations required"
-    " for a smooth transition from PHP to Spring Boot. After completing the conversion,"
-    " output the transformed code in the appropriate Java classes, preserving the application's"
-    " functionality and improving maintainability.",
-    tools=[default_tool],
-)
+    Returns:
+        CompiledGraph: The compiled graph. No model client is created until a node runs.
+    """
+    config = config or {}
+    config = {**DEFAULT_CONFIG, **config.get("configurable", config)}
+    members = config["members"]
+    specs = model_specs(config)
 
-Code_converter_node = functools.partial(
-    agent_node,
-    agent=Code_converter_agent,
-    name="Code_converter",
-    # output_parser=JavaCodeOutputParser(),
-)
+    # Every node has a sync and an async implementation, so the same graph serves
+    # graph.invoke/stream and graph.ainvoke/astream without blocking the event loop
+    workflow = StateGraph(AgentState)
+    for member in members:
+        workflow.add_node(member, _worker_node(member, specs[member]))
+    supervisor_kwargs = {
+        "model_spec": specs["supervisor"],
+        "members": members,
+        "rules": config["routing_rules"] or (),
+    }
+    workflow.add_node(
+        "supervisor",
+        RunnableLambda(
+            timed_node("supervisor", functools.partial(supervisor_node, **supervisor_kwargs)),
+            afunc=atimed_node(
+                "supervisor", functools.partial(asupervisor_node, **supervisor_kwargs)
+            ),
+        ),
+    )
 
+    for member in members:
+        # We want our workers to ALWAYS "report back" to the supervisor when done
+        workflow.add_edge(member, "supervisor")
+    # The supervisor populates the "next" field in the graph state
+    # which routes to one or several nodes (run in parallel) or finishes
+    conditional_map = {k: k for k in members}
+    conditional_map["FINISH"] = END
+    workflow.add_conditional_edges("supervisor", next_members, conditional_map)
+    # Finally, add entrypoint
+    workflow.add_edge(START, "supervisor")
 
-# Define the agent for writing the controller code
-controller_writer_agent = create_agent(
-    LLM_PLATFORM,
-    "You are an expert in code transformation and migration, particularly in converting"
-    " PHP applications to Spring Boot"
-    " You are an expert in generating and writing Spring Boot controller code. Generate"
-    " the controller code based on the provided inputs and write it to the specified file.",
-    [write_controller_code],
-)
+    checkpoint_db = config["checkpoint_db"]
+    return workflow.compile(
+        checkpointer=get_checkpointer(checkpoint_db) if checkpoint_db else None
+    )
+
+
+@lru_cache(maxsize=1)
+def get_graph():
+    return build_graph()
 
-controller_writer_node = functools.partial(
-    agent_node,
-    agent=controller_writer_agent,
-    name="Controller_Writer",
-)
 
-workflow = StateGraph(AgentState)
-workflow.add_node("Initialization", initialization_node)
-workflow.add_node("Testing", testing_node)
-workflow.add_node("File_reader", file_reader_node)
-workflow.add_node("Controller_Writer", controller_writer_node)
-workflow.add_node("supervisor", supervisor_node)
-
-for member in MEMBERS:
-    # We want our workers to ALWAYS "report back" to the supervisor when done
-    workflow.add_edge(member, "supervisor")
-# The supervisor populates the "next" field in the graph state
-# which routes to a node or finishes
-conditional_map = {k: k for k in MEMBERS}
-conditional_map["FINISH"] = END
-workflow.add_conditional_edges("supervisor", lambda x: x["next"], conditional_map)
-# Finally, add entrypoint
-workflow.add_edge(START, "supervisor")
-
-graph = workflow.compile()
-
-for s in graph.stream(
-    {
+def __getattr__(name):
+    # `graph` is what langgraph.json exports; build it on first access instead of at import
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def migration_request(php_file: str, base_dir: str) -> dict:
+    """Initial graph input for migrating one PHP file into the project under `base_dir`."""
+    return {
         "messages": [
             HumanMessage(
-                content=f"Initialize spring boot application, the base directory is ./generate_spring_app."
-                " write controller, services, repositories. file path of PHP `/Users/aj/development/python/langgraph-example/src/ApsAdminCompliaceController.php`"
+                content=f"Initialize spring boot application, the base directory is {base_dir}."
+                f" write controller, services, repositories. file path of PHP `{php_file}`"
             )
         ]
-    },
-    {"recursion_limit": 20},
-):
-    # if "__end__" not in s:
-    print(s)
-    print("----")
-
-# /deps/langgraph-example/src/ApsAdminCompliaceController.php
+    }
+
+
+def migration_input(graph, php_file: str, base_dir: str, config: dict):
+    """
+    Graph input for a run on `config`'s thread: None, which resumes from the last completed
+    node, when the thread was interrupted, otherwise a new migration request.
+    """
+    if graph.checkpointer is not None and graph.get_state(config).next:
+        return None
+    return migration_request(php_file, base_dir)
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Migrate a PHP controller to Spring Boot.")
+    parser.add_argument("php_file", help="Path of the PHP file to migrate")
+    parser.add_argument("--base-dir", default=DEFAULT_BASE_DIR)
+    parser.add_argument("--recursion-limit", type=int, default=RECURSION_LIMIT)
+    parser.add_argument(
+        "--stream-tokens", action="store_true", help="Print model tokens as they arrive"
+    )
+    parser.add_argument(
+        "--thread-id",
+        default=None,
+        help="Checkpoint thread; pass the id of an interrupted run to resume it",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, filename="execution.log", filemode="w")
+    if METRICS_PORT:
+        METRICS.serve(METRICS_PORT)
+    # Models and their first connections are set up while the graph compiles
+    warm_models(model_specs(DEFAULT_CONFIG).values())
+
+    graph = get_graph()
+    config = {
+        "recursion_limit": args.recursion_limit,
+        "callbacks": [TokenPrinter()] if args.stream_tokens else [],
+        # The tools keep the project inside --base-dir, see src/utils/workspace.py
+        "configurable": {
+            "thread_id": args.thread_id or str(uuid.uuid4()),
+            "workspace": args.base_dir,
+        },
+    }
+    graph_input = migration_input(graph, args.php_file, args.base_dir, config)
+    if graph_input is None:
+        print(f"Resuming thread {config['configurable']['thread_id']}")
+    else:
+        print(f"Thread {config['configurable']['thread_id']}")
+
+    fast_path_hits = loop_steps_saved = 0
+    for s in graph.stream(graph_input, config):
+        # if "__end__" not in s:
+        print(s)
+        print("----")
+        fast_path_hits += s.get("supervisor", {}).get("fast_path_hits", 0)
+        loop_steps_saved += s.get("supervisor", {}).get("loop_steps_saved", 0)
+    print(f"Supervisor LLM calls saved by fast-path routing: {fast_path_hits}")
+    if loop_steps_saved:
+        print(f"Steps saved by breaking routing loops (at least): {loop_steps_saved}")
+    if get_llm_cache() is not None:
+        print(f"LLM response cache: {get_llm_cache().stats()}")
+    if METRICS_PATH:
+        METRICS.write_prometheus(METRICS_PATH)
+        print(f"Metrics written to {METRICS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from langgraph.errors import GraphRecursionError
+
+from constants import (
+    DEFAULT_BASE_DIR,
+    INCREMENTAL_MANIFEST,
+    METRICS_PATH,
+    METRICS_PORT,
+    RECURSION_LIMIT,
+)
+from src.agent import (
+    DEFAULT_CONFIG,
+    get_graph,
+    migration_input,
+    model_specs,
+    pipeline_versions,
+)
+from src.utils.incremental import (
+    IncrementalManifest,
+    class_index,
+    php_dependencies,
+    written_files,
+)
+from src.utils.llm_cache import get_llm_cache
+from src.utils.metrics import METRICS
+from src.utils.models import warm_models
+from src.utils.tool_cache import TOOL_CACHE
+from src.utils.workspace import merge_workspace
+
+logger = logging.getLogger(__name__)
+
+
+def find_php_files(source: str) -> list[str]:
+    """
+    Resolve a directory (searched recursively) or a glob pattern to a sorted list of PHP files.
+    """
+    if os.path.isdir(source):
+        pattern = os.path.join(source, "**", "*.php")
+    else:
+        pattern = source
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+
+def thread_id_for(php_file: str, run_id: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(php_file).encode("utf-8")).hexdigest()[:16]
+    return f"{run_id}-{digest}"
+
+
+def migrate_file(
+    php_file: str,
+    base_dir: str,
+    run_id: str,
+    recursion_limit: int = RECURSION_LIMIT,
+    max_attempts: int = 3,
+    backoff: float = 2.0,
+    php_root: str = None,
+) -> dict:
+    """
+    Run one graph invocation for `php_file`, retrying with exponential backoff and jitter.
+
+    Each file has its own checkpoint thread within `run_id`, so a retry (or a later batch
+    with the same run id) resumes from the last completed node instead of starting over,
+    and files that already finished are not run again. Hitting the recursion limit is not retried.
+
+    The file is migrated into a project of its own under `base_dir/.batch`, so concurrent
+    files never write to (or build) a half-written shared project; once it succeeded that
+    project is merged into `base_dir`, see merge_workspace. `php_root`, the source tree of
+    the batch, is what the PHP index tools index.
+
+    Returns:
+        dict: The manifest entry for the file.
+    """
+    graph = get_graph()
+    thread_id = thread_id_for(php_file, run_id)
+    workspace = os.path.join(base_dir, ".batch", thread_id)
+    config = {
+        "recursion_limit": recursion_limit,
+        "configurable": {"thread_id": thread_id, "workspace": workspace},
+    }
+    if php_root:
+        config["configurable"]["php_root"] = php_root
+    entry = {
+        "php_file": php_file,
+        "thread_id": config["configurable"]["thread_id"],
+        "status": "failed",
+        "attempts": 0,
+        "error": None,
+    }
+    start = time.perf_counter()
+    for attempt in range(1, max_attempts + 1):
+        entry["attempts"] = attempt
+        try:
+            graph_input = migration_input(graph, php_file, workspace, config)
+            if graph_input is not None and graph.checkpointer is not None:
+                state = graph.get_state(config)
+                if state.created_at is not None:
+                    # Finished in an earlier batch with this run id (reducer channels
+                    # give a fresh thread non-empty values, only a checkpoint counts)
+                    entry.update(
+                        status="succeeded",
+                        error=None,
+                        resumed=True,
+                        java_files=written_files(state.values.get("results", [])),
+                    )
+                    break
+            state = graph.invoke(graph_input, config)
+        except GraphRecursionError as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+            break
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+            logger.warning("Attempt %d for %s failed: %s", attempt, php_file, entry["error"])
+            if attempt < max_attempts:
+                METRICS.inc("retries_total", source="batch")
+                time.sleep(backoff ** attempt + random.uniform(0, backoff))
+            continue
+        entry.update(
+            status="succeeded",
+            error=None,
+            steps=len(state.get("results", [])),
+            fast_path_hits=state.get("fast_path_hits", 0),
+            loop_steps_saved=state.get("loop_steps_saved", 0),
+            java_files=written_files(state.get("results", [])),
+        )
+        break
+    if entry["status"] == "succeeded":
+        # A no-op apart from the paths when it was merged by an earlier batch
+        entry["java_files"] = merge_workspace(workspace, base_dir, entry["java_files"])
+        shutil.rmtree(workspace, ignore_errors=True)
+        try:
+            # Gone with the last file of the batch
+            os.rmdir(os.path.dirname(workspace))
+        except OSError:
+            pass
+    # Memoized tool results are only reused within the file's own thread
+    TOOL_CACHE.clear_thread(entry["thread_id"])
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+def migrate_batch(
+    php_files: list[str],
+    base_dir: str,
+    run_id: str,
+    concurrency: int = 4,
+    incremental: IncrementalManifest = None,
+    skip_unchanged: bool = True,
+    **kwargs,
+) -> list[dict]:
+    """
+    Migrate `php_files` with at most `concurrency` graph runs in flight.
+
+    Provider rate limits are enforced by the shared limiters on the chat models
+    (see RATE_LIMITS in constants.py), so concurrency only bounds local resources.
+    With an `incremental` manifest, files whose source, dependencies, prompts and models
+    are unchanged since their last successful migration are skipped, and the manifest
+    is updated with the files that succeeded (`skip_unchanged=False` only updates it).
+    The PHP index is rooted at the deepest directory containing all of `php_files`.
+    """
+    entries, fingerprints = [], {}
+    if incremental is not None:
+        index = class_index(php_files)
+        versions = pipeline_versions()
+        for php_file in php_files:
+            fingerprints[php_file] = incremental.fingerprint(
+                php_file, php_dependencies(php_file, index), versions, base_dir
+            )
+            if skip_unchanged and incremental.is_up_to_date(php_file, fingerprints[php_file]):
+                print(f"[unchanged] {php_file}")
+                entries.append({"php_file": php_file, "status": "unchanged"})
+        php_files = [p for p in php_files if p not in {e["php_file"] for e in entries}]
+
+    if php_files:
+        kwargs.setdefault(
+            "php_root", os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in php_files])
+        )
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {
+            executor.submit(migrate_file, php_file, base_dir, run_id, **kwargs): php_file
+            for php_file in php_files
+        }
+        for future in as_completed(futures):
+            entry = future.result()
+            print(f"[{entry['status']}] {entry['php_file']} ({entry['seconds']}s)")
+            if incremental is not None and entry["status"] == "succeeded":
+                incremental.record(
+                    entry["php_file"], fingerprints[entry["php_file"]], entry["java_files"]
+                )
+            entries.append(entry)
+    if incremental is not None:
+        incremental.save()
+    return sorted(entries, key=lambda entry: entry["php_file"])
+
+
+def write_manifest(path: str, entries: list[dict], started_at: str, run_id: str):
+    manifest = {
+        "run_id": run_id,
+        "started_at": started_at,
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "succeeded": sum(entry["status"] == "succeeded" for entry in entries),
+        "unchanged": sum(entry["status"] == "unchanged" for entry in entries),
+        "failed": sum(entry["status"] == "failed" for entry in entries),
+        "files": entries,
+    }
+    if get_llm_cache() is not None:
+        manifest["llm_cache"] = get_llm_cache().stats()
+    with open(path, "w") as file:
+        json.dump(manifest, file, indent=2)
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(
+        description="Migrate every PHP file in a directory or glob to Spring Boot."
+    )
+    parser.add_argument("source", help="Directory (searched recursively) or glob of PHP files")
+    parser.add_argument("--base-dir", default=DEFAULT_BASE_DIR)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--recursion-limit", type=int, default=RECURSION_LIMIT)
+    parser.add_argument("--manifest", default="migration_manifest.json")
+    parser.add_argument(
+        "--run-id",
+        default=None,
+        help="Reuse the run id of an interrupted batch to resume its unfinished files",
+    )
+    parser.add_argument(
+        "--incremental-manifest",
+        default=INCREMENTAL_MANIFEST,
+        help="Skip files unchanged since their last successful migration (empty to disable)",
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="Migrate every file, even the unchanged ones"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, filename="execution.log", filemode="w")
+
+    if METRICS_PORT:
+        METRICS.serve(METRICS_PORT)
+    warm_models(model_specs(DEFAULT_CONFIG).values())
+
+    php_files = find_php_files(args.source)
+    if not php_files:
+        parser.error(f"No PHP files found in {args.source}")
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    run_id = args.run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    print(f"Run id {run_id}")
+    entries = migrate_batch(
+        php_files,
+        args.base_dir,
+        run_id,
+        concurrency=args.concurrency,
+        recursion_limit=args.recursion_limit,
+        max_attempts=args.max_attempts,
+        incremental=IncrementalManifest(args.incremental_manifest)
+        if args.incremental_manifest
+        else None,
+        skip_unchanged=not args.full,
+    )
+    write_manifest(args.manifest, entries, started_at, run_id)
+    print(f"Manifest written to {args.manifest}")
+    if METRICS_PATH:
+        METRICS.write_prometheus(METRICS_PATH)
+        print(f"Metrics written to {METRICS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# Supervised start of a server process for app-start checks: stdout and stderr are drained by
+# their own threads into one bounded ring buffer (a chatty stream can never fill its pipe and
+# block the process), readiness is a log line or the port accepting connections, and every
+# run gets a free port so several checks can run side by side.
+import os
+import queue
+import re
+import signal
+import socket
+import subprocess
+import threading
+import time
+from collections import deque
+
+from constants import APP_LOG_TAIL_LINES
+
+# Another process took the port between allocation and bind, the start is retried once
+_PORT_IN_USE = re.compile(r"Port \d+ (?:was already|is already) in use|Address already in use")
+
+
+def free_port(host: str = "127.0.0.1") -> int:
+    """A TCP port nothing listens on right now."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def _listening(port: int, host: str = "127.0.0.1") -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+
+def _drain(stream, name: str, lines: queue.Queue, tail: deque):
+    for line in stream:
+        line = line.rstrip("\n")
+        tail.append(line if name == "stdout" else f"[stderr] {line}")
+        lines.put(line)
+    stream.close()
+
+
+def _stop(process: subprocess.Popen, grace_seconds: float = 10):
+    if process.poll() is not None:
+        return
+    # The whole process group, so a launcher script doesn't leave the JVM behind
+    try:
+        os.killpg(process.pid, signal.SIGINT)
+    except OSError:
+        process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=grace_seconds)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            process.kill()
+        process.wait()
+
+
+def _run_once(command, port, cwd, ready, deadline, tail_lines, env):
+    process = subprocess.Popen(
+        command(port),
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        start_new_session=True,
+    )
+    lines = queue.Queue()
+    tail = deque(maxlen=tail_lines)
+    drains = [
+        threading.Thread(target=_drain, args=(stream, name, lines, tail), daemon=True)
+        for name, stream in (("stdout", process.stdout), ("stderr", process.stderr))
+    ]
+    for drain in drains:
+        drain.start()
+
+    result = {"started": False, "timed_out": False, "port": port, "port_in_use": False}
+    next_probe = time.monotonic() + 1.0
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                result["timed_out"] = True
+                break
+            try:
+                line = lines.get(timeout=min(0.5, remaining))
+            except queue.Empty:
+                if process.poll() is not None and not any(d.is_alive() for d in drains):
+                    break
+            else:
+                if ready.search(line):
+                    result["started"] = True
+                    break
+                if _PORT_IN_USE.search(line):
+                    result["port_in_use"] = True
+            # Servers that don't log a startup line are ready once they accept connections
+            # (while still running, otherwise the listener could be another process)
+            if time.monotonic() >= next_probe and process.poll() is None and not result["port_in_use"]:
+                next_probe = time.monotonic() + 1.0
+                if _listening(port):
+                    result["started"] = True
+                    break
+    finally:
+        result["exit_code"] = process.poll()
+        # Taken before stopping, so the shutdown output doesn't push out the startup lines
+        result["log_tail"] = list(tail)
+        _stop(process)
+        for drain in drains:
+            drain.join(timeout=1)
+    return result
+
+
+def run_until_ready(
+    command,
+    ready: re.Pattern,
+    deadline: float,
+    cwd: str = None,
+    env: dict = None,
+    tail_lines: int = APP_LOG_TAIL_LINES,
+) -> dict:
+    """
+    Start a server on a free port, wait until it is ready, then stop it.
+
+    Args:
+        command (Callable): Takes the allocated port and returns the command line.
+        ready (re.Pattern): Log line (stdout or stderr) that means the server started.
+        deadline (float): time.monotonic() value by which the server has to be ready.
+        tail_lines (int): Log lines kept, the last ones of both streams interleaved.
+
+    Returns:
+        dict: "started", "timed_out", "port", "exit_code" (None when the server was still
+            running at the end of the check) and "log_tail".
+    """
+    result = _run_once(command, free_port(), cwd, ready, deadline, tail_lines, env)
+    if result.pop("port_in_use") and not result["started"] and time.monotonic() < deadline:
+        result = _run_once(command, free_port(), cwd, ready, deadline, tail_lines, env)
+        result.pop("port_in_use")
+    return result
@@ -0,0 +1,79 @@
+# Content-addressed store for large payloads (PHP sources, generated Java classes, bulky
+# agent outputs). The graph state and the prompts only carry short handles; tools
+# dereference them when they need the content.
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+from constants import ARTIFACT_DIR
+from src.utils.common import atomic_write
+
+HANDLE_PREFIX = "artifact:"
+_HANDLE = re.compile(rf"^{HANDLE_PREFIX}([0-9a-f]{{20}})$")
+
+
+def is_handle(value) -> bool:
+    return isinstance(value, str) and _HANDLE.match(value.strip()) is not None
+
+
+class ArtifactStore:
+    """
+    Text artifacts stored on disk under the sha256 of their content.
+
+    Args:
+        root (str): Directory of the store; artifacts are spread over 256 subdirectories.
+    """
+
+    def __init__(self, root: str = ARTIFACT_DIR):
+        self.root = root
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def put(self, content: str) -> str:
+        """Store `content` (a no-op when it is already stored) and return its handle."""
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:20]
+        path = self._path(digest)
+        if not os.path.exists(path):
+            atomic_write(path, content)
+        return HANDLE_PREFIX + digest
+
+    def get(self, handle: str) -> str:
+        match = _HANDLE.match(handle.strip())
+        if match is None:
+            raise ValueError(f"Not an artifact handle: {handle!r}")
+        try:
+            with open(self._path(match.group(1)), encoding="utf-8") as file:
+                return file.read()
+        except FileNotFoundError:
+            raise KeyError(f"Unknown artifact: {handle}")
+
+    def resolve(self, value: str) -> str:
+        """The content behind `value` if it is a handle, otherwise `value` itself."""
+        return self.get(value) if is_handle(value) else value
+
+
+@lru_cache(maxsize=1)
+def get_artifact_store() -> ArtifactStore:
+    return ArtifactStore()
+
+
+def describe(handle: str, content: str) -> dict:
+    """Metadata kept in the state next to a handle."""
+    return {
+        "handle": handle,
+        "lines": content.count("\n") + 1,
+        "bytes": len(content.encode("utf-8")),
+    }
+
+
+def reference(handle: str, content: str, label: str, preview_lines: int = 5) -> str:
+    """Short stand-in for `content` in a message: the handle, its size and a preview."""
+    lines = content.splitlines()
+    preview = "\n".join(lines[:preview_lines])
+    return (
+        f"[{label} stored as {handle}: {len(lines)} lines, ~{len(content) // 4 + 1} tokens."
+        f" Use read_artifact to see it, or pass the handle to a write tool as the content.]\n"
+        f"{preview}"
+    )
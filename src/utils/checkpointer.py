@@ -0,0 +1,354 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+# A list channel is stored as a delta on its previous version at most this many times
+# in a row before a full copy is written, which bounds the work of loading it
+MAX_DELTA_CHAIN = 16
+# Threads whose last list values are kept in memory as delta bases; the least recently
+# saved thread beyond this is dropped, and its next save of a list is a full copy
+MAX_CACHED_THREADS = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS channel_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    base_version TEXT,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    """
+    Local SQLite checkpointer that saves graph snapshots incrementally.
+
+    Only the channels whose version changed in a step are written, and a list channel
+    (such as `messages`) that only grew since its previous version is stored as the
+    appended items. A step therefore costs its new messages, not the whole history.
+
+    Args:
+        path (str): SQLite database file.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        # thread_id -> {(checkpoint_ns, channel): (version, value, delta chain length)},
+        # least recently saved thread first
+        self._last_lists = OrderedDict()
+
+    # -- channel values -------------------------------------------------------
+
+    def _thread_lists(self, thread_id) -> dict:
+        lists = self._last_lists.setdefault(thread_id, {})
+        self._last_lists.move_to_end(thread_id)
+        while len(self._last_lists) > MAX_CACHED_THREADS:
+            self._last_lists.popitem(last=False)
+        return lists
+
+    def _put_channel(self, thread_id, checkpoint_ns, channel, version, values):
+        last_lists = self._thread_lists(thread_id)
+        key = (checkpoint_ns, channel)
+        if channel not in values:
+            row = ("empty", None, None)
+        else:
+            value = values[channel]
+            previous = last_lists.get(key)
+            chain = 0
+            if (
+                previous is not None
+                and isinstance(value, list)
+                and previous[2] < MAX_DELTA_CHAIN
+                and len(value) >= len(previous[1])
+                and value[: len(previous[1])] == previous[1]
+            ):
+                chain = previous[2] + 1
+                type_, blob = self.serde.dumps_typed(value[len(previous[1]):])
+                row = (type_, blob, str(previous[0]))
+            else:
+                type_, blob = self.serde.dumps_typed(value)
+                row = (type_, blob, None)
+            if isinstance(value, list):
+                last_lists[key] = (version, list(value), chain)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO channel_blobs"
+            " (thread_id, checkpoint_ns, channel, version, type, blob, base_version)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (thread_id, checkpoint_ns, channel, str(version), *row),
+        )
+
+    def _load_channel(self, thread_id, checkpoint_ns, channel, version):
+        deltas = []
+        while version is not None:
+            row = self._conn.execute(
+                "SELECT type, blob, base_version FROM channel_blobs"
+                " WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                return None, False
+            deltas.append(self.serde.loads_typed((row[0], row[1])))
+            version = row[2]
+        value = deltas.pop()
+        for delta in reversed(deltas):
+            value = value + delta
+        return value, True
+
+    def _load_tuple(self, thread_id, checkpoint_ns, row) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, blob, metadata_type, metadata = row
+        checkpoint = self.serde.loads_typed((type_, blob))
+        channel_values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            value, exists = self._load_channel(thread_id, checkpoint_ns, channel, version)
+            if exists:
+                channel_values[channel] = value
+        checkpoint["channel_values"] = channel_values
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, blob FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+            " ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": parent_checkpoint_id,
+                }
+            }
+            if parent_checkpoint_id
+            else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((type_, blob)))
+                for task_id, channel, type_, blob in writes
+            ],
+        )
+
+    # -- BaseCheckpointSaver ----------------------------------------------------
+
+    def get_next_version(self, current, channel):
+        # Zero-padded counter plus a random suffix: still increasing, but a run resumed from
+        # an older checkpoint can't overwrite the blobs of the versions it branched away from
+        counter = int(str(current).split(".")[0]) if current is not None else 0
+        return f"{counter + 1:032}.{random.random():.16f}"
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type,"
+            " metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+            return self._load_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type,"
+            " checkpoint, metadata_type, metadata FROM checkpoints WHERE 1 = 1"
+        )
+        params = []
+        if config:
+            query += " AND thread_id = ? AND checkpoint_ns = ?"
+            params += [
+                config["configurable"]["thread_id"],
+                config["configurable"].get("checkpoint_ns", ""),
+            ]
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_checkpoint_id)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for thread_id, checkpoint_ns, *row in rows:
+            if filter:
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            with self._lock:
+                yield self._load_tuple(thread_id, checkpoint_ns, row)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint = checkpoint.copy()
+        values = checkpoint.pop("channel_values")
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(metadata)
+        with self._lock, self._conn:
+            for channel, version in new_versions.items():
+                self._put_channel(thread_id, checkpoint_ns, channel, version, values)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id,"
+                " parent_checkpoint_id, type, checkpoint, metadata_type, metadata)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    blob,
+                    metadata_type,
+                    metadata_blob,
+                ),
+            )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: List[Tuple[str, Any]],
+        task_id: str,
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = [
+            (
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                *self.serde.dumps_typed(value),
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id,"
+                " task_id, idx, channel, type, blob) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock, self._conn:
+            for table in ("checkpoints", "channel_blobs", "writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._last_lists.pop(thread_id, None)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: List[Tuple[str, Any]],
+        task_id: str,
+    ) -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id)
@@ -0,0 +1,84 @@
+# Helpers shared by the utils: atomic file writes, path containment, and source text
+# scanning for the Java validator and the PHP index.
+import os
+import stat
+import tempfile
+
+# Comment and string literal syntax of the languages code_only handles
+_SYNTAX = {
+    "java": {"line_comments": ("//",), "text_blocks": True, "multiline_strings": False},
+    "php": {"line_comments": ("//", "#"), "text_blocks": False, "multiline_strings": True},
+}
+
+
+def stage_file(path: str, content) -> str:
+    """
+    Write `content` (str or bytes) to a temporary file next to `path` and return its path,
+    to be renamed over `path` with os.replace, an atomic rename on the same filesystem.
+    The temporary file gets the mode of `path` when it exists, else the usual 0o644.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    binary = isinstance(content, bytes)
+    with tempfile.NamedTemporaryFile(
+        "wb" if binary else "w",
+        encoding=None if binary else "utf-8",
+        dir=directory,
+        suffix=".tmp",
+        delete=False,
+    ) as file:
+        file.write(content)
+    # Temp files are created private
+    mode = stat.S_IMODE(os.stat(path).st_mode) if os.path.exists(path) else 0o644
+    os.chmod(file.name, mode)
+    return file.name
+
+
+def atomic_write(path: str, content):
+    """Replace `path` with `content`; concurrent readers never see a partial file."""
+    os.replace(stage_file(path, content), path)
+
+
+def is_within(directory: str, path: str) -> bool:
+    """Whether the absolute `path` is `directory` or lies under it."""
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def code_only(source: str, language: str, strings: bool = True) -> str:
+    """
+    `source` ("java" or "php") with its comments, and string literals unless `strings` is
+    False, blanked out; offsets and newlines are kept, so positions match the source.
+    """
+    syntax = _SYNTAX[language]
+    out, i, n = list(source), 0, len(source)
+    while i < n:
+        string = False
+        if source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+        elif any(source.startswith(marker, i) for marker in syntax["line_comments"]):
+            end = source.find("\n", i)
+            end = n if end == -1 else end
+        elif syntax["text_blocks"] and source.startswith('"""', i):
+            end = source.find('"""', i + 3)
+            end, string = (n if end == -1 else end + 3), True
+        elif source[i] in "\"'":
+            stops = (source[i],) if syntax["multiline_strings"] else (source[i], "\n")
+            end = i + 1
+            while end < n and source[end] not in stops:
+                end += 2 if source[end] == "\\" else 1
+            end, string = end + 1, True
+        else:
+            i += 1
+            continue
+        if strings or not string:
+            for k in range(i, min(end, n)):
+                if out[k] != "\n":
+                    out[k] = " "
+        i = end
+    return "".join(out)
+
+
+def line_number(source: str, offset: int) -> int:
+    """1-based line of `offset` in `source`."""
+    return source.count("\n", 0, offset) + 1
@@ -0,0 +1,265 @@
+# Per-method PHP -> Spring Boot conversion for the Code_converter node.
+# The PHP file is split into methods, every method is converted concurrently with the
+# same model, and the snippets are merged into controller, service and repository classes.
+import os
+import re
+import textwrap
+
+from langchain_core.messages import HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from constants import CONVERSION_CONCURRENCY, JAVA_BASE_PACKAGE
+from src.utils.artifacts import describe, get_artifact_store
+from src.utils.models import get_model
+from src.utils.nodes import graph_step, with_node_callbacks
+from src.utils.php_splitter import split_php
+
+SECTIONS = ("CONTROLLER", "SERVICE", "REPOSITORY")
+
+UNIT_INSTRUCTIONS = (
+    "Convert only the PHP method below. The surrounding class is converted into a"
+    " `{class_name}Controller` (a @RestController mapped to `{route_prefix}`), a"
+    " `{class_name}Service` (a @Service injected into the controller) and a"
+    " `{class_name}Repository` (a Spring Data JPA repository injected into the service),"
+    " all in package `{package}`.\n"
+    "Reply with exactly three sections, each starting with its marker line:\n"
+    "// CONTROLLER\n<the controller method, with its mapping annotation>\n"
+    "// SERVICE\n<the service methods holding the business logic>\n"
+    "// REPOSITORY\n<repository method declarations, or nothing>\n"
+    "Put any imports the snippets need as `import ...;` lines at the top of their section."
+    " No class declarations and no markdown fences.\n\n"
+    "PHP class header:\n{header}\n\nPHP method:\n{method}"
+)
+
+_PHP_PATH = re.compile(r"`?([^\s`'\"]+\.php)`?")
+_IMPORT = re.compile(r"^\s*import\s+[\w.*]+\s*;\s*$", re.M)
+_FENCE = re.compile(r"^\s*```\w*\s*$", re.M)
+
+
+def _conversion_chain(model_spec: str, system_prompt: str):
+    prompt = ChatPromptTemplate.from_messages(
+        [("system", system_prompt), ("human", UNIT_INSTRUCTIONS)]
+    )
+    return prompt | get_model(model_spec) | StrOutputParser()
+
+
+def php_path_from_state(state):
+    """The PHP file named in the task message, if any."""
+    for message in state.get("messages") or []:
+        match = _PHP_PATH.search(str(message.content))
+        if match:
+            return match.group(1)
+    return None
+
+
+def _script_class_name(php_path: str) -> str:
+    # users_admin.php -> UsersAdmin
+    stem = os.path.splitext(os.path.basename(php_path or "script"))[0]
+    return "".join(part.capitalize() for part in re.split(r"[^A-Za-z0-9]+", stem) if part) or "Script"
+
+
+def conversion_inputs(source: str, package: str = JAVA_BASE_PACKAGE, php_path: str = None) -> list:
+    """
+    One prompt input per PHP method, and per top-level function. The functions of a file
+    are converted as the methods of one class named after the file.
+    """
+    parsed = split_php(source)
+    inputs = []
+    for php_class in parsed["classes"]:
+        class_name = php_class["name"].removesuffix("Controller")
+        for method in php_class["methods"]:
+            inputs.append(
+                {
+                    "class_name": class_name,
+                    "route_prefix": (php_class["route"] or {}).get("path", "/"),
+                    "package": package,
+                    "header": php_class["header"],
+                    "method": method["source"],
+                }
+            )
+    if parsed["functions"]:
+        class_name = _script_class_name(php_path)
+        # No class header to show, the file's namespace and imports stand in for it
+        header = "\n".join(
+            ([f"namespace {parsed['namespace']};"] if parsed["namespace"] else [])
+            + [f"use {use};" for use in parsed["uses"]]
+            + [f"// Top-level functions of {os.path.basename(php_path or 'the script')}"]
+        )
+        for function in parsed["functions"]:
+            inputs.append(
+                {
+                    "class_name": class_name,
+                    "route_prefix": f"/{class_name[0].lower()}{class_name[1:]}",
+                    "package": package,
+                    "header": header,
+                    "method": function["source"],
+                }
+            )
+    return inputs
+
+
+def _sections(output: str) -> dict:
+    output = _FENCE.sub("", output)
+    sections = dict.fromkeys(SECTIONS, "")
+    current = None
+    for line in output.splitlines():
+        marker = line.strip().lstrip("/").strip().upper()
+        if marker in SECTIONS:
+            current = marker
+        elif current:
+            sections[current] += line + "\n"
+    return sections
+
+
+def merge_units(inputs: list, outputs: list) -> dict:
+    """
+    Merge per-method snippets into whole Java classes.
+
+    Returns:
+        dict: Relative file path -> Java source.
+    """
+    classes = {}
+    for unit, output in zip(inputs, outputs):
+        class_name, package = unit["class_name"], unit["package"]
+        merged = classes.setdefault(
+            class_name,
+            {
+                "package": package,
+                "route_prefix": unit["route_prefix"],
+                **{section: {"imports": set(), "body": []} for section in SECTIONS},
+            },
+        )
+        for section, text in _sections(output).items():
+            merged[section]["imports"].update(
+                line.strip() for line in _IMPORT.findall(text)
+            )
+            body = textwrap.dedent(_IMPORT.sub("", text)).strip("\n")
+            if body.strip():
+                merged[section]["body"].append(textwrap.indent(body, "    "))
+
+    files = {}
+    for class_name, merged in classes.items():
+        package = merged["package"]
+        directory = f"src/main/java/{package.replace('.', '/')}"
+        service = f"{class_name}Service"
+        repository = f"{class_name}Repository"
+        declarations = {
+            "CONTROLLER": (
+                f"{class_name}Controller",
+                "controller",
+                {
+                    "import org.springframework.web.bind.annotation.*;",
+                    f"import {package}.service.{service};",
+                },
+                f"@RestController\n@RequestMapping(\"{merged['route_prefix']}\")\n"
+                f"public class {class_name}Controller {{\n\n"
+                f"    private final {service} service;\n\n"
+                f"    public {class_name}Controller({service} service) {{\n"
+                "        this.service = service;\n    }\n",
+            ),
+            "SERVICE": (
+                service,
+                "service",
+                {
+                    "import org.springframework.stereotype.Service;",
+                    f"import {package}.repository.{repository};",
+                },
+                f"@Service\npublic class {service} {{\n\n"
+                f"    private final {repository} repository;\n\n"
+                f"    public {service}({repository} repository) {{\n"
+                "        this.repository = repository;\n    }\n",
+            ),
+            "REPOSITORY": (
+                repository,
+                "repository",
+                {"import org.springframework.stereotype.Repository;"},
+                f"@Repository\npublic interface {repository} {{\n",
+            ),
+        }
+        for section, (name, subpackage, imports, opening) in declarations.items():
+            body = "\n\n".join(merged[section]["body"])
+            files[f"{directory}/{subpackage}/{name}.java"] = (
+                f"package {package}.{subpackage};\n\n"
+                + "\n".join(sorted(imports | merged[section]["imports"]))
+                + f"\n\n{opening}\n{body}\n}}\n"
+            )
+    return files
+
+
+def _node_update(files: dict, unit_count: int, php_path: str, step: int = 0):
+    # The classes go to the artifact store; the writer passes the handles to
+    # write_java_files instead of generating the code again token by token
+    store = get_artifact_store()
+    handles = {path: store.put(source) for path, source in files.items()}
+    content = (
+        f"Converted {unit_count} PHP methods from `{php_path}` into {len(files)} Java classes."
+        " Write them all into the project with one write_java_files call, using each"
+        " artifact handle below as the content of its file:\n\n"
+        + "\n".join(f"File: {path}\nContent: {handle}" for path, handle in handles.items())
+    )
+    return {
+        "messages": [HumanMessage(content=content, name="Code_converter")],
+        "results": [
+            {
+                "name": "Code_converter",
+                "step": step,
+                "output": content[:200],
+                "tool_calls": [],
+                "files": sorted(files),
+                "artifacts": [
+                    {**describe(handle, files[path]), "name": path}
+                    for path, handle in handles.items()
+                ],
+            }
+        ],
+    }
+
+
+def _missing_source(php_path, step=0, reason=None):
+    # An empty output, so the code_converted routing rule doesn't send it to the writer
+    content = reason or f"No PHP source to convert (looked for `{php_path}`)."
+    return {
+        "messages": [HumanMessage(content=content, name="Code_converter")],
+        "results": [
+            {"name": "Code_converter", "step": step, "output": "", "tool_calls": []}
+        ],
+    }
+
+
+def code_converter_node(state, model_spec, system_prompt, config=None):
+    php_path = php_path_from_state(state)
+    try:
+        with open(php_path, encoding="utf-8") as file:
+            inputs = conversion_inputs(file.read(), php_path=php_path)
+    except (TypeError, OSError):
+        return _missing_source(php_path, graph_step(config))
+    if not inputs:
+        return _missing_source(
+            php_path, graph_step(config), f"No PHP methods or functions found in `{php_path}`."
+        )
+    outputs = _conversion_chain(model_spec, system_prompt).batch(
+        inputs, {**with_node_callbacks(config), "max_concurrency": CONVERSION_CONCURRENCY}
+    )
+    return _node_update(
+        merge_units(inputs, outputs), len(inputs), php_path, graph_step(config)
+    )
+
+
+async def acode_converter_node(state, model_spec, system_prompt, config=None):
+    php_path = php_path_from_state(state)
+    try:
+        with open(php_path, encoding="utf-8") as file:
+            inputs = conversion_inputs(file.read(), php_path=php_path)
+    except (TypeError, OSError):
+        return _missing_source(php_path, graph_step(config))
+    if not inputs:
+        return _missing_source(
+            php_path, graph_step(config), f"No PHP methods or functions found in `{php_path}`."
+        )
+    outputs = await _conversion_chain(model_spec, system_prompt).abatch(
+        inputs, {**with_node_callbacks(config), "max_concurrency": CONVERSION_CONCURRENCY}
+    )
+    return _node_update(
+        merge_units(inputs, outputs), len(inputs), php_path, graph_step(config)
+    )
@@ -1,6 +1,6 @@
-# Our team supervisor is an LLM node. It just picks the next agent to process
+# Our team supervisor is an LLM node. It just picks the next agent(s) to process
 # and decides when the work is completed
-from constants import OPTIONS
+from constants import MEMBERS, OPTIONS
 
 
 # Using openai function calling can make output parsing easier for us
@@ -15,6 +15,8 @@ function_def = {
                 "title": "Next",
                 "anyOf": [
                     {"enum": OPTIONS},
+                    # Independent workers are dispatched together and run in parallel
+                    {"type": "array", "items": {"enum": MEMBERS}, "minItems": 1},
                 ],
             }
         },
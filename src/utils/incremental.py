@@ -0,0 +1,101 @@
+# Incremental re-migration: a manifest of the PHP inputs each successful migration used
+# (source hash, hashes of the PHP files it depends on, prompt and model versions) and
+# the Java files it produced, so later batches skip files whose inputs are unchanged.
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+
+from src.utils.common import atomic_write
+from src.utils.php_splitter import split_php
+
+_WRITTEN = re.compile(r"(?:written to|up to date in) (\S+)")
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def _short_name(name: str) -> str:
+    return name.rsplit("\\", 1)[-1]
+
+
+def class_index(php_files: list[str]) -> dict:
+    """Short class name -> PHP file declaring it, over the files of a batch."""
+    index = {}
+    for php_file in php_files:
+        with open(php_file, encoding="utf-8", errors="replace") as file:
+            for php_class in split_php(file.read())["classes"]:
+                index.setdefault(php_class["name"], php_file)
+    return index
+
+
+def php_dependencies(php_file: str, index: dict) -> list[str]:
+    """PHP files of the batch that `php_file` imports or extends."""
+    with open(php_file, encoding="utf-8", errors="replace") as file:
+        parsed = split_php(file.read())
+    names = [*parsed["uses"], *(c["extends"] for c in parsed["classes"] if c["extends"])]
+    return sorted(
+        {index[_short_name(name)] for name in names if _short_name(name) in index}
+        - {php_file}
+    )
+
+
+def written_files(results: list) -> list[str]:
+    """Java files reported (written or already up to date) by the write tools of a finished migration."""
+    files = set()
+    for result in results:
+        for call in result.get("tool_calls", []):
+            observation = call["observation"]
+            if isinstance(observation, dict):
+                # write_java_files
+                files.update(observation.get("changed", []) + observation.get("unchanged", []))
+            else:
+                files.update(_WRITTEN.findall(str(observation)))
+    return sorted(files)
+
+
+class IncrementalManifest:
+    """
+    JSON manifest keyed by PHP file. An entry is up to date when the source, its
+    dependencies, the prompt and model versions and the base directory all match the
+    recorded ones, and every Java file it produced still exists.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def fingerprint(self, php_file: str, dependencies: list[str], versions: dict, base_dir: str) -> dict:
+        return {
+            "source_hash": file_hash(php_file),
+            "dependency_hashes": {path: file_hash(path) for path in dependencies},
+            "base_dir": base_dir,
+            **versions,
+        }
+
+    def is_up_to_date(self, php_file: str, fingerprint: dict) -> bool:
+        entry = self.entries.get(php_file)
+        if entry is None or any(entry.get(key) != value for key, value in fingerprint.items()):
+            return False
+        return all(os.path.exists(path) for path in entry["java_files"])
+
+    def record(self, php_file: str, fingerprint: dict, java_files: list[str]):
+        with self._lock:
+            self.entries[php_file] = {
+                **fingerprint,
+                "java_files": java_files,
+                "migrated_at": datetime.now(timezone.utc).isoformat(),
+            }
+
+    def save(self):
+        with self._lock:
+            atomic_write(self.path, json.dumps(self.entries, indent=2, sort_keys=True))
@@ -0,0 +1,304 @@
+# Fast checks of generated Java files, run as soon as they are written: a structural check
+# of each file (balanced brackets, package matching the path, public type matching the
+# file name) and, when a local javac is available, one compile of all the files together.
+# Errors reach the writer agent in seconds instead of after a Maven build and app start.
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+
+from constants import VALIDATE_DEADLINE_SECONDS
+from src.utils.common import code_only, line_number
+
+_PACKAGE = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.M)
+_PUBLIC_TYPE = re.compile(
+    r"\bpublic\s+(?:(?:abstract|final|sealed|non-sealed|static|strictfp)\s+)*"
+    r"(?:class|interface|enum|record|@interface)\s+(\w+)"
+)
+_PAIRS = {")": "(", "]": "[", "}": "{"}
+_JAVAC_ERROR = re.compile(r"^(?P<file>.+\.java):(?P<line>\d+): error: (?P<message>.+)$")
+_IMPORT = re.compile(r"^\s*import\s+(static\s+)?([\w.]+)\.(\w+|\*)\s*;", re.M)
+_TYPE_DECLARATION = re.compile(r"\b(?:class|interface|enum|record)\s+(\w+)([^{;]*)\{")
+_SUPERTYPES = re.compile(r"\b(?:extends|implements)\b(.*)", re.S)
+# The javac errors a missing dependency causes; they are only ignored when they name a
+# package outside the project, or a type imported from one
+_MISSING_PACKAGE = re.compile(r"package ([\w.]+) does not exist")
+_CANNOT_ACCESS = re.compile(r"cannot access ([\w.]+)")
+_NOT_OVERRIDDEN = re.compile(r"is not abstract and does not override abstract method .+ in ([\w.]+)")
+_NO_SUPER_METHOD = "method does not override or implement a method from a supertype"
+# The lines javac prints under an error, e.g. "  symbol:   class RestController"
+_DETAIL = re.compile(r"^\s+(symbol|location):\s+(.+)$")
+MAX_ERRORS = 20
+
+
+def _expected_package(path: str):
+    parts = os.path.normpath(os.path.abspath(path)).split(os.sep)
+    for root in (["src", "main", "java"], ["src", "test", "java"]):
+        for i in range(len(parts) - len(root), -1, -1):
+            if parts[i:i + len(root)] == root:
+                return ".".join(parts[i + len(root):-1])
+    return None
+
+
+def structural_errors(path: str, source: str) -> list[dict]:
+    """Bracket balance, package/path and public type/file name mismatches of one Java file."""
+    errors = []
+    code = code_only(source, "java")
+
+    stack = []
+    for offset, char in enumerate(code):
+        if char in "([{":
+            stack.append((char, offset))
+        elif char in _PAIRS:
+            if not stack or stack[-1][0] != _PAIRS[char]:
+                errors.append({"line": line_number(code, offset), "message": f"unbalanced '{char}'"})
+                break
+            stack.pop()
+    else:
+        if stack:
+            char, offset = stack[-1]
+            errors.append({"line": line_number(code, offset), "message": f"'{char}' is never closed"})
+
+    expected = _expected_package(path)
+    package = _PACKAGE.search(code)
+    if expected is not None and (package.group(1) if package else "") != expected:
+        errors.append(
+            {
+                "line": line_number(code, package.start()) if package else 1,
+                "message": f"package should be '{expected}' for this path"
+                f" (found '{package.group(1) if package else ''}')",
+            }
+        )
+
+    file_name = os.path.splitext(os.path.basename(path))[0]
+    public_type = _PUBLIC_TYPE.search(code)
+    if public_type and public_type.group(1) != file_name:
+        errors.append(
+            {
+                "line": line_number(code, public_type.start()),
+                "message": f"public type {public_type.group(1)} should be declared in"
+                f" {public_type.group(1)}.java, not {file_name}.java",
+            }
+        )
+    return [{"file": path, **error} for error in errors]
+
+
+def _project_root(path: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    while directory != os.path.dirname(directory):
+        if os.path.exists(os.path.join(directory, "pom.xml")):
+            return directory
+        directory = os.path.dirname(directory)
+    return None
+
+
+def _javac_errors(stderr: str) -> list[dict]:
+    """The errors in javac's output, with the symbol and location javac names for them."""
+    errors = []
+    for line in stderr.splitlines():
+        match = _JAVAC_ERROR.match(line)
+        if match:
+            errors.append(match.groupdict())
+        elif errors and _DETAIL.match(line):
+            key, value = _DETAIL.match(line).groups()
+            errors[-1][key] = value.strip()
+    return errors
+
+
+class _Sources:
+    """What the dependency check needs to know about the project's Java sources."""
+
+    def __init__(self, root, paths: list[str]):
+        self.source_root = os.path.join(root, "src", "main", "java") if root else None
+        self._code = {}
+        packages = set()
+        for path in paths:
+            package = _PACKAGE.search(self.code(path))
+            packages.add(package.group(1) if package else "")
+        if self.source_root:
+            for directory, _, files in os.walk(self.source_root):
+                if any(name.endswith(".java") for name in files):
+                    relative = os.path.relpath(directory, self.source_root)
+                    packages.add("" if relative == "." else relative.replace(os.sep, "."))
+        # The base package every project package is under, e.g. com.example.myapp
+        self.base = os.path.commonprefix([package.split(".") for package in packages])
+
+    def code(self, path: str) -> str:
+        if path not in self._code:
+            try:
+                with open(path, encoding="utf-8") as file:
+                    self._code[path] = code_only(file.read(), "java")
+            except OSError:
+                self._code[path] = ""
+        return self._code[path]
+
+    def in_project(self, package: str) -> bool:
+        return bool(self.base) and package.split(".")[: len(self.base)] == self.base
+
+    def imports(self, path: str) -> tuple:
+        """(imported simple name -> its package, packages imported with a wildcard)."""
+        names, wildcards = {}, []
+        for static, qualifier, name in _IMPORT.findall(self.code(path)):
+            # The package of a statically imported member is the qualifier's own qualifier
+            package = qualifier.rsplit(".", 1)[0] if static else qualifier
+            if name == "*":
+                wildcards.append(package)
+            else:
+                names[name] = package
+        return names, wildcards
+
+    def source_of(self, path: str, type_name: str):
+        """The file declaring `type_name` as seen from `path`, if it is a project source."""
+        if type_name in self.declared(path):
+            return path
+        package = self.imports(path)[0].get(type_name)
+        candidates = [os.path.join(os.path.dirname(path), f"{type_name}.java")]
+        if package and self.source_root:
+            candidates.insert(0, os.path.join(self.source_root, *package.split("."), f"{type_name}.java"))
+        return next((candidate for candidate in candidates if os.path.exists(candidate)), None)
+
+    def declared(self, path: str) -> dict:
+        """Type name -> the simple names in its extends/implements clauses."""
+        declared = {}
+        for name, header in _TYPE_DECLARATION.findall(self.code(path)):
+            supertypes = _SUPERTYPES.search(header)
+            declared[name] = re.findall(r"\w+", supertypes.group(1)) if supertypes else []
+        return declared
+
+
+def _without_missing_dependencies(errors: list[dict], root, paths: list[str]) -> list[dict]:
+    """
+    Drop the errors caused by dependencies missing from the classpath: a package outside
+    the project that doesn't exist, types imported from such packages, and members and
+    overrides inherited from those types. Every other error is returned.
+    """
+    sources = _Sources(root, paths)
+    missing = {
+        match.group(1)
+        for match in (_MISSING_PACKAGE.fullmatch(error["message"]) for error in errors)
+        if match and not sources.in_project(match.group(1))
+    }
+
+    def is_missing(package: str) -> bool:
+        return any(package == name or package.startswith(f"{name}.") for name in missing)
+
+    def imported_from_missing(path: str, type_name: str) -> bool:
+        if "." in type_name:
+            return is_missing(type_name.rsplit(".", 1)[0])
+        names, wildcards = sources.imports(path)
+        if type_name in names:
+            return is_missing(names[type_name])
+        if sources.source_of(path, type_name) is not None:
+            return False
+        return any(map(is_missing, wildcards))
+
+    def extends_missing(path: str, type_name: str, seen=()) -> bool:
+        source = sources.source_of(path, type_name)
+        if source is None or (source, type_name) in seen:
+            return False
+        seen += ((source, type_name),)
+        return any(
+            imported_from_missing(source, supertype) or extends_missing(source, supertype, seen)
+            for supertype in sources.declared(source).get(type_name, [])
+        )
+
+    def caused_by_missing_dependency(error: dict) -> bool:
+        path, message = error["file"], error["message"]
+        if _MISSING_PACKAGE.fullmatch(message):
+            return _MISSING_PACKAGE.fullmatch(message).group(1) in missing
+        if message == "cannot find symbol":
+            kind, _, name = error.get("symbol", "").partition(" ")
+            name = name.split("(")[0]
+            if kind in ("class", "interface", "enum", "record", "@interface"):
+                return imported_from_missing(path, name)
+            if name in sources.imports(path)[0]:
+                # A statically imported member
+                return imported_from_missing(path, name)
+            # A member of a type that is missing or inherits from a missing one, located
+            # e.g. in "class UserService" or "variable repository of type UserRepository"
+            location_kind, _, location = error.get("location", "").partition(" ")
+            if location_kind == "package":
+                return is_missing(location)
+            type_name = location.rpartition(" ")[2].split("<")[0]
+            return bool(type_name) and (
+                imported_from_missing(path, type_name) or extends_missing(path, type_name)
+            )
+        if _CANNOT_ACCESS.fullmatch(message):
+            return imported_from_missing(path, _CANNOT_ACCESS.fullmatch(message).group(1))
+        if _NOT_OVERRIDDEN.search(message):
+            return imported_from_missing(path, _NOT_OVERRIDDEN.search(message).group(1))
+        if message == _NO_SUPER_METHOD:
+            return any(extends_missing(path, name) for name in sources.declared(path))
+        return False
+
+    return [error for error in errors if not caused_by_missing_dependency(error)]
+
+
+def compile_errors(paths: list[str], deadline: float) -> tuple:
+    """
+    Compile `paths` with a single javac call into a scratch directory.
+
+    The project's classpath is used when it has already been resolved (see
+    BuildWorkspace); without it, the errors a missing dependency causes (a package
+    outside the project that doesn't exist, and the types imported from it) are ignored
+    and the other errors are reported.
+
+    Returns:
+        tuple: (compiled, errors); compiled is None when javac isn't available.
+    """
+    # verification runs the structural check before its own compile, import it lazily
+    from src.utils.verification import get_build_workspace
+
+    if not paths or not shutil.which("javac"):
+        return None, []
+    root = _project_root(paths[0])
+    classpath = get_build_workspace(root).cached_classpath() if root else None
+    command = ["javac", "-nowarn", "-proc:none", "-implicit:none"]
+    if root:
+        command += ["-sourcepath", os.path.join(root, "src", "main", "java")]
+    if classpath:
+        command += ["-cp", classpath]
+    with tempfile.TemporaryDirectory() as classes_dir:
+        process = subprocess.run(
+            command + ["-d", classes_dir] + paths,
+            capture_output=True,
+            text=True,
+            timeout=max(0.0, deadline - time.monotonic()),
+        )
+    errors = _javac_errors(process.stderr)
+    if not classpath:
+        errors = _without_missing_dependencies(errors, root, paths)
+    if process.returncode != 0 and classpath and not errors:
+        errors = [{"message": process.stderr.strip()[-2000:]}]
+    return not errors, errors
+
+
+def validate_java_files(paths: list[str], deadline_seconds: float = VALIDATE_DEADLINE_SECONDS) -> dict:
+    """
+    Check Java files right after they are written.
+
+    Returns:
+        dict: "valid", "structural_errors", "compiled" (None without javac, or when the
+            structural check already failed), "compile_errors" and "seconds".
+    """
+    start = time.monotonic()
+    paths = [path for path in paths if path.endswith(".java")]
+    result = {"valid": True, "structural_errors": [], "compiled": None, "compile_errors": []}
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            result["structural_errors"] += structural_errors(path, file.read())
+    if not result["structural_errors"]:
+        try:
+            result["compiled"], result["compile_errors"] = compile_errors(
+                paths, start + deadline_seconds
+            )
+        except (subprocess.TimeoutExpired, OSError) as e:
+            # No verdict from javac, the Testing step compiles the project anyway
+            result["compile_note"] = f"javac did not finish: {e}"
+    result["structural_errors"] = result["structural_errors"][:MAX_ERRORS]
+    result["compile_errors"] = result["compile_errors"][:MAX_ERRORS]
+    result["valid"] = not result["structural_errors"] and result["compiled"] is not False
+    result["seconds"] = round(time.monotonic() - start, 3)
+    return result
@@ -0,0 +1,110 @@
+# Loop and stall detection for the supervisor's routing decisions.
+# A decision that would run a worker whose last runs gave identical results, or that
+# would go round a cycle of steps once more, is narrowed to the members dispatched with
+# it that aren't repeating; when none are left the supervisor model decides again, told
+# about the loop, and the run finishes if that decision repeats too.
+from typing import Optional
+
+from langchain_core.messages import HumanMessage
+
+from constants import LOOP_CYCLE_REPEATS, STALL_REPEATS
+
+
+def _steps(results: list) -> list:
+    # Names of the workers of each step, in order (workers dispatched together share a step)
+    steps = []
+    for result in results:
+        if steps and steps[-1][0] == result.get("step"):
+            steps[-1][1].append(result["name"])
+        else:
+            steps.append((result.get("step"), [result["name"]]))
+    return [tuple(names) for _, names in steps]
+
+
+def _fingerprint(result: dict) -> tuple:
+    return (
+        str(result.get("output")),
+        tuple(str(call.get("observation")) for call in result.get("tool_calls", [])),
+    )
+
+
+def stalled_members(results: list, repeats: int = STALL_REPEATS) -> set:
+    """Members whose last `repeats` runs produced identical output and tool observations."""
+    runs = {}
+    for result in results:
+        runs.setdefault(result["name"], []).append(_fingerprint(result))
+    return {
+        name
+        for name, fingerprints in runs.items()
+        if len(fingerprints) >= repeats and len(set(fingerprints[-repeats:])) == 1
+    }
+
+
+def routing_cycle(results: list, repeats: int = LOOP_CYCLE_REPEATS, max_period: int = 3) -> Optional[list]:
+    """The cycle of steps the run ended with `repeats` times in a row, if any."""
+    steps = _steps(results)
+    for period in range(1, max_period + 1):
+        if len(steps) < period * repeats:
+            continue
+        cycle = steps[-period:]
+        if all(steps[-period * (i + 1):len(steps) - period * i] == cycle for i in range(repeats)):
+            return cycle
+    return None
+
+
+def guard_route(state, next_members: list, members: list, recursion_limit: int, step: int) -> Optional[dict]:
+    """
+    Check a routing decision against the results so far.
+
+    Args:
+        state (AgentState): The current graph state.
+        next_members (list): The members the supervisor decided to run next.
+        members (list): Members of the graph.
+        recursion_limit (int): Step budget of the run.
+        step (int): Current step.
+
+    Returns:
+        dict: None when the decision is fine, otherwise a state update with the corrected
+            "next", a corrective hint for the conversation and the steps saved, a lower
+            bound: the one round of the loop that was skipped. "next" is None when every
+            member of the decision repeats: the supervisor has to decide again.
+    """
+    results = state.get("results") or []
+    if next_members == ["FINISH"] or not results:
+        return None
+    stalled = stalled_members(results) & set(next_members)
+    cycle = routing_cycle(results)
+    looping = cycle is not None and tuple(next_members) == cycle[0]
+    if not stalled and not looping:
+        return None
+
+    repeating = sorted(stalled) if stalled else sorted({name for names in cycle for name in names})
+    # Members dispatched in parallel with the repeating ones still run
+    kept = [m for m in next_members if m not in repeating]
+    if kept:
+        forced = kept if len(kept) > 1 else kept[0]
+        # They run in the same step the repeating members would have run in
+        steps_saved = 0
+    else:
+        # Which member makes progress instead is for the supervisor model to judge, not
+        # the order of the members
+        forced = None
+        # One round of the loop (worker and supervisor steps); it might have gone on until
+        # the recursion limit, but that is not counted
+        steps_saved = 2 * (len(cycle) if looping else 1)
+    reason = (
+        f"{', '.join(repeating)} returned the same result {STALL_REPEATS} times in a row"
+        if stalled
+        else f"the steps {' -> '.join('+'.join(names) for names in cycle)} repeated"
+        f" {LOOP_CYCLE_REPEATS} times"
+    )
+    if kept:
+        outcome = f" continuing with {', '.join(kept)} only."
+    else:
+        outcome = " route to a member that makes progress instead, or FINISH."
+    hint = f"Routing loop detected: {reason}. Running it again won't change the outcome," + outcome
+    return {
+        "next": forced,
+        "messages": [HumanMessage(content=hint, name="supervisor")],
+        "loop_steps_saved": steps_saved,
+    }
@@ -0,0 +1,269 @@
+# Process-wide metrics and traces for graph runs.
+# Metrics are exported in the Prometheus text format (to a file or a /metrics endpoint),
+# finished spans are appended as JSON lines to TRACE_PATH when it is set.
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from constants import TRACE_PATH
+
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_DESCRIPTIONS = {
+    "graph_node_seconds": "Wall time of a graph node run.",
+    "tool_seconds": "Wall time of a tool call.",
+    "tool_errors_total": "Tool calls that raised.",
+    "llm_seconds": "Latency of a chat model call.",
+    "llm_prompt_tokens_total": "Prompt tokens sent to chat models.",
+    "llm_completion_tokens_total": "Completion tokens returned by chat models.",
+    "llm_errors_total": "Chat model calls that raised.",
+    "retries_total": "Retried calls, by source.",
+    "supervisor_routes_total": "Routing decisions of the supervisor, by next member and source.",
+    "tool_cache_hits_total": "Tool calls answered from the thread's memoized results.",
+    "tool_cache_misses_total": "Memoizable tool calls that ran.",
+    "loop_breaks_total": "Routing loops broken by the loop guard, by corrected next members.",
+    "loop_steps_saved_total": "Graph steps the loop guard saved, at least.",
+}
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value) -> str:
+    # Label values as the Prometheus text format requires them
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = [*key, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe counters and latency histograms keyed by name and labels."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        # (name, labels) -> [count per bucket..., overflow, sum, count]
+        self._histograms = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        with self._lock:
+            self._counters[(name, _label_key(labels))] += value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.setdefault(key, [0] * (len(self.buckets) + 3))
+            histogram[bisect_left(self.buckets, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(value)) for key, value in self._histograms.items())
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {_DESCRIPTIONS.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), histogram in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram[-2]:g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        with open(path, "w") as file:
+            file.write(self.to_prometheus())
+
+    def serve(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Expose /metrics for Prometheus scraping from a daemon thread."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+METRICS = MetricsRegistry()
+
+_trace_lock = threading.Lock()
+
+
+def record_span(name: str, kind: str, start: float, end: float, **attributes):
+    """Append a finished span to TRACE_PATH as a JSON line."""
+    if not TRACE_PATH:
+        return
+    span = {"name": name, "kind": kind, "start": start, "end": end, **attributes}
+    with _trace_lock, open(TRACE_PATH, "a") as file:
+        file.write(json.dumps(span, default=str) + "\n")
+
+
+def _usage(response) -> tuple:
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+
+def timed_node(name: str, func):
+    """Wrap a sync graph node so its wall time is recorded as `graph_node_seconds`."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        wall_start, start = time.time(), time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            METRICS.observe("graph_node_seconds", seconds, node=name)
+            record_span(name, "node", wall_start, wall_start + seconds)
+
+    return wrapper
+
+
+def atimed_node(name: str, afunc):
+    """Async counterpart of `timed_node`."""
+
+    @functools.wraps(afunc)
+    async def wrapper(*args, **kwargs):
+        wall_start, start = time.time(), time.perf_counter()
+        try:
+            return await afunc(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            METRICS.observe("graph_node_seconds", seconds, node=name)
+            record_span(name, "node", wall_start, wall_start + seconds)
+
+    return wrapper
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records tool calls and chat model calls (latency, tokens, errors, retries) into
+    `METRICS` and, when TRACE_PATH is set, as spans.
+    """
+
+    def __init__(self, registry: MetricsRegistry = METRICS):
+        self.registry = registry
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, name, kind, parent_run_id, **attributes):
+        with self._lock:
+            self._runs[run_id] = (name, kind, parent_run_id, time.time(), time.perf_counter(), attributes)
+
+    def _end(self, run_id, error=None, **extra):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        name, kind, parent_run_id, wall_start, start, attributes = run
+        seconds = time.perf_counter() - start
+        record_span(
+            name,
+            kind,
+            wall_start,
+            wall_start + seconds,
+            run_id=run_id,
+            parent_run_id=parent_run_id,
+            error=repr(error) if error else None,
+            **attributes,
+            **extra,
+        )
+        return name, attributes, seconds
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start(run_id, (serialized or {}).get("name") or kwargs.get("name", "tool"), "tool", parent_run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        ended = self._end(run_id)
+        if ended:
+            self.registry.observe("tool_seconds", ended[2], tool=ended[0])
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        ended = self._end(run_id, error)
+        if ended:
+            self.registry.observe("tool_seconds", ended[2], tool=ended[0])
+            self.registry.inc("tool_errors_total", tool=ended[0])
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        self._start(
+            run_id,
+            metadata.get("ls_model_name") or (serialized or {}).get("name", "chat_model"),
+            "llm",
+            parent_run_id,
+            provider=metadata.get("ls_provider"),
+            node=metadata.get("langgraph_node"),
+        )
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt_tokens, completion_tokens = _usage(response)
+        ended = self._end(run_id, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        if ended:
+            model, attributes, seconds = ended
+            labels = {"model": model, "node": attributes.get("node")}
+            self.registry.observe("llm_seconds", seconds, **labels)
+            self.registry.inc("llm_prompt_tokens_total", prompt_tokens, **labels)
+            self.registry.inc("llm_completion_tokens_total", completion_tokens, **labels)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        ended = self._end(run_id, error)
+        if ended:
+            self.registry.inc("llm_errors_total", model=ended[0], node=ended[1].get("node"))
+
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        self.registry.inc("retries_total", source="runnable")
+
+
+METRICS_HANDLER = MetricsCallbackHandler()
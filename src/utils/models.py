@@ -0,0 +1,344 @@
+# Model registry: one chat model per "provider[:model]" spec, all models of a provider
+# sharing a keep-alive HTTP connection pool, tiers of models that fail over to each other,
+# and optional pre-warming at startup.
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from functools import lru_cache
+
+import httpx
+from langchain_core.rate_limiters import InMemoryRateLimiter
+from langchain_core.runnables.fallbacks import RunnableWithFallbacks
+
+from constants import (
+    DEFAULT_MODELS,
+    HTTP_KEEPALIVE_SECONDS,
+    HTTP_MAX_CONNECTIONS,
+    MODEL_TIERS,
+    RATE_LIMITS,
+    TIER_LATENCY_THRESHOLDS,
+)
+from src.utils.llm_cache import get_llm_cache
+
+logger = logging.getLogger(__name__)
+
+# Hosts a pooled connection is opened to when models are pre-warmed
+_BASE_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "groq": "https://api.groq.com",
+}
+
+# Providers that can't be used without an API key
+_API_KEYS = {"openai": "OPENAI_API_KEY", "groq": "GROQ_API_KEY"}
+
+
+def parse_model_spec(spec: str) -> tuple:
+    """
+    Split a model spec into provider and model name.
+
+    Args:
+        spec (str): "provider" (its default model, see DEFAULT_MODELS) or "provider:model",
+            e.g. "groq" or "openai:gpt-4o-mini".
+
+    Returns:
+        tuple: (provider, model name).
+    """
+    provider, _, model_name = spec.partition(":")
+    if provider not in DEFAULT_MODELS:
+        raise ValueError(f"Unsupported model type: {provider}")
+    return provider, model_name or DEFAULT_MODELS[provider]
+
+
+@lru_cache(maxsize=4)
+def _get_rate_limiter(provider: str):
+    # One limiter per provider, shared by every agent and concurrent run in the process
+    requests_per_second = RATE_LIMITS.get(provider)
+    if not requests_per_second:
+        return None
+    return InMemoryRateLimiter(
+        requests_per_second=requests_per_second,
+        max_bucket_size=max(1, requests_per_second),
+    )
+
+
+def _request_deadline(request: httpx.Request):
+    # A client timeout only bounds each connect, write and read; the same value is used as
+    # the deadline of the whole request, so a slowly streamed response doesn't outlive it
+    timeout = request.extensions.get("timeout", {}).get("read")
+    return None if timeout is None else time.monotonic() + timeout
+
+
+def _deadline_exceeded(request: httpx.Request) -> httpx.ReadTimeout:
+    return httpx.ReadTimeout(
+        f"No complete response within {request.extensions['timeout']['read']}s", request=request
+    )
+
+
+class _DeadlineStream(httpx.SyncByteStream):
+    def __init__(self, stream, request: httpx.Request, deadline: float):
+        self._stream = stream
+        self._request = request
+        self._deadline = deadline
+
+    def __iter__(self):
+        for chunk in self._stream:
+            if time.monotonic() > self._deadline:
+                raise _deadline_exceeded(self._request)
+            yield chunk
+
+    def close(self):
+        self._stream.close()
+
+
+class _AsyncDeadlineStream(httpx.AsyncByteStream):
+    def __init__(self, stream, request: httpx.Request, deadline: float):
+        self._stream = stream
+        self._request = request
+        self._deadline = deadline
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            if time.monotonic() > self._deadline:
+                raise _deadline_exceeded(self._request)
+            yield chunk
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+
+class _DeadlineTransport(httpx.HTTPTransport):
+    """
+    Ends a request with a timeout once it has taken longer than that timeout in total.
+    The deadline is checked as chunks arrive, so a server that stops sending right before
+    it is still given one read timeout.
+    """
+
+    def handle_request(self, request):
+        deadline = _request_deadline(request)
+        response = super().handle_request(request)
+        if deadline is not None:
+            response.stream = _DeadlineStream(response.stream, request, deadline)
+        return response
+
+
+async def _close_with_loop(pool: httpx.AsyncHTTPTransport):
+    # Started in the pool's event loop, this generator is closed by the loop's
+    # shutdown_asyncgens (asyncio.run calls it), which closes the pool in that loop
+    try:
+        yield
+    finally:
+        await pool.aclose()
+
+
+class _AsyncDeadlineTransport(httpx.AsyncBaseTransport):
+    """
+    The async _DeadlineTransport, with one connection pool per event loop: connections
+    and their locks belong to the loop that opened them, and models are shared by runs in
+    different threads and asyncio.run calls. A loop's pool is closed when the loop shuts
+    down its async generators.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        # Event loop -> (pool, the generator closing it with the loop)
+        self._pools = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    async def _pool(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._pools.get(loop)
+        if entry is None:
+            pool = httpx.AsyncHTTPTransport(**self._kwargs)
+            closer = _close_with_loop(pool)
+            await closer.asend(None)
+            entry = (pool, closer)
+            with self._lock:
+                self._pools[loop] = entry
+        return entry[0]
+
+    async def handle_async_request(self, request):
+        deadline = _request_deadline(request)
+        response = await (await self._pool()).handle_async_request(request)
+        if deadline is not None:
+            response.stream = _AsyncDeadlineStream(response.stream, request, deadline)
+        return response
+
+    async def aclose(self):
+        with self._lock:
+            entry = self._pools.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
+
+
+@lru_cache(maxsize=4)
+def _http_clients(provider: str) -> tuple:
+    # One sync pool and one async pool per event loop for each provider, so connections
+    # (and their TLS sessions) are reused across agents, runs and threads instead of set
+    # up per client
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+    )
+    return (
+        httpx.Client(transport=_DeadlineTransport(limits=limits)),
+        httpx.AsyncClient(transport=_AsyncDeadlineTransport(limits=limits)),
+    )
+
+
+@lru_cache(maxsize=16)
+def _create_model(provider: str, model_name: str, timeout: float = None, max_retries: int = None):
+    common = {
+        "temperature": 0,
+        "cache": get_llm_cache(),
+        "rate_limiter": _get_rate_limiter(provider),
+    }
+    # A request taking longer than `timeout` in total fails (and falls back, in a tier)
+    # instead of waiting, see _DeadlineTransport
+    client_options = {
+        key: value
+        for key, value in (("timeout", timeout), ("max_retries", max_retries))
+        if value is not None
+    }
+    # Provider packages are imported here so that only the selected ones are ever loaded.
+    # Models stream so tokens reach callbacks as they are generated (ChatOllama always does)
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+
+        http_client, http_async_client = _http_clients(provider)
+        return ChatOpenAI(
+            model_name=model_name,
+            streaming=True,
+            # Streamed responses only carry token usage when it is asked for
+            stream_usage=True,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            **client_options,
+            **common,
+        )
+    if provider == "groq":
+        from langchain_groq import ChatGroq
+
+        http_client, http_async_client = _http_clients(provider)
+        return ChatGroq(
+            model=model_name,
+            streaming=True,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            **client_options,
+            **common,
+        )
+    # ChatOllama talks to a local server and doesn't take an HTTP client
+    from langchain_ollama.chat_models import ChatOllama
+
+    return ChatOllama(model=model_name, **common)
+
+
+@lru_cache(maxsize=1)
+def _fallback_errors() -> tuple:
+    # Rate limits, timeouts and unreachable servers move on to the next model of a tier;
+    # any other error (bad request, auth) is raised as is
+    errors = [TimeoutError, httpx.TimeoutException, httpx.ConnectError]
+    for package in ("openai", "groq"):
+        try:
+            module = __import__(package)
+        except ImportError:
+            continue
+        errors += [module.RateLimitError, module.APITimeoutError, module.APIConnectionError]
+    return tuple(errors)
+
+
+class _BufferedFallbacks(RunnableWithFallbacks):
+    """
+    Fallbacks that also apply to streamed calls. RunnableWithFallbacks only fails over on
+    errors raised before the first chunk, so a response that times out half way through
+    (see _DeadlineTransport) couldn't fall back; here stream and astream return the whole
+    response as one chunk. Tokens still reach the callbacks as they are generated, the
+    models stream internally (streaming=True).
+    """
+
+    def stream(self, input, config=None, **kwargs):
+        yield self.invoke(input, config, **kwargs)
+
+    async def astream(self, input, config=None, **kwargs):
+        yield await self.ainvoke(input, config, **kwargs)
+
+
+def _available(provider: str) -> bool:
+    return provider not in _API_KEYS or bool(os.getenv(_API_KEYS[provider]))
+
+
+@lru_cache(maxsize=4)
+def _create_tier(tier: str):
+    specs = [
+        spec for spec in MODEL_TIERS[tier] if _available(parse_model_spec(spec)[0])
+    ] or MODEL_TIERS[tier][:1]
+    timeout = TIER_LATENCY_THRESHOLDS.get(tier)
+    models = [
+        # Fail over right away, only the last model of the tier retries
+        _create_model(
+            *parse_model_spec(spec),
+            timeout=timeout,
+            max_retries=None if i == len(specs) - 1 else 0,
+        )
+        for i, spec in enumerate(specs)
+    ]
+    if len(models) == 1:
+        return models[0]
+    return _BufferedFallbacks(
+        runnable=models[0], fallbacks=models[1:], exceptions_to_handle=_fallback_errors()
+    )
+
+
+def get_model(spec: str):
+    """
+    The shared chat model for a spec, created on first use.
+
+    Args:
+        spec (str): "provider", "provider:model" or the name of a tier in MODEL_TIERS.
+
+    Returns:
+        BaseChatModel: The model, or for a tier its first available model with the
+            others as fallbacks.
+    """
+    if spec in MODEL_TIERS:
+        return _create_tier(spec)
+    return _create_model(*parse_model_spec(spec))
+
+
+def _warm(spec: str):
+    try:
+        get_model(spec)
+    except Exception as e:
+        logger.warning("Could not create model %s: %s", spec, e)
+        return
+    specs = MODEL_TIERS[spec] if spec in MODEL_TIERS else [spec]
+    for provider in dict.fromkeys(parse_model_spec(spec)[0] for spec in specs):
+        if provider not in _BASE_URLS or not _available(provider):
+            continue
+        try:
+            # Any response leaves an open connection in the pool for the first real call
+            _http_clients(provider)[0].head(_BASE_URLS[provider])
+        except httpx.HTTPError as e:
+            logger.warning("Could not pre-warm %s: %s", provider, e)
+
+
+def warm_models(specs) -> list:
+    """
+    Create the models for `specs` and open a pooled connection to each provider,
+    in background threads so that startup isn't delayed.
+
+    Returns:
+        list: The started threads.
+    """
+    threads = [
+        threading.Thread(target=_warm, args=(spec,), daemon=True)
+        for spec in sorted(set(specs))
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
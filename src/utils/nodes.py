@@ -1,36 +1,82 @@
+import functools
 from functools import lru_cache
-from langchain_openai import ChatOpenAI
-
-from langchain_ollama.chat_models import ChatOllama
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage
+from langchain_core.output_parsers.openai_functions import JsonOutputFunctionsParser
+from langchain_core.runnables.config import merge_configs
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 
-from main import AgentState
+from constants import BULKY_MESSAGE_TOKENS, RECURSION_LIMIT
+from src.utils.artifacts import describe, get_artifact_store, reference
+from src.utils.function_definition import function_def
+from src.utils.loop_guard import guard_route
+from src.utils.metrics import METRICS, METRICS_HANDLER
+from src.utils.models import get_model
+from src.utils.prompt import supervisor_prompt
+from src.utils.router import fast_path_route, next_members
+from src.utils.state import AgentState, estimate_tokens
 
 
-@lru_cache(maxsize=4)
-def _get_model(model_name: str):
-    if model_name == "openai":
-        model = ChatOpenAI(temperature=0, model_name="gpt-4o")
-    elif model_name == "ollama":
-        model = ChatOllama(temperature=0, model="llama3.1")
-    elif model_name == "groq":
-        model = ChatGroq(temperature=0, model="llama-3.1-70b-versatile")
-    else:
-        raise ValueError(f"Unsupported model type: {model_name}")
+def _summarize(value):
+    # Keep structured results as-is, only a prefix of text so the state stays small
+    if isinstance(value, (dict, list, bool)) or value is None:
+        return value
+    return str(value)[:200]
+
+
+def graph_step(config) -> int:
+    # Superstep of the running node, workers dispatched together share it
+    return ((config or {}).get("metadata") or {}).get("langgraph_step", 0)
+
 
-    return model
+def _node_update(result, name, step=0):
+    message = HumanMessage(content=result["output"], name=name)
+    artifacts = []
+    if estimate_tokens(message) > BULKY_MESSAGE_TOKENS:
+        # Bulky outputs (e.g. a whole PHP file) go to the artifact store, the
+        # conversation and the checkpoints only carry the handle
+        content = str(result["output"])
+        handle = get_artifact_store().put(content)
+        artifacts.append(describe(handle, content))
+        message = HumanMessage(content=reference(handle, content, f"{name} output"), name=name)
+    return {
+        "messages": [message],
+        "results": [
+            {
+                "name": name,
+                "step": step,
+                "output": _summarize(result["output"]),
+                "artifacts": artifacts,
+                "tool_calls": [
+                    {
+                        "tool": action.tool,
+                        "observation": _summarize(observation),
+                    }
+                    for action, observation in result.get("intermediate_steps", [])
+                ],
+            }
+        ],
+    }
 
 
-def agent_node(state, agent, name):
-    result = agent.invoke(state)
-    return {"messages": [HumanMessage(content=result["output"], name=name)]}
+def with_node_callbacks(config, callbacks=()):
+    # Metrics and node-specific handlers (e.g. StreamingFileWriter) on top of the run's callbacks
+    return merge_configs(config, {"callbacks": [*callbacks, METRICS_HANDLER]})
+
+
+def agent_node(state, agent, name, config=None, callbacks=()):
+    # Passing the config on lets token events reach graph-level callbacks and astream_events
+    result = agent.invoke(state, with_node_callbacks(config, callbacks))
+    return _node_update(result, name, graph_step(config))
+
+
+async def aagent_node(state, agent, name, config=None, callbacks=()):
+    result = await agent.ainvoke(state, with_node_callbacks(config, callbacks))
+    return _node_update(result, name, graph_step(config))
 
 
 def create_agent(
-    provider_name: str,
+    model_spec: str,
     system_prompt: str,
     tools: list = [],
     functions: list = [],
@@ -47,16 +93,122 @@ def create_agent(
             ]
         )
 
-    model = _get_model(provider_name)
-    if functions:
-        model.bind_functions(functions=functions)
-
-    agent = create_openai_tools_agent(model, tools, prompt)
+    # Extra function definitions are offered to the model next to the tools
+    agent = create_openai_tools_agent(get_model(model_spec), [*tools, *functions], prompt)
 
-    executor = AgentExecutor(agent=agent, tools=tools)
+    # Each step calls the model with invoke, not stream: only invoke goes through the LLM
+    # cache. The models are created with streaming=True, so tokens still reach the
+    # callbacks (token printer, streaming file writer) while they are generated
+    executor = AgentExecutor(
+        agent=agent, tools=tools, return_intermediate_steps=True, stream_runnable=False
+    )
     return executor
 
 
+class LazyAgent:
+    """Defers `create_agent` (and with it the model client) until the node first runs."""
+
+    def __init__(self, *args, **kwargs):
+        self._factory = functools.partial(create_agent, *args, **kwargs)
+        self._agent = None
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            self._agent = self._factory()
+        return self._agent
+
+    def invoke(self, *args, **kwargs):
+        return self.agent.invoke(*args, **kwargs)
+
+    async def ainvoke(self, *args, **kwargs):
+        return await self.agent.ainvoke(*args, **kwargs)
+
+
+@lru_cache(maxsize=4)
+def _get_supervisor_chain(model_spec: str):
+    return (
+        supervisor_prompt
+        | get_model(model_spec).bind_functions(
+            functions=[function_def],
+        )
+        | JsonOutputFunctionsParser()
+    )
+
+
+def _loop_guard(state, update, members, config):
+    return guard_route(
+        state,
+        next_members(update),
+        members,
+        (config or {}).get("recursion_limit", RECURSION_LIMIT),
+        graph_step(config),
+    )
+
+
+def _guarded(state, update, members, config):
+    # Loops and stalls are broken whichever way the decision was made
+    guarded = _loop_guard(state, update, members, config)
+    return update if guarded is None else {**update, **guarded}
+
+
+def _with_loop_note(state, update):
+    # The supervisor model decides again, with the loop guard's hint in the conversation
+    return {**state, "messages": [*state["messages"], *update["messages"]]}
+
+
+def _redecided(state, update, decision, members, config):
+    guarded = _loop_guard(state, decision, members, config)
+    # A second decision that only repeats as well ends the run
+    next_member = decision["next"] if guarded is None else guarded["next"] or "FINISH"
+    return {**update, "next": next_member}
+
+
+def _recorded(update, source):
+    if "loop_steps_saved" in update:
+        METRICS.inc("loop_breaks_total", forced="+".join(next_members(update)))
+        METRICS.inc("loop_steps_saved_total", update["loop_steps_saved"])
+    METRICS.inc(
+        "supervisor_routes_total", next="+".join(next_members(update)), source=source
+    )
+    return update
+
+
+def supervisor_node(state, model_spec, members, rules=(), config=None):
+    # Deterministic transitions are resolved from the worker results without an LLM call
+    next_member = fast_path_route(state, rules, members)
+    if next_member is not None:
+        update, source = {"next": next_member, "fast_path_hits": 1}, "fast_path"
+    else:
+        update = _get_supervisor_chain(model_spec).invoke(state, with_node_callbacks(config))
+        source = "llm"
+    update = _guarded(state, update, members, config)
+    if update["next"] is None:
+        decision = _get_supervisor_chain(model_spec).invoke(
+            _with_loop_note(state, update), with_node_callbacks(config)
+        )
+        update, source = _redecided(state, update, decision, members, config), "loop_guard"
+    return _recorded(update, source)
+
+
+async def asupervisor_node(state, model_spec, members, rules=(), config=None):
+    next_member = fast_path_route(state, rules, members)
+    if next_member is not None:
+        update, source = {"next": next_member, "fast_path_hits": 1}, "fast_path"
+    else:
+        update = await _get_supervisor_chain(model_spec).ainvoke(
+            state, with_node_callbacks(config)
+        )
+        source = "llm"
+    update = _guarded(state, update, members, config)
+    if update["next"] is None:
+        decision = await _get_supervisor_chain(model_spec).ainvoke(
+            _with_loop_note(state, update), with_node_callbacks(config)
+        )
+        update, source = _redecided(state, update, decision, members, config), "loop_guard"
+    return _recorded(update, source)
+
+
 def update_application_structure(state: AgentState, result):
     state.set_application_structure(
         {
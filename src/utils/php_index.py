@@ -0,0 +1,284 @@
+# Symbol index of a PHP source tree: classes, methods and functions with their line spans
+# and the names they call, routes, includes and embedded SQL. It is built once per tree,
+# persisted as JSON and updated incrementally (only files whose mtime or size changed are
+# parsed again), so agents can look up the code they need instead of reading whole files.
+import hashlib
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+
+from langchain_core.runnables import ensure_config
+
+from constants import PHP_INDEX_DIR
+from src.utils.common import atomic_write, code_only, line_number
+from src.utils.php_splitter import split_php
+
+_INCLUDE = re.compile(r"\b(?:include|require)(?:_once)?\b\s*\(?\s*([^;]+?)\s*\)?\s*;")
+_SQL = re.compile(r"^\s*(?:SELECT|INSERT|UPDATE|DELETE|REPLACE|CREATE|ALTER|DROP)\b", re.I)
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"", re.S)
+_CALL = re.compile(r"(?<![\w$])(?:(function\s+&?)|new\s+)?\\?([A-Za-z_][\w\\]*)\s*\(")
+# Language constructs that look like calls
+_NOT_CALLS = {
+    "array", "catch", "declare", "die", "echo", "elseif", "empty", "eval", "exit", "fn", "for",
+    "foreach", "function", "if", "include", "include_once", "isset", "list", "match", "print",
+    "require", "require_once", "return", "switch", "unset", "use", "while",
+}
+MAX_RESULTS = 50
+# Files marking the root directory of a PHP project
+_PROJECT_MARKERS = ("composer.json", ".git")
+
+
+def _calls(code: str) -> list:
+    names = {
+        match.group(2).rsplit("\\", 1)[-1]
+        for match in _CALL.finditer(code)
+        # Not the declarations of the function itself or of closures
+        if not match.group(1)
+    }
+    return sorted(names - _NOT_CALLS)
+
+
+def _join_routes(prefix, route):
+    if not route:
+        return None
+    path = "/" + "/".join(
+        part.strip("/") for part in ((prefix or {}).get("path", ""), route["path"]) if part.strip("/")
+    )
+    return {**route, "path": path}
+
+
+def index_source(source: str) -> dict:
+    """
+    Symbols of one PHP file.
+
+    Returns:
+        dict: "namespace", "uses", "includes", "sql" and "symbols"; every symbol (class,
+            method or function) has "kind", "name" ("Class::method" for methods), its
+            "start_line"/"end_line", and for methods and functions "params", "route" and
+            the names it "calls".
+    """
+    parsed = split_php(source)
+    code = code_only(source, "php")
+    symbols = []
+
+    def function_symbol(kind, name, function, class_route=None):
+        return {
+            "kind": kind,
+            "name": name,
+            "params": function["params"],
+            "route": _join_routes(class_route, function["route"]),
+            "start": function["start"],
+            "end": function["end"],
+            "start_line": line_number(source, function["start"]),
+            "end_line": line_number(source, function["end"]),
+            "calls": _calls(code[function["start"]:function["end"]]),
+        }
+
+    for php_class in parsed["classes"]:
+        symbols.append(
+            {
+                "kind": "class",
+                "name": php_class["name"],
+                "extends": php_class["extends"],
+                "route": php_class["route"],
+                "start": php_class["start"],
+                "end": php_class["end"],
+                "start_line": line_number(source, php_class["start"]),
+                "end_line": line_number(source, php_class["end"]),
+            }
+        )
+        for method in php_class["methods"]:
+            symbols.append(
+                function_symbol(
+                    "method", f"{php_class['name']}::{method['name']}", method, php_class["route"]
+                )
+            )
+    for function in parsed["functions"]:
+        symbols.append(function_symbol("function", function["name"], function))
+
+    def enclosing(offset):
+        inner = [s for s in symbols if s["kind"] != "class" and s["start"] <= offset < s["end"]]
+        return inner[0]["name"] if inner else None
+
+    without_comments = code_only(source, "php", strings=False)
+    sql = [
+        {"line": line_number(source, match.start()), "symbol": enclosing(match.start()), "query": match.group(0)[1:-1]}
+        for match in _STRING.finditer(without_comments)
+        if _SQL.match(match.group(0)[1:-1])
+    ]
+    includes = [
+        {"line": line_number(source, match.start()), "target": match.group(1)}
+        for match in _INCLUDE.finditer(without_comments)
+    ]
+    return {
+        "namespace": parsed["namespace"],
+        "uses": parsed["uses"],
+        "includes": includes,
+        "sql": sql,
+        "symbols": symbols,
+    }
+
+
+class PhpIndex:
+    """
+    Persistent symbol index of the PHP files under `root`.
+
+    Args:
+        root (str): Directory of the PHP project.
+        path (str): JSON file the index is kept in between runs.
+    """
+
+    def __init__(self, root: str, path: str):
+        self.root = os.path.abspath(root)
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as file:
+                self.files = json.load(file)
+        except (OSError, ValueError):
+            self.files = {}
+
+    def _scan(self) -> dict:
+        found = {}
+        for directory, subdirectories, names in os.walk(self.root):
+            subdirectories[:] = [d for d in subdirectories if d not in ("vendor", "node_modules", ".git")]
+            for name in names:
+                if name.endswith(".php"):
+                    path = os.path.join(directory, name)
+                    stat = os.stat(path)
+                    found[os.path.relpath(path, self.root)] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def update(self) -> dict:
+        """Parse new and modified files, drop deleted ones; returns the counts."""
+        with self._lock:
+            found = self._scan()
+            removed = [path for path in self.files if path not in found]
+            for path in removed:
+                del self.files[path]
+            parsed = 0
+            for path, (mtime, size) in found.items():
+                entry = self.files.get(path)
+                if entry and entry["mtime_ns"] == mtime and entry["size"] == size:
+                    continue
+                with open(os.path.join(self.root, path), encoding="utf-8", errors="replace") as file:
+                    self.files[path] = {"mtime_ns": mtime, "size": size, **index_source(file.read())}
+                parsed += 1
+            if parsed or removed:
+                self._save()
+            return {"files": len(self.files), "parsed": parsed, "removed": len(removed)}
+
+    def _save(self):
+        atomic_write(self.path, json.dumps(self.files))
+
+    def _symbols(self):
+        for path, entry in sorted(self.files.items()):
+            for symbol in entry["symbols"]:
+                yield path, symbol
+
+    def _location(self, path: str, symbol: dict) -> dict:
+        location = {
+            "kind": symbol["kind"],
+            "name": symbol["name"],
+            "file": os.path.join(self.root, path),
+            "lines": f"{symbol['start_line']}-{symbol['end_line']}",
+        }
+        for key in ("params", "route", "extends"):
+            if symbol.get(key):
+                location[key] = symbol[key]
+        return location
+
+    def find(self, name: str) -> list:
+        """Symbols named `name` ("Class", "Class::method", "method" or "function"), case-insensitive."""
+        name = name.strip().lower()
+        return [
+            self._location(path, symbol)
+            for path, symbol in self._symbols()
+            if symbol["name"].lower() == name or symbol["name"].lower().endswith("::" + name)
+        ][:MAX_RESULTS]
+
+    def source(self, name: str) -> list:
+        """The source of the methods and functions matching `name`, with their location."""
+        sources = []
+        for location in self.find(name):
+            if location["kind"] == "class":
+                continue
+            path = os.path.relpath(location["file"], self.root)
+            symbol = next(s for s in self.files[path]["symbols"] if s["name"] == location["name"])
+            with open(location["file"], encoding="utf-8", errors="replace") as file:
+                sources.append({**location, "source": file.read()[symbol["start"]:symbol["end"]]})
+        return sources
+
+    def callers(self, name: str) -> list:
+        """Methods and functions that call `name` (a function, method or class name)."""
+        name = name.strip().rsplit("::", 1)[-1].lower()
+        return [
+            self._location(path, symbol)
+            for path, symbol in self._symbols()
+            if name in (call.lower() for call in symbol.get("calls", ()))
+        ][:MAX_RESULTS]
+
+    def routes(self) -> list:
+        """Every routed method with its full path and HTTP methods."""
+        return [
+            self._location(path, symbol)
+            for path, symbol in self._symbols()
+            if symbol["kind"] != "class" and symbol.get("route")
+        ]
+
+    def outline(self, file_path: str) -> dict:
+        """Symbols, routes, includes and SQL statements of one file, without its code."""
+        path = os.path.relpath(os.path.abspath(file_path), self.root)
+        entry = self.files.get(path)
+        if entry is None:
+            raise FileNotFoundError(f"Not an indexed PHP file: {file_path}")
+        return {
+            "file": os.path.join(self.root, path),
+            "namespace": entry["namespace"],
+            "uses": entry["uses"],
+            "symbols": [self._location(path, symbol) for symbol in entry["symbols"]],
+            "includes": entry["includes"],
+            "sql": entry["sql"],
+        }
+
+
+@lru_cache(maxsize=8)
+def _get_index(root: str) -> PhpIndex:
+    digest = hashlib.sha256(root.encode("utf-8")).hexdigest()[:16]
+    return PhpIndex(root, os.path.join(PHP_INDEX_DIR, f"{digest}.json"))
+
+
+def php_project_root(file_path: str, source_root: str = None) -> str:
+    """
+    The root of the PHP project containing `file_path`: `source_root` (e.g. the directory
+    a batch migrates) when it contains the file, else the nearest directory above it with
+    a composer.json or .git, else the file's own directory.
+    """
+    file_path = os.path.abspath(file_path)
+    if source_root:
+        source_root = os.path.abspath(source_root)
+        if os.path.commonpath([source_root, file_path]) == source_root:
+            return source_root
+    directory = os.path.dirname(file_path)
+    while True:
+        if any(os.path.exists(os.path.join(directory, marker)) for marker in _PROJECT_MARKERS):
+            return directory
+        if directory == os.path.dirname(directory):
+            return os.path.dirname(file_path)
+        directory = os.path.dirname(directory)
+
+
+def get_php_index(path: str) -> PhpIndex:
+    """
+    The up to date index of the project containing `path`: a directory is taken as the
+    project root, for a file see php_project_root (the run's "php_root" setting is the
+    source root).
+    """
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        path = php_project_root(path, ensure_config().get("configurable", {}).get("php_root"))
+    index = _get_index(path)
+    index.update()
+    return index
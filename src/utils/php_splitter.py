@@ -0,0 +1,145 @@
+# Splits a PHP source file into class, method and route units so that large
+# controllers can be converted (and indexed) one method at a time.
+import re
+
+_NAMESPACE = re.compile(r"^\s*namespace\s+([\w\\]+)\s*;", re.M)
+_USE = re.compile(r"^\s*use\s+([\w\\]+)(?:\s+as\s+(\w+))?\s*;", re.M)
+_CLASS = re.compile(
+    r"(?P<docblock>/\*\*(?:(?!\*/).)*\*/\s*)?"
+    r"(?P<modifiers>(?:abstract|final)\s+)*class\s+(?P<name>\w+)"
+    r"(?:\s+extends\s+(?P<extends>[\w\\]+))?"
+    r"(?:\s+implements\s+(?P<implements>[\w\\,\s]+?))?\s*\{",
+    re.S,
+)
+_METHOD = re.compile(
+    r"(?P<docblock>/\*\*(?:(?!\*/).)*\*/\s*)?"
+    r"(?P<modifiers>(?:(?:public|protected|private|static|abstract|final)\s+)*)"
+    r"function\s+(?P<name>\w+)\s*\((?P<params>[^)]*)\)[^{;]*(?P<open>[{;])",
+    re.S,
+)
+_ROUTE = re.compile(r"@Route\(\s*\"(?P<path>[^\"]*)\"(?P<options>[^)]*(?:\([^)]*\)[^)]*)*)\)")
+_ROUTE_METHODS = re.compile(r"methods\s*=\s*\{([^}]*)\}")
+_ROUTE_NAME = re.compile(r"name\s*=\s*\"([^\"]*)\"")
+
+
+def _skip_string(source: str, i: int) -> int:
+    quote = source[i]
+    i += 1
+    while i < len(source) and source[i] != quote:
+        i += 2 if source[i] == "\\" else 1
+    return i + 1
+
+
+def find_block_end(source: str, open_index: int) -> int:
+    """
+    Index just past the "}" matching the "{" at `open_index`, skipping braces
+    inside strings and comments.
+    """
+    depth = 0
+    i = open_index
+    while i < len(source):
+        char = source[i]
+        if char in "'\"":
+            i = _skip_string(source, i)
+            continue
+        if source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            i = len(source) if end == -1 else end + 2
+            continue
+        if char == "#" or source.startswith("//", i):
+            end = source.find("\n", i)
+            i = len(source) if end == -1 else end + 1
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return len(source)
+
+
+def parse_route(docblock: str):
+    """The Symfony @Route annotation of a docblock as a dict, or None."""
+    match = _ROUTE.search(docblock or "")
+    if not match:
+        return None
+    methods = _ROUTE_METHODS.search(match.group("options"))
+    name = _ROUTE_NAME.search(match.group("options"))
+    return {
+        "path": match.group("path"),
+        "methods": re.findall(r"\"(\w+)\"", methods.group(1)) if methods else [],
+        "name": name.group(1) if name else None,
+    }
+
+
+def _functions(source: str, start: int, end: int) -> list:
+    # Function declarations in source[start:end], each with its body
+    functions = []
+    cursor = start
+    while True:
+        match = _METHOD.search(source, cursor, end)
+        if not match:
+            break
+        if match.group("open") == "{":
+            function_end = find_block_end(source, match.end() - 1)
+        else:
+            function_end = match.end()
+        functions.append(
+            {
+                "name": match.group("name"),
+                "params": match.group("params").strip(),
+                "route": parse_route(match.group("docblock")),
+                "start": match.start(),
+                "end": function_end,
+                "source": source[match.start():function_end].strip(),
+            }
+        )
+        cursor = function_end
+    return functions
+
+
+def split_php(source: str) -> dict:
+    """
+    Split PHP source into its namespace, imports, classes and methods.
+
+    Returns:
+        dict: {"namespace", "uses", "classes", "functions"}, where each class has "name",
+            "extends", "route" (class-level @Route prefix), "header" (source up to the first
+            method) and "methods"; each method, like each top-level function, has "name",
+            "params", "route", "start", "end" and "source" (docblock included).
+    """
+    namespace = _NAMESPACE.search(source)
+    result = {
+        "namespace": namespace.group(1) if namespace else None,
+        "uses": [use.group(1) for use in _USE.finditer(source)],
+        "classes": [],
+        "functions": [],
+    }
+
+    position = 0
+    while True:
+        class_match = _CLASS.search(source, position)
+        if not class_match:
+            break
+        body_start = class_match.end() - 1
+        body_end = find_block_end(source, body_start)
+        php_class = {
+            "name": class_match.group("name"),
+            "extends": class_match.group("extends"),
+            "route": parse_route(class_match.group("docblock")),
+            "start": class_match.start(),
+            "end": body_end,
+            "methods": _functions(source, body_start + 1, body_end),
+        }
+
+        first_method = php_class["methods"][0]["start"] if php_class["methods"] else body_end
+        php_class["header"] = source[class_match.start():first_method].rstrip()
+        result["classes"].append(php_class)
+        # Functions declared between classes (or before the first one)
+        result["functions"] += _functions(source, position, class_match.start())
+        position = body_end
+
+    result["functions"] += _functions(source, position, len(source))
+    return result
@@ -6,8 +6,9 @@ system_prompt = (
     "You are a supervisor tasked with managing a conversation between the"
     f" following workers:  {MEMBERS}. Given the following user request,"
     " respond with the worker to act next. Each worker will perform a"
-    " task and respond with their results and status. When status and result as finished,"
-    " respond with FINISH."
+    " task and respond with their results and status. Workers whose tasks don't depend on"
+    " each other's results can be selected together as a list, they run in parallel."
+    " When status and result as finished, respond with FINISH."
 )
 
 supervisor_prompt = ChatPromptTemplate.from_messages(
@@ -18,7 +19,7 @@ supervisor_prompt = ChatPromptTemplate.from_messages(
         (
             "system",
             "Given the conversation above, who should act next?"
-            f" Or should we FINISH? Select one of: {OPTIONS}",
+            f" Or should we FINISH? Select one of: {OPTIONS}, or a list of independent workers",
         ),
     ]
 ).partial(options=str(OPTIONS), members=", ".join(MEMBERS))
@@ -0,0 +1,184 @@
+# Deterministic routing rules that run before the LLM supervisor.
+# A rule takes the graph state and returns the next member (or "FINISH"), a list of
+# members that can run in parallel (an empty list: nothing more to do for this result),
+# or None when it can't decide and the LLM should be asked.
+from typing import Callable, Optional, Union
+
+
+def _last_result(state) -> Optional[dict]:
+    results = state.get("results") or []
+    return results[-1] if results else None
+
+
+def _has_run(state, name: str) -> bool:
+    return any(result["name"] == name for result in state.get("results") or [])
+
+
+def _tool_observations(result: dict, tool_name: str) -> list:
+    return [
+        call["observation"]
+        for call in result.get("tool_calls", [])
+        if call["tool"] == tool_name
+    ]
+
+
+def _task_mentions_php(state) -> bool:
+    messages = state.get("messages") or []
+    return bool(messages) and ".php" in str(messages[0].content)
+
+
+def dispatch_independent(state):
+    """Nothing ran yet: generate the project and read the PHP source at the same time."""
+    if state.get("results") or not _task_mentions_php(state):
+        return None
+    return ["Initialization", "File_reader"]
+
+
+def initialization_succeeded(state):
+    """Initialization generated (or found) the project -> Testing."""
+    last = _last_result(state)
+    if not last or last["name"] != "Initialization":
+        return None
+    observations = _tool_observations(last, "initialize_spring_boot_app")
+    if observations and all(observations):
+        return "Testing"
+    return None
+
+
+def testing_passed(state):
+    """The app starts: read the PHP source next, or finish once the controller is written."""
+    last = _last_result(state)
+    if not last or last["name"] != "Testing":
+        return None
+    observations = _tool_observations(last, "spring_boot_code_exists_test")
+    if not observations or not all(
+        isinstance(o, dict) and o.get("app_starts") for o in observations
+    ):
+        return None
+    if _has_run(state, "Controller_Writer"):
+        return "FINISH"
+    if not _task_mentions_php(state):
+        return None
+    if not _has_run(state, "File_reader"):
+        return "File_reader"
+    # The source was read in parallel with initialization, its own rule takes it from there
+    return []
+
+
+def file_read(state):
+    """File_reader returned the PHP source -> convert it (or write it directly)."""
+    last = _last_result(state)
+    if not last or last["name"] != "File_reader":
+        return None
+    observations = _tool_observations(last, "read_file_content")
+    if observations and all(observations):
+        return "Code_converter"
+    return None
+
+
+def code_converted(state):
+    """Code_converter produced Java code -> write it."""
+    last = _last_result(state)
+    if last and last["name"] == "Code_converter" and last["output"]:
+        return "Controller_Writer"
+    return None
+
+
+def _write_is_valid(observation) -> bool:
+    if isinstance(observation, dict):
+        return observation.get("validation", {}).get("valid", True)
+    return "Validation failed" not in str(observation)
+
+
+def controller_written(state):
+    """Controller_Writer wrote at least one file and the last write validated -> FINISH."""
+    last = _last_result(state)
+    if not last or last["name"] != "Controller_Writer":
+        return None
+    observations = _tool_observations(last, "write_controller_code") + _tool_observations(
+        last, "write_java_files"
+    )
+    if observations and _write_is_valid(observations[-1]):
+        return "FINISH"
+    return None
+
+
+DEFAULT_RULES = [
+    dispatch_independent,
+    initialization_succeeded,
+    testing_passed,
+    file_read,
+    code_converted,
+    controller_written,
+]
+
+
+def next_members(state) -> list:
+    """Nodes selected by the supervisor, as a list; ["FINISH"] when nothing is left to run."""
+    next_member = state["next"]
+    selected = next_member if isinstance(next_member, list) else [next_member]
+    selected = list(dict.fromkeys(m for m in selected if m != "FINISH"))
+    return selected or ["FINISH"]
+
+
+def _latest_step_views(state) -> list:
+    # One view per result of the last step, ending with that result, so every rule
+    # keeps looking at "the last result" when several workers ran in parallel
+    results = state.get("results") or []
+    if not results:
+        return [state]
+    step = results[-1].get("step")
+    return [
+        {**state, "results": results[: i + 1]}
+        for i, result in enumerate(results)
+        if result.get("step") == step
+    ]
+
+
+def _resolve(state, rules: list[Callable], members: list[str]) -> Optional[list]:
+    for rule in rules:
+        answer = rule(state)
+        if answer is None:
+            continue
+        answers = [
+            # No conversion step in this graph, the writer converts while writing
+            "Controller_Writer"
+            if next_member == "Code_converter" and "Code_converter" not in members
+            else next_member
+            for next_member in (answer if isinstance(answer, list) else [answer])
+        ]
+        if all(a == "FINISH" or a in members for a in answers):
+            return answers
+    return None
+
+
+def fast_path_route(
+    state, rules: list[Callable], members: list[str]
+) -> Optional[Union[str, list]]:
+    """
+    Resolve the next member(s) from the results of the last step.
+
+    Every worker that ran in the last step must be resolved by a rule, otherwise
+    the LLM supervisor decides. The answers are merged, FINISH only wins when
+    nothing else is left to run.
+
+    Args:
+        state (AgentState): The current graph state.
+        rules (list): Routing rules, tried in order.
+        members (list): Members present in the graph; answers outside of these are ignored.
+
+    Returns:
+        str | list: The next member, "FINISH", or a list of members to run in parallel;
+            None if the LLM supervisor has to decide.
+    """
+    selected = []
+    for view in _latest_step_views(state):
+        answers = _resolve(view, rules, members)
+        if answers is None:
+            return None
+        selected += [a for a in answers if a not in selected]
+    if len(selected) > 1:
+        selected = [a for a in selected if a != "FINISH"]
+    if not selected:
+        return None
+    return selected[0] if len(selected) == 1 else selected
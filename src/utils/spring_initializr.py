@@ -0,0 +1,220 @@
+# Spring Initializr client with an on-disk cache of project templates.
+# Archives are keyed by the server URL and the full parameter set, so a cache hit never
+# touches the network, and skeletons of a stand-in server are never taken for templates of
+# start.spring.io (they have no Maven wrapper).
+# In offline mode only the cache is used, and `serve` runs a local stand-in for
+# start.spring.io that answers from the cache or with a minimal generated skeleton.
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import httpx
+import requests
+
+from constants import (
+    SPRING_INITIALIZR_OFFLINE,
+    SPRING_INITIALIZR_URL,
+    SPRING_TEMPLATE_CACHE_DIR,
+)
+from src.utils.common import atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateNotCachedError(LookupError):
+    """Raised in offline mode when no cached template matches the parameters."""
+
+
+def initializr_params(
+    group_id,
+    artifact_id,
+    name,
+    description,
+    package_name,
+    dependencies,
+    java_version,
+    type,
+    language,
+    boot_version,
+    packaging,
+) -> dict:
+    return {
+        "type": type,
+        "language": language,
+        "bootVersion": boot_version,
+        "baseDir": artifact_id,
+        "groupId": group_id,
+        "artifactId": artifact_id,
+        "name": name,
+        "description": description,
+        "packageName": package_name,
+        "packaging": packaging,
+        "javaVersion": java_version,
+        "dependencies": ",".join(
+            sorted(d.strip() for d in str(dependencies).split(",") if d.strip())
+        ),
+    }
+
+
+def template_path(
+    params: dict, url: str = SPRING_INITIALIZR_URL, cache_dir: str = SPRING_TEMPLATE_CACHE_DIR
+) -> str:
+    key = hashlib.sha256(
+        json.dumps({"url": url, "params": params}, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return os.path.join(cache_dir, f"{key}.zip")
+
+
+def _cached_or_offline(params: dict, offline: bool):
+    path = template_path(params)
+    if os.path.exists(path):
+        return path
+    if offline:
+        raise TemplateNotCachedError(
+            f"No cached Spring Boot template for {params} in {SPRING_TEMPLATE_CACHE_DIR}"
+        )
+    return None
+
+
+def fetch_template(params: dict, offline: bool = SPRING_INITIALIZR_OFFLINE) -> str:
+    """
+    Return the path of the cached starter archive for `params`, downloading it on a miss.
+
+    Raises:
+        TemplateNotCachedError: In offline mode, if the template is not cached.
+        requests.exceptions.RequestException: If the request to Spring Initializr fails.
+    """
+    path = _cached_or_offline(params, offline)
+    if path:
+        return path
+    response = requests.get(SPRING_INITIALIZR_URL, params=params)
+    response.raise_for_status()
+    path = template_path(params)
+    # Written atomically so concurrent runs never see a partial archive
+    atomic_write(path, response.content)
+    return path
+
+
+async def afetch_template(params: dict, offline: bool = SPRING_INITIALIZR_OFFLINE) -> str:
+    path = _cached_or_offline(params, offline)
+    if path:
+        return path
+    async with httpx.AsyncClient(follow_redirects=True) as client:
+        response = await client.get(SPRING_INITIALIZR_URL, params=params)
+        response.raise_for_status()
+    path = template_path(params)
+    atomic_write(path, response.content)
+    return path
+
+
+def extract_template(archive_path: str, base_dir: str, artifact_id: str) -> str:
+    if not os.path.exists(base_dir):
+        os.makedirs(base_dir)
+
+    with zipfile.ZipFile(archive_path) as zip_ref:
+        zip_ref.extractall(base_dir)
+
+    project_path = os.path.join(base_dir, artifact_id)
+    logger.info("Spring Boot application generated at: %s", project_path)
+    return project_path
+
+
+def skeleton_archive(params: dict) -> bytes:
+    """Minimal Maven project for `params`, used by the stand-in server on a cache miss."""
+    artifact_id = params.get("artifactId", "demo")
+    package_name = params.get("packageName", f"com.example.{artifact_id}")
+    class_name = "".join(part.capitalize() for part in params.get("name", artifact_id).split()) + "Application"
+    starters = "".join(
+        "    <dependency>\n"
+        "      <groupId>org.springframework.boot</groupId>\n"
+        f"      <artifactId>spring-boot-starter-{dependency}</artifactId>\n"
+        "    </dependency>\n"
+        for dependency in filter(None, params.get("dependencies", "").split(","))
+    )
+    files = {
+        "pom.xml": (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<project xmlns="http://maven.apache.org/POM/4.0.0">\n'
+            "  <modelVersion>4.0.0</modelVersion>\n"
+            "  <parent>\n"
+            "    <groupId>org.springframework.boot</groupId>\n"
+            "    <artifactId>spring-boot-starter-parent</artifactId>\n"
+            f"    <version>{params.get('bootVersion', '3.3.3')}</version>\n"
+            "  </parent>\n"
+            f"  <groupId>{params.get('groupId', 'com.example')}</groupId>\n"
+            f"  <artifactId>{artifact_id}</artifactId>\n"
+            "  <version>0.0.1-SNAPSHOT</version>\n"
+            f"  <packaging>{params.get('packaging', 'jar')}</packaging>\n"
+            f"  <properties><java.version>{params.get('javaVersion', '17')}</java.version></properties>\n"
+            f"  <dependencies>\n{starters}  </dependencies>\n"
+            "  <build><plugins><plugin>\n"
+            "    <groupId>org.springframework.boot</groupId>\n"
+            "    <artifactId>spring-boot-maven-plugin</artifactId>\n"
+            "  </plugin></plugins></build>\n"
+            "</project>\n"
+        ),
+        f"src/main/java/{package_name.replace('.', '/')}/{class_name}.java": (
+            f"package {package_name};\n\n"
+            "import org.springframework.boot.SpringApplication;\n"
+            "import org.springframework.boot.autoconfigure.SpringBootApplication;\n\n"
+            "@SpringBootApplication\n"
+            f"public class {class_name} {{\n\n"
+            "    public static void main(String[] args) {\n"
+            f"        SpringApplication.run({class_name}.class, args);\n"
+            "    }\n"
+            "}\n"
+        ),
+        "src/main/resources/application.properties": f"spring.application.name={artifact_id}\n",
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        for path, content in files.items():
+            zip_ref.writestr(f"{artifact_id}/{path}", content)
+    return buffer.getvalue()
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/starter.zip":
+            self.send_error(404)
+            return
+        params = dict(parse_qsl(url.query))
+        path = template_path(params)
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                content = file.read()
+        else:
+            content = skeleton_archive(params)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765):
+    """
+    Run a local stand-in for start.spring.io. Point SPRING_INITIALIZR_URL at
+    http://<host>:<port>/starter.zip to use it.
+    """
+    server = ThreadingHTTPServer((host, port), _StandInHandler)
+    print(f"Spring Initializr stand-in listening on http://{host}:{port}/starter.zip")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Spring Initializr stand-in server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    serve(args.host, args.port)
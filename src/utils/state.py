@@ -1,7 +1,58 @@
-from langchain_core.messages import BaseMessage
-from typing import TypedDict, Annotated, Sequence
+from langchain_core.messages import BaseMessage, convert_to_messages
+from typing import TypedDict, Annotated, Sequence, Union
 import operator
 
+from constants import (
+    BULKY_MESSAGE_TOKENS,
+    KEEP_RECENT_MESSAGES,
+    MESSAGE_TOKEN_BUDGET,
+)
+from src.utils.artifacts import get_artifact_store, reference
+
+
+def estimate_tokens(message: BaseMessage) -> int:
+    # ~4 characters per token is close enough for budgeting English text and code
+    return len(str(message.content)) // 4 + 1
+
+
+def _collapse(message: BaseMessage) -> BaseMessage:
+    # The content stays readable through its artifact handle
+    content = str(message.content)
+    handle = get_artifact_store().put(content)
+    summary = reference(handle, content, f"{message.name or message.type} output", preview_lines=1)
+    return message.copy(update={"content": summary})
+
+
+def compact_messages(left, right):
+    """
+    Message reducer that keeps the history within MESSAGE_TOKEN_BUDGET.
+
+    Bulky messages (whole PHP files, generated Java classes) older than the last
+    KEEP_RECENT_MESSAGES are collapsed into their artifact handle, then the oldest
+    turns are dropped until the history fits. The first message, the task, is always kept.
+    """
+    messages = convert_to_messages(left) + convert_to_messages(right)
+    recent_start = max(1, len(messages) - KEEP_RECENT_MESSAGES)
+    messages = [
+        _collapse(message)
+        if 0 < i < recent_start and estimate_tokens(message) > BULKY_MESSAGE_TOKENS
+        else message
+        for i, message in enumerate(messages)
+    ]
+
+    total = sum(estimate_tokens(message) for message in messages)
+    while total > MESSAGE_TOKEN_BUDGET and len(messages) > 1 + KEEP_RECENT_MESSAGES:
+        total -= estimate_tokens(messages.pop(1))
+    return messages
+
+
+def merge_results(left: list, right: list) -> list:
+    """
+    Results reducer. Workers dispatched together finish in any order, so results are
+    kept sorted by (graph step, worker name) and a parallel step always reads the same.
+    """
+    return sorted(left + right, key=lambda result: (result.get("step", 0), result["name"]))
+
 
 # The agent state is the input to each node in the graph
 class AgentState(TypedDict):
@@ -10,10 +61,18 @@ class AgentState(TypedDict):
         self.messages = []
 
     # The annotation tells the graph that new messages will always
-    # be added to the current states
-    messages: Annotated[Sequence[BaseMessage], operator.add]
-    # The 'next' field indicates where to route to next
-    next: str
+    # be added to the current states, compacted to a token budget
+    messages: Annotated[Sequence[BaseMessage], compact_messages]
+    # The 'next' field indicates where to route to next: a member, FINISH,
+    # or a list of members that run in parallel
+    next: Union[str, list]
+    # Structured outcome of each worker run (name, output and the tools it called),
+    # used by the fast-path router instead of re-reading the conversation
+    results: Annotated[list, merge_results]
+    # Number of supervisor LLM calls the fast-path router avoided in this run
+    fast_path_hits: Annotated[int, operator.add]
+    # Steps the loop guard estimates it saved by breaking routing loops
+    loop_steps_saved: Annotated[int, operator.add]
 
     # agent_scratchpad: Annotated[Sequence[BaseMessage], operator.add]
     def set_application_structure(self, structure):
@@ -0,0 +1,372 @@
+# Token-level streaming out of the worker nodes: a console printer for the CLI and a
+# handler that writes code straight to disk while a write tool call is being generated.
+import functools
+import hashlib
+import json
+import os
+import sys
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.utils.workspace import WorkspaceQuotaError, check_quota, resolve_path
+
+# Chat model providers (their ls_provider) that stream the arguments of a tool call as
+# they are generated. langchain-groq sends the whole response of a request with tools as
+# one chunk once it is complete, and ChatOllama has no tool calling here, so streaming
+# to disk would only add a rename for them
+STREAMED_TOOL_ARGS_PROVIDERS = frozenset({"openai"})
+
+# Absolute path -> sha256 of content fully streamed into "<path>.partial"
+_completed_partials = {}
+_partials_lock = threading.Lock()
+
+
+def partial_path(file_path: str) -> str:
+    return f"{file_path}.partial"
+
+
+def streamed_partial(file_path: str, content: str):
+    """
+    The path of the streamed "<file_path>.partial" if it holds exactly `content`, to be
+    renamed into place by the caller; otherwise the partial file is removed.
+
+    Returns:
+        str: The partial file's path, or None if the caller still has to write the file.
+    """
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    with _partials_lock:
+        streamed_digest = _completed_partials.pop(os.path.abspath(file_path), None)
+    if streamed_digest == digest:
+        return partial_path(file_path)
+    discard_partial(file_path)
+    return None
+
+
+def promote_partial(file_path: str, content: str) -> bool:
+    """
+    Move the streamed "<file_path>.partial" into place if it holds exactly `content`.
+
+    Returns:
+        bool: True if the file was promoted, False if the caller still has to write it.
+    """
+    partial = streamed_partial(file_path, content)
+    if partial is None:
+        return False
+    os.replace(partial, file_path)
+    return True
+
+
+def discard_partial(file_path: str):
+    with _partials_lock:
+        _completed_partials.pop(os.path.abspath(file_path), None)
+    if os.path.exists(partial_path(file_path)):
+        os.remove(partial_path(file_path))
+
+
+class _ArgStringDecoder:
+    """
+    Incrementally decodes the string values of a streamed JSON object, those of nested
+    objects included, calling `on_value(keys, text, done)` with each decoded fragment;
+    `keys` leads to the value, e.g. ("java_code",) or ("files", "<path>").
+    """
+
+    def __init__(self, on_value):
+        self.on_value = on_value
+        self.state = "outside"
+        # Keys of the nested objects the decoder is in
+        self.keys = []
+        self.key = None
+        self.buffer = []
+        self.escape = None
+        # Arrays are skipped: bracket depth, and whether a string in one is open
+        self.depth = 0
+        self.in_string = False
+
+    def feed(self, text: str):
+        for char in text:
+            if self.state == "outside":
+                if char == '"':
+                    self.state, self.buffer = "key", []
+                elif char == "}" and self.keys:
+                    self.keys.pop()
+            elif self.state == "key":
+                self._feed_string(char, self._on_key)
+            elif self.state == "colon":
+                if char == '"':
+                    self.state = "value"
+                elif char == "{":
+                    self.keys.append(self.key)
+                    self.state = "outside"
+                elif char == "[":
+                    self.state, self.depth = "array", 1
+                elif char in ",}":
+                    # The end of a number, true, false or null
+                    self.state = "outside"
+                    if char == "}" and self.keys:
+                        self.keys.pop()
+            elif self.state == "value":
+                self._feed_string(char, self._on_value)
+            elif self.state == "array":
+                self._skip(char)
+
+    def _feed_string(self, char: str, emit):
+        if self.escape is not None:
+            self.escape += char
+            if self.escape[0] != "u" or len(self.escape) == 5:
+                emit(json.loads(f'"\\{self.escape}"'), False)
+                self.escape = None
+        elif char == "\\":
+            self.escape = ""
+        elif char == '"':
+            emit("", True)
+        else:
+            emit(char, False)
+
+    def _on_key(self, text: str, done: bool):
+        self.buffer.append(text)
+        if done:
+            self.key, self.state = "".join(self.buffer), "colon"
+
+    def _on_value(self, text: str, done: bool):
+        self.on_value((*self.keys, self.key), text, done)
+        if done:
+            self.state = "outside"
+
+    def _skip(self, char: str):
+        if self.in_string:
+            if self.escape is not None:
+                self.escape = None
+            elif char == "\\":
+                self.escape = ""
+            elif char == '"':
+                self.in_string = False
+        elif char == '"':
+            self.in_string = True
+        elif char in "[{":
+            self.depth += 1
+        elif char in "]}":
+            self.depth -= 1
+            if self.depth == 0:
+                self.state = "outside"
+
+
+class _StreamedFile:
+    """One file of a write tool call, streamed into "<path>.partial"."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.pending = []
+        self.written = 0
+        self.digest = hashlib.sha256()
+        directory = os.path.dirname(file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.file = open(partial_path(file_path), "w", encoding="utf-8")
+
+    def write(self, text: str):
+        self.pending.append(text)
+
+    def flush(self) -> bool:
+        """Write the pending text; False (and the partial file removed) when over quota."""
+        if self.file.closed or not self.pending:
+            return not self.file.closed
+        text = "".join(self.pending)
+        self.pending = []
+        data = text.encode("utf-8")
+        try:
+            check_quota({partial_path(self.file_path): self.written + len(data)})
+        except WorkspaceQuotaError:
+            # The tool writes the file itself and reports the error
+            self.file.close()
+            discard_partial(self.file_path)
+            return False
+        self.file.write(text)
+        self.file.flush()
+        self.written += len(data)
+        self.digest.update(data)
+        return True
+
+    def close(self, complete=False):
+        if self.file.closed:
+            return
+        if complete and not self.flush():
+            return
+        self.file.close()
+        if complete:
+            with _partials_lock:
+                _completed_partials[os.path.abspath(self.file_path)] = self.digest.hexdigest()
+
+
+class _StreamedCall:
+    """
+    The files of one write tool call: the `content_key` argument, written to the path in
+    the `path_key` argument, or with `files_key` every entry (path -> content) of that
+    object argument.
+    """
+
+    def __init__(self, resolve, path_key=None, content_key=None, files_key=None):
+        self.resolve = resolve
+        self.path_key = path_key
+        self.content_key = content_key
+        self.files_key = files_key
+        self.decoder = _ArgStringDecoder(self.on_value)
+        # Value keys -> _StreamedFile, or None when the file isn't streamed
+        self.files = {}
+        self.path = []
+        # Content that arrives before the path argument
+        self.pending = []
+
+    def _open(self, file_path: str):
+        try:
+            file_path = self.resolve(file_path)
+        except PermissionError:
+            # The tool call itself reports the error, nothing is streamed
+            return None
+        return _StreamedFile(file_path)
+
+    def on_value(self, keys, text, done):
+        if self.files_key is not None:
+            if len(keys) != 2 or keys[0] != self.files_key:
+                return
+            if keys not in self.files:
+                self.files[keys] = self._open(keys[1])
+            stream = self.files[keys]
+        elif keys == (self.path_key,):
+            self.path.append(text)
+            if done:
+                stream = self.files[keys] = self._open("".join(self.path))
+                if stream is not None:
+                    stream.write("".join(self.pending))
+                self.pending = None
+            return
+        elif keys == (self.content_key,):
+            stream = self.files.get((self.path_key,))
+            if stream is None and self.pending is not None:
+                self.pending.append(text)
+                return
+        else:
+            return
+        if stream is None:
+            return
+        stream.write(text)
+        if done:
+            stream.close(complete=True)
+
+    def feed(self, text: str):
+        self.decoder.feed(text)
+        # One quota check and disk write per token, not per character
+        for keys, stream in self.files.items():
+            if stream is not None and not stream.flush():
+                self.files[keys] = None
+
+    def close(self):
+        for stream in self.files.values():
+            if stream is not None:
+                stream.close()
+
+
+class StreamingFileWriter(BaseCallbackHandler):
+    """
+    Writes the content of a write tool call to "<path>.partial" while the model is still
+    generating it. The tool then only renames the finished file. Models of other
+    providers are ignored, the tool writes their files itself. Partial files count
+    towards the workspace quota; a file going over it is no longer streamed.
+
+    Args:
+        tool_name (str): Name of the write tool to follow.
+        path_key (str): Tool argument holding the target path.
+        content_key (str): Tool argument holding the file content.
+        files_key (str): Tool argument mapping paths to file contents, for tools writing
+            several files (path_key and content_key are then not used).
+        providers (Iterable[str]): Providers whose tool call arguments are streamed.
+    """
+
+    def __init__(
+        self,
+        tool_name: str = "write_controller_code",
+        path_key: str = "file_path",
+        content_key: str = "java_code",
+        files_key: str = None,
+        providers=STREAMED_TOOL_ARGS_PROVIDERS,
+    ):
+        self.tool_name = tool_name
+        self.path_key = path_key
+        self.content_key = content_key
+        self.files_key = files_key
+        self.providers = frozenset(providers)
+        # (llm run id, tool call index) -> _StreamedCall
+        self._streams = {}
+        # llm run id -> metadata of the run (thread_id, workspace) to resolve paths with,
+        # for the runs of streaming providers only
+        self._metadata = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        if (metadata or {}).get("ls_provider") not in self.providers:
+            return
+        with self._lock:
+            self._metadata[run_id] = metadata
+
+    def on_llm_new_token(self, token, *, chunk=None, run_id=None, **kwargs):
+        if run_id not in self._metadata:
+            return
+        message = getattr(chunk, "message", None)
+        for tool_call_chunk in getattr(message, "tool_call_chunks", None) or []:
+            key = (run_id, tool_call_chunk.get("index"))
+            with self._lock:
+                stream = self._streams.get(key)
+                if stream is None:
+                    if tool_call_chunk.get("name") != self.tool_name:
+                        continue
+                    stream = self._streams[key] = _StreamedCall(
+                        functools.partial(resolve_path, configurable=self._metadata[run_id]),
+                        self.path_key,
+                        self.content_key,
+                        self.files_key,
+                    )
+            stream.feed(tool_call_chunk.get("args") or "")
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        self._close(run_id)
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        self._close(run_id)
+
+    def _close(self, run_id):
+        with self._lock:
+            self._metadata.pop(run_id, None)
+            keys = [key for key in self._streams if key[0] == run_id]
+            streams = [self._streams.pop(key) for key in keys]
+        for stream in streams:
+            stream.close()
+
+
+class TokenPrinter(BaseCallbackHandler):
+    """Prints model tokens as they arrive, prefixed by the graph node producing them."""
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self._nodes = {}
+        self._current = None
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._nodes[run_id] = (metadata or {}).get("langgraph_node", "llm")
+
+    def on_llm_new_token(self, token, *, chunk=None, run_id=None, **kwargs):
+        message = getattr(chunk, "message", None)
+        text = token or "".join(
+            tool_call_chunk.get("args") or ""
+            for tool_call_chunk in getattr(message, "tool_call_chunks", None) or []
+        )
+        if not text:
+            return
+        node = self._nodes.get(run_id, "llm")
+        if node != self._current:
+            self.stream.write(f"\n[{node}] ")
+            self._current = node
+        self.stream.write(text)
+        self.stream.flush()
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        self._nodes.pop(run_id, None)
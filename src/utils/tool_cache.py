@@ -0,0 +1,143 @@
+# Tool results memoized within one graph thread: a repeated call with the same arguments
+# returns the earlier result as long as the files it depends on are unchanged (same mtime
+# and size). Write tools invalidate the entries depending on the files they touch, so a
+# re-routed Testing step only rebuilds and restarts the app when something was written.
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from langchain_core.runnables import ensure_config
+
+from src.utils.common import is_within
+from src.utils.metrics import METRICS
+
+# Directories that don't affect a tool result (hidden ones are skipped too)
+_IGNORED_DIRS = {"target", "build", "node_modules", "vendor"}
+
+
+def _fingerprint(path: str):
+    # (mtime, size) of a file, or a digest of those of every file under a directory
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    digest = hashlib.sha256()
+    for directory, subdirectories, names in os.walk(path):
+        subdirectories[:] = sorted(
+            d for d in subdirectories if d not in _IGNORED_DIRS and not d.startswith(".")
+        )
+        for name in sorted(names):
+            file_path = os.path.join(directory, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            digest.update(f"{os.path.relpath(file_path, path)}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode())
+    return digest.hexdigest()
+
+
+def current_thread_id():
+    """The thread_id of the graph run the caller executes in, or None outside of one."""
+    return ensure_config().get("configurable", {}).get("thread_id")
+
+
+class ToolResultCache:
+    """
+    LRU cache of tool results keyed by graph thread, tool and arguments. Each entry keeps
+    the paths it depends on and their fingerprints from before the call; it is only
+    returned while they still match.
+
+    Args:
+        max_entries (int): Entries kept across all threads.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        paths, fingerprints, result = entry
+        if [_fingerprint(path) for path in paths] != fingerprints:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        return entry
+
+    def put(self, key: tuple, paths: list, fingerprints: list, result):
+        with self._lock:
+            self._entries[key] = (paths, fingerprints, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, paths):
+        """Drop every entry depending on one of `paths`, on a directory containing one, or inside one."""
+        paths = [os.path.abspath(path) for path in paths]
+        with self._lock:
+            for key in [
+                key
+                for key, (dependencies, _, _) in self._entries.items()
+                if any(is_within(d, p) or is_within(p, d) for d in dependencies for p in paths)
+            ]:
+                del self._entries[key]
+
+    def clear_thread(self, thread_id: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == thread_id]:
+                del self._entries[key]
+
+
+TOOL_CACHE = ToolResultCache()
+
+
+def memoize_in_thread(dependencies, cacheable=None):
+    """
+    Memoize a tool function per graph thread.
+
+    Args:
+        dependencies (Callable): Takes the call's arguments and returns the files or
+            directories the result depends on.
+        cacheable (Callable): Takes a result and returns whether it may be reused, e.g.
+            not after a timeout; by default every result is.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            thread_id = current_thread_id()
+            if thread_id is None:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (thread_id, func.__name__, json.dumps(bound.arguments, sort_keys=True, default=str))
+            entry = TOOL_CACHE.get(key)
+            if entry is not None:
+                METRICS.inc("tool_cache_hits_total", tool=func.__name__)
+                return entry[2]
+            METRICS.inc("tool_cache_misses_total", tool=func.__name__)
+            paths = [os.path.abspath(path) for path in dependencies(**bound.arguments)]
+            # Fingerprinted before the call, so a change made while it runs is a miss next time
+            fingerprints = [_fingerprint(path) for path in paths]
+            result = func(*args, **kwargs)
+            if cacheable is None or cacheable(result):
+                TOOL_CACHE.put(key, paths, fingerprints, result)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -1,22 +1,95 @@
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
+from typing import Dict
+import asyncio
+import hashlib
+import httpx
 import requests
 import os
-import zipfile
-import io
-import shutil
-import subprocess
 import stat
 import logging
-import signal
+from functools import lru_cache
+
+from src.utils.artifacts import get_artifact_store
+from src.utils.common import stage_file
+from src.utils.java_validator import validate_java_files
+from src.utils.php_index import get_php_index
+from src.utils.spring_initializr import (
+    afetch_template,
+    fetch_template,
+    initializr_params,
+)
+from src.utils.streaming import discard_partial, promote_partial, streamed_partial
+from src.utils.tool_cache import TOOL_CACHE, memoize_in_thread
+from src.utils.verification import verify_project
+from src.utils.workspace import check_quota, extract_project, resolve_path
+
+logger = logging.getLogger(__name__)
+
+
+def tool_with_async(coroutine=None):
+    """
+    Like `@tool`, with `coroutine` as the `ainvoke` implementation. By default `ainvoke`
+    runs the decorated function in a worker thread, so it doesn't block the event loop.
+    """
+
+    def decorator(func):
+        async def run_in_thread(*args, **kwargs):
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+        return StructuredTool.from_function(func=func, coroutine=coroutine or run_in_thread)
 
+    return decorator
+
+
+# ainvoke of initialize_spring_boot_app: downloads the template without blocking the event loop
+async def _ainitialize_spring_boot_app(
+    group_id: str,
+    artifact_id: str,
+    name: str,
+    description: str,
+    package_name: str,
+    dependencies: str,
+    java_version: str,
+    type: str,
+    language: str,
+    boot_version: str,
+    packaging: str,
+    base_dir: str,
+):
+    base_dir = resolve_path(base_dir)
+    try:
+        existing = _existing_project(base_dir, artifact_id)
 
-from langchain_community.tools.tavily_search import TavilySearchResults
+        if existing:
+            return existing
+        else:
+            archive_path = await afetch_template(
+                initializr_params(
+                    group_id=group_id,
+                    artifact_id=artifact_id,
+                    name=name,
+                    description=description,
+                    package_name=package_name,
+                    dependencies=dependencies,
+                    java_version=java_version,
+                    type=type,
+                    language=language,
+                    boot_version=boot_version,
+                    packaging=packaging,
+                )
+            )
+            project_path = await asyncio.to_thread(
+                extract_project, archive_path, base_dir, artifact_id
+            )
+            TOOL_CACHE.invalidate([os.path.join(base_dir, artifact_id)])
+            return project_path
 
-tavily_tool = TavilySearchResults(max_results=5)
-logging.basicConfig(level=logging.INFO, filename="execution.log", filemode="w")
+    except httpx.HTTPError as e:
+        logger.error("Error generating Spring Boot application: %s", e)
+        raise
 
 
-@tool
+@tool_with_async(_ainitialize_spring_boot_app)
 def initialize_spring_boot_app(
     group_id: str,
     artifact_id: str,
@@ -36,8 +109,13 @@ def initialize_spring_boot_app(
     Returns:
         The path to the generated Spring Boot project.
 
+    The project template is served from the on-disk template cache when one with the same
+    parameters was downloaded before. When the run has its own workspace, `base_dir` is
+    mapped into it: use the returned path for the files of the project.
+
     Raises:
         requests.exceptions.RequestException: If the request to Spring Initializr fails.
+        TemplateNotCachedError: In offline mode, if no matching template is cached.
 
     Example:
         project_path = create_spring_boot_app(
@@ -56,64 +134,57 @@ def initialize_spring_boot_app(
         )
         print(f"Project created at: {project_path}")
     """
+    # The project goes into the workspace of the run, see src/utils/workspace.py
+    base_dir = resolve_path(base_dir)
     try:
-        directory_exists = os.path.exists("./generated_spring_app")
-
-        if directory_exists:
-            return {
-                "next": "supervisor",
-                "project_path": "./generated_spring_app/myapp",
-                "key_files": [os.path.join("./generated_spring_app/myapp", "pom.xml")],
-            }
+        existing = _existing_project(base_dir, artifact_id)
+
+        if existing:
+            return existing
         else:
-            spring_initialize_url = (
-                f"https://start.spring.io/starter.zip?type={type}&language={language}&bootVersion={boot_version}"
-                f"&baseDir={artifact_id}&groupId={group_id}&artifactId={artifact_id}&name={name}"
-                f"&description={description}&packageName={package_name}&packaging={packaging}"
-                f"&javaVersion={java_version}&dependencies={dependencies}"
+            archive_path = fetch_template(
+                initializr_params(
+                    group_id=group_id,
+                    artifact_id=artifact_id,
+                    name=name,
+                    description=description,
+                    package_name=package_name,
+                    dependencies=dependencies,
+                    java_version=java_version,
+                    type=type,
+                    language=language,
+                    boot_version=boot_version,
+                    packaging=packaging,
+                )
             )
-            response = requests.get(spring_initialize_url)
-            response.raise_for_status()
-
-            if not os.path.exists(base_dir):
-                os.makedirs(base_dir)
-
-            with zipfile.ZipFile(io.BytesIO(response.content)) as zip_ref:
-                zip_ref.extractall(base_dir)
-
-            project_path = os.path.join(base_dir, artifact_id)
-            print(f"Spring Boot application generated at: {project_path}")
+            project_path = extract_project(archive_path, base_dir, artifact_id)
+            TOOL_CACHE.invalidate([os.path.join(base_dir, artifact_id)])
             return project_path
 
     except requests.exceptions.RequestException as e:
-        print(f"Error generating Spring Boot application: {e}")
+        logger.error("Error generating Spring Boot application: %s", e)
         raise
 
 
-@tool
-def spring_boot_code_exists_test(project_path="./generated_spring_app/myapp"):
-    """
-    Run basic tests on the initialized Spring Boot application to ensure it was generated correctly.
+def _existing_project(base_dir: str, artifact_id: str):
+    project_path = os.path.join(base_dir, artifact_id)
+    pom_path = os.path.join(project_path, "pom.xml")
+    if os.path.exists(pom_path):
+        return {
+            "next": "supervisor",
+            "project_path": project_path,
+            "key_files": [pom_path],
+        }
+    return None
 
-    Args:
-        project_path (str): The path to the generated Spring Boot project.
-
-    Returns:
-        dict: A dictionary containing the results of the tests (e.g., whether the application starts up, key files exist).
-
-    Example:
-        test_results = spring_boot_code_exists_test(project_path='./generated_spring_app/myapp')
-        print(test_results)
-    """
 
+def _check_project_files(project_path: str) -> dict:
     test_results = {
         "project_exists": False,
         "mvnw_exists": False,
         "pom_exists": False,
         "app_starts": False,
     }
-    project_path = "./generated_spring_app/myapp"
-    print(">>>>>>project_path", project_path)
 
     # Check if the project directory exists
     if os.path.exists(project_path):
@@ -133,47 +204,49 @@ def spring_boot_code_exists_test(project_path="./generated_spring_app/myapp"):
         if os.path.exists(pom_path):
             test_results["pom_exists"] = True
 
-        # Try to start the Spring Boot application
-        try:
-            process = subprocess.Popen(
-                ["./mvnw", "spring-boot:run"],
-                cwd=project_path,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,  # Ensures the output is in text format
-            )
+    return test_results
+
+
+# Repeated checks in a thread reuse the last result while the project is unchanged;
+# timed out checks and projects that don't exist yet are checked again
+@tool_with_async()
+@memoize_in_thread(
+    lambda project_path: [resolve_path(project_path)],
+    cacheable=lambda result: result["pom_exists"] and not result.get("timed_out"),
+)
+def spring_boot_code_exists_test(project_path: str):
+    """
+    Run basic tests on the initialized Spring Boot application to ensure it was generated correctly.
 
-            # Monitor the output for successful start
-            for stdout_line in iter(process.stdout.readline, ""):
-                logging.info(stdout_line.strip())
-                print(stdout_line.strip())
-                if "Started MyAppApplication" in stdout_line:
-                    test_results["app_starts"] = True
-                    break
-
-            # Terminate the application gracefully if it started
-            if test_results["app_starts"]:
-                process.send_signal(
-                    signal.SIGINT
-                )  # Send SIGINT to stop the application
-
-            # Wait for the process to terminate
-            process.stdout.close()
-            process.stderr.close()
-            process.wait()
-
-        except subprocess.CalledProcessError as e:
-            print(f"Error starting Spring Boot application: {e}")
-            test_results["app_starts"] = False
-
-        print("Status of testing:", test_results)
+    Only the Java files changed since the previous check are compiled, and the app is started
+    from the compiled classes, so repeated checks on the same project are fast. Checking a
+    project again before any of its files changed returns the previous result right away.
+
+    Args:
+        project_path (str): The path to the generated Spring Boot project.
+
+    Returns:
+        dict: A dictionary containing the results of the tests (e.g., whether the application starts up, key files exist),
+            plus "compiled", "compile_errors", "changed_files", "timed_out" and the tail of the application log.
+
+    Example:
+        test_results = spring_boot_code_exists_test(project_path='./generated_spring_app/myapp')
+        print(test_results)
+    """
+    project_path = resolve_path(project_path)
+    test_results = _check_project_files(project_path)
+
+    if test_results["project_exists"] and test_results["pom_exists"]:
+        test_results.update(verify_project(project_path))
+        logger.info("Status of testing: %s", test_results)
     else:
-        print(f"Project directory {project_path} does not exist.")
+        logger.warning("Project directory %s does not exist.", project_path)
 
     return test_results
 
 
-@tool
+@tool_with_async()
+@memoize_in_thread(lambda file_path: [resolve_path(file_path, strict=False)])
 def read_file_content(file_path: str):
     """
     Read the content of a file from the given path.
@@ -188,6 +261,8 @@ def read_file_content(file_path: str):
         FileNotFoundError: If the file at the given path does not exist.
         IOError: If an I/O error occurs while reading the file.
     """
+    # Generated files are read from the run's workspace, PHP sources where they are
+    file_path = resolve_path(file_path, strict=False)
     try:
         with open(file_path, "r", encoding="utf-8") as file:
             content = file.read()
@@ -198,17 +273,29 @@ def read_file_content(file_path: str):
         raise IOError(f"Error reading file {file_path}: {e}")
 
 
-@tool
+def _is_unchanged(file_path: str, content: str) -> bool:
+    # Rewriting identical content would only bump the mtime and force a recompile
+    try:
+        with open(file_path, "rb") as file:
+            current = file.read()
+    except OSError:
+        return False
+    return hashlib.sha256(current).digest() == hashlib.sha256(content.encode("utf-8")).digest()
+
+
+@tool_with_async()
 def write_controller_code(file_path: str, java_code: str):
     """
     Write the given Java controller code to the specified file.
 
     Args:
         file_path (str): The path where the Java controller file should be created.
-        java_code (str): The Java controller code to be written to the file.
+        java_code (str): The Java controller code to be written to the file, or the
+            artifact handle ("artifact:...") of the code.
 
     Returns:
-        str: A message indicating the success of the operation.
+        str: A message indicating the success of the operation, followed by the errors
+            found when the written file was checked (structure, and javac when available).
 
     Example:
         write_controller_code(
@@ -216,19 +303,186 @@ def write_controller_code(file_path: str, java_code: str):
             java_code='public class MyController { ... }'
         )
     """
-    # Ensure the directory exists
-    directory = os.path.dirname(file_path)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
+    file_path = resolve_path(file_path)
+    java_code = get_artifact_store().resolve(java_code)
+    if _is_unchanged(file_path, java_code):
+        discard_partial(file_path)
+        message = f"Java controller code is already up to date in {file_path}"
+    # Already written while the model was generating it, see StreamingFileWriter
+    elif promote_partial(file_path, java_code):
+        message = f"Java controller code has been written to {file_path}"
+    else:
+        check_quota({file_path: len(java_code.encode("utf-8"))})
+        os.replace(stage_file(file_path, java_code), file_path)
+        message = f"Java controller code has been written to {file_path}"
+
+    TOOL_CACHE.invalidate([file_path])
+    validation = validate_java_files([file_path])
+    if not validation["valid"]:
+        errors = validation["structural_errors"] + validation["compile_errors"]
+        message += f"\nValidation failed, fix these errors and write the file again: {errors}"
+    return message
+
+
+@tool_with_async()
+def write_java_files(files: Dict[str, str]):
+    """
+    Write several Java files in one call. Files that already hold exactly the given
+    content are left untouched, the others are replaced atomically.
+
+    Args:
+        files (dict): Maps the path of each Java file to its complete source code, or to
+            the artifact handle ("artifact:...") of the source.
+
+    Returns:
+        dict: "changed" lists the files that were written, "unchanged" the files skipped
+            because their content was identical, and "validation" the result of checking
+            all of them (structure, and one javac run when available): when its "valid"
+            is false, fix the reported errors and write the files again.
+
+    Example:
+        write_java_files(files={
+            './generated_spring_app/myapp/src/main/java/com/example/myapp/controller/MyController.java': 'package ...',
+            './generated_spring_app/myapp/src/main/java/com/example/myapp/service/MyService.java': 'package ...',
+        })
+    """
+    store = get_artifact_store()
+    files = {resolve_path(path): store.resolve(content) for path, content in files.items()}
+    changed = [path for path in sorted(files) if not _is_unchanged(path, files[path])]
+    # Files already written while the model was generating them only need the rename,
+    # see StreamingFileWriter
+    staged = {}
+    for path in sorted(files):
+        partial = streamed_partial(path, files[path]) if path in changed else None
+        if partial is None:
+            discard_partial(path)
+        else:
+            staged[path] = partial
+    check_quota(
+        {path: len(files[path].encode("utf-8")) for path in changed if path not in staged}
+    )
+    # Every file is staged before any is renamed into place, so a failure while
+    # writing leaves the project as it was
+    try:
+        for path in changed:
+            if path not in staged:
+                staged[path] = stage_file(path, files[path])
+    except OSError:
+        for temp_path in staged.values():
+            os.remove(temp_path)
+        raise
+    for path, temp_path in staged.items():
+        os.replace(temp_path, path)
+    TOOL_CACHE.invalidate(changed)
+    return {
+        "changed": changed,
+        "unchanged": [path for path in sorted(files) if path not in staged],
+        "validation": validate_java_files(sorted(files)),
+    }
+
+
+@tool_with_async()
+def read_artifact(handle: str):
+    """
+    Read the content stored under an artifact handle, e.g. a PHP source or a generated
+    Java class referenced in the conversation.
+
+    Args:
+        handle (str): The artifact handle, "artifact:" followed by 20 hex digits.
+
+    Returns:
+        str: The stored content.
+    """
+    return get_artifact_store().get(handle)
+
+
+@tool_with_async()
+def find_php_symbol(project_path: str, name: str):
+    """
+    Find PHP classes, methods and functions by name in the indexed PHP project.
+
+    Args:
+        project_path (str): The PHP project directory, or a PHP file of the project.
+        name (str): "ClassName", "ClassName::method", or a method or function name.
+
+    Returns:
+        list: The matching symbols with their kind, file, line range, parameters and route.
+    """
+    return get_php_index(project_path).find(name)
+
+
+@tool_with_async()
+def get_php_method(project_path: str, name: str):
+    """
+    Get the source code of a PHP method or function, without reading the whole file.
+
+    Args:
+        project_path (str): The PHP project directory, or a PHP file of the project.
+        name (str): "ClassName::method", or a method or function name.
+
+    Returns:
+        list: The matching methods with their location and source (docblock included).
+    """
+    return get_php_index(project_path).source(name)
+
+
+@tool_with_async()
+def find_php_callers(project_path: str, name: str):
+    """
+    Find the PHP methods and functions that call a function, a method or a class constructor.
+
+    Args:
+        project_path (str): The PHP project directory, or a PHP file of the project.
+        name (str): The called function, method ("ClassName::method" or "method") or class name.
+
+    Returns:
+        list: The calling methods and functions with their file and line range.
+    """
+    return get_php_index(project_path).callers(name)
+
+
+@tool_with_async()
+def list_php_routes(project_path: str):
+    """
+    List the routed PHP controller methods of the project.
+
+    Args:
+        project_path (str): The PHP project directory, or a PHP file of the project.
+
+    Returns:
+        list: The routed methods with their full route path, HTTP methods, file and lines.
+    """
+    return get_php_index(project_path).routes()
+
+
+@tool_with_async()
+def php_file_outline(file_path: str):
+    """
+    Outline a PHP file without its code: namespace, imports, classes, methods and functions
+    with their line ranges and routes, included files and embedded SQL statements.
+
+    Args:
+        file_path (str): The path of the PHP file.
+
+    Returns:
+        dict: The outline of the file.
+    """
+    return get_php_index(file_path).outline(file_path)
+
 
-    # Write the Java code to the file
-    with open(file_path, "w") as file:
-        file.write(java_code)
+# Symbol lookups of the PHP index, for agents that only need parts of the PHP code
+PHP_INDEX_TOOLS = [
+    php_file_outline,
+    find_php_symbol,
+    get_php_method,
+    find_php_callers,
+    list_php_routes,
+]
 
-    return f"Java controller code has been written to {file_path}"
 
+@lru_cache(maxsize=1)
+def get_tavily_tool():
+    # Imported and built on first use: the wrapper validates TAVILY_API_KEY on construction
+    from langchain_community.tools.tavily_search import TavilySearchResults
 
-@tool()
-def default_tool():
-    """Default tool"""
-    pass
+    return TavilySearchResults(max_results=5)
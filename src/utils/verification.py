@@ -0,0 +1,270 @@
+# Verification of generated Spring Boot projects without a cold `mvnw spring-boot:run` per check.
+# Maven is only used to resolve the dependency classpath, once per workspace (through the
+# warm `mvnd` daemon when it is installed), after which changed sources are compiled with a
+# single javac call and the app is started directly from target/classes, on a port of its own.
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+
+from constants import MAVEN_OFFLINE, MAVEN_REPO_LOCAL, VERIFY_DEADLINE_SECONDS
+from src.utils.app_runner import run_until_ready
+from src.utils.java_validator import _JAVAC_ERROR, structural_errors
+
+_STARTED = re.compile(r"Started \w+ in [\d.]+ seconds")
+
+
+def _maven_command(project_path: str) -> list:
+    if shutil.which("mvnd"):
+        command = ["mvnd"]
+    elif os.path.exists(os.path.join(project_path, "mvnw")):
+        command = ["./mvnw"]
+    else:
+        command = ["mvn"]
+    if MAVEN_OFFLINE:
+        command.append("-o")
+    if MAVEN_REPO_LOCAL:
+        command.append(f"-Dmaven.repo.local={os.path.expanduser(MAVEN_REPO_LOCAL)}")
+    return command + ["-q", "-B"]
+
+
+def _remaining(deadline: float) -> float:
+    return max(0.0, deadline - time.monotonic())
+
+
+class BuildWorkspace:
+    """
+    Warm build state for one project: the resolved classpath and the modification
+    times of the sources as of the last successful compile.
+    """
+
+    def __init__(self, project_path: str):
+        self.project_path = os.path.abspath(project_path)
+        self.classes_dir = os.path.join(self.project_path, "target", "classes")
+        self.classpath_file = os.path.join(self.project_path, "target", "classpath.txt")
+        self.lock = threading.Lock()
+        self._classpath = None
+        self._pom_mtime = None
+        self._compiled = {}
+
+    def _source_files(self) -> dict:
+        sources = {}
+        for root, _, files in os.walk(os.path.join(self.project_path, "src", "main", "java")):
+            for file_name in files:
+                if file_name.endswith(".java"):
+                    path = os.path.join(root, file_name)
+                    sources[path] = os.stat(path).st_mtime_ns
+        return sources
+
+    def classpath(self, deadline: float) -> str:
+        """Dependency classpath, resolved again only when pom.xml changes."""
+        pom_mtime = os.stat(os.path.join(self.project_path, "pom.xml")).st_mtime_ns
+        if self._classpath is not None and pom_mtime == self._pom_mtime:
+            return self._classpath
+        if not (
+            os.path.exists(self.classpath_file)
+            and os.stat(self.classpath_file).st_mtime_ns > pom_mtime
+        ):
+            subprocess.run(
+                _maven_command(self.project_path)
+                + [
+                    "dependency:build-classpath",
+                    # The widest scope: runtime leaves out provided dependencies (Lombok,
+                    # the servlet API), which javac and the directly started app need
+                    "-Dmdep.includeScope=test",
+                    f"-Dmdep.outputFile={self.classpath_file}",
+                ],
+                cwd=self.project_path,
+                check=True,
+                capture_output=True,
+                timeout=_remaining(deadline),
+            )
+            # Every source has to be compiled against the new classpath
+            self._compiled = {}
+        with open(self.classpath_file) as file:
+            self._classpath = file.read().strip()
+        self._pom_mtime = pom_mtime
+        return self._classpath
+
+    def cached_classpath(self):
+        """The dependency classpath if it was already resolved, without running Maven."""
+        if self._classpath is not None:
+            return self._classpath
+        pom = os.path.join(self.project_path, "pom.xml")
+        if (
+            os.path.exists(pom)
+            and os.path.exists(self.classpath_file)
+            and os.stat(self.classpath_file).st_mtime_ns > os.stat(pom).st_mtime_ns
+        ):
+            with open(self.classpath_file) as file:
+                return file.read().strip()
+        return None
+
+    def _remove_classes(self, source_path: str):
+        # The .class files of a deleted source, nested classes included; sources are laid
+        # out by package, so their output mirrors the path under src/main/java
+        relative = os.path.relpath(source_path, os.path.join(self.project_path, "src", "main", "java"))
+        directory = os.path.join(self.classes_dir, os.path.dirname(relative))
+        name = os.path.splitext(os.path.basename(relative))[0]
+        if not os.path.isdir(directory):
+            return
+        for file_name in os.listdir(directory):
+            if file_name == f"{name}.class" or (
+                file_name.startswith(f"{name}$") and file_name.endswith(".class")
+            ):
+                os.remove(os.path.join(directory, file_name))
+
+    def _dependents(self, sources: dict, paths: list) -> list:
+        # Sources naming one of the classes of `paths`, which have to be compiled again as
+        # a changed signature (or a removed class) can break them
+        names = {os.path.splitext(os.path.basename(path))[0] for path in paths}
+        if not names:
+            return []
+        reference = re.compile(r"\b(?:" + "|".join(map(re.escape, sorted(names))) + r")\b")
+        dependents = []
+        for path in sources:
+            if path in paths:
+                continue
+            with open(path, encoding="utf-8", errors="replace") as file:
+                if reference.search(file.read()):
+                    dependents.append(path)
+        return dependents
+
+    def compile_changed(self, deadline: float) -> dict:
+        """
+        Compile the sources modified since the last successful compile, and the sources
+        referencing them, in one javac call. The classes of deleted sources are removed.
+        """
+        sources = self._source_files()
+        if not self._compiled:
+            # Everything is compiled, so the output of sources deleted before this process
+            # (or compiled against an older classpath) goes too
+            shutil.rmtree(self.classes_dir, ignore_errors=True)
+        removed = sorted(path for path in self._compiled if path not in sources)
+        for path in removed:
+            self._remove_classes(path)
+            del self._compiled[path]
+        changed = sorted(
+            path for path, mtime in sources.items() if self._compiled.get(path) != mtime
+        )
+        result = {"compiled": True, "changed_files": changed, "compile_errors": []}
+        if not changed and not removed:
+            return result
+        to_compile = sorted(set(changed) | set(self._dependents(sources, changed + removed)))
+        if not to_compile:
+            return result
+        # Compiled again next time unless this compile succeeds
+        for path in to_compile:
+            self._compiled.pop(path, None)
+
+        # Malformed files are reported without resolving the classpath or running javac
+        errors = []
+        for path in to_compile:
+            with open(path, encoding="utf-8") as file:
+                errors += structural_errors(path, file.read())
+        if errors:
+            result.update(compiled=False, compile_errors=errors)
+            return result
+
+        os.makedirs(self.classes_dir, exist_ok=True)
+        process = subprocess.run(
+            [
+                "javac",
+                "-nowarn",
+                "-parameters",
+                "-d",
+                self.classes_dir,
+                "-cp",
+                os.pathsep.join([self.classes_dir, self.classpath(deadline)]),
+                "-sourcepath",
+                os.path.join(self.project_path, "src", "main", "java"),
+            ]
+            + to_compile,
+            capture_output=True,
+            text=True,
+            timeout=_remaining(deadline),
+        )
+        if process.returncode != 0:
+            result["compiled"] = False
+            result["compile_errors"] = [
+                match.groupdict()
+                for match in map(_JAVAC_ERROR.match, process.stderr.splitlines())
+                if match
+            ] or [{"message": process.stderr.strip()[-2000:]}]
+            return result
+
+        self._compiled.update({path: sources[path] for path in to_compile})
+        return result
+
+    def main_class(self):
+        for path in self._source_files():
+            with open(path, encoding="utf-8") as file:
+                source = file.read()
+            if "@SpringBootApplication" in source:
+                package = re.search(r"^\s*package\s+([\w.]+)\s*;", source, re.M)
+                name = os.path.splitext(os.path.basename(path))[0]
+                return f"{package.group(1)}.{name}" if package else name
+        return None
+
+    def start_app(self, deadline: float) -> dict:
+        """Start the compiled app on a free port and wait until it is ready, see app_runner."""
+        main_class = self.main_class()
+        if main_class is None:
+            return {"app_starts": False, "error": "No @SpringBootApplication class found"}
+
+        classpath = os.pathsep.join(
+            [
+                self.classes_dir,
+                os.path.join(self.project_path, "src", "main", "resources"),
+                self.classpath(deadline),
+            ]
+        )
+        result = run_until_ready(
+            lambda port: ["java", "-cp", classpath, main_class, f"--server.port={port}"],
+            _STARTED,
+            deadline,
+            cwd=self.project_path,
+        )
+        result["app_starts"] = result.pop("started")
+        return result
+
+
+_workspaces = {}
+_workspaces_lock = threading.Lock()
+
+
+def get_build_workspace(project_path: str) -> BuildWorkspace:
+    key = os.path.abspath(project_path)
+    with _workspaces_lock:
+        if key not in _workspaces:
+            _workspaces[key] = BuildWorkspace(key)
+        return _workspaces[key]
+
+
+def verify_project(project_path: str, deadline_seconds: float = VERIFY_DEADLINE_SECONDS) -> dict:
+    """
+    Compile the changed sources of `project_path` and check that the app starts.
+
+    Returns:
+        dict: "compiled", "changed_files", "compile_errors", "app_starts", "timed_out",
+            "log_tail" and "seconds", plus the "port" and "exit_code" of the app when it was
+            started. A run never takes longer than `deadline_seconds`.
+    """
+    start = time.monotonic()
+    deadline = start + deadline_seconds
+    workspace = get_build_workspace(project_path)
+    result = {"app_starts": False, "timed_out": False}
+    with workspace.lock:
+        try:
+            result.update(workspace.compile_changed(deadline))
+            if result["compiled"]:
+                result.update(workspace.start_app(deadline))
+        except subprocess.TimeoutExpired:
+            result["timed_out"] = True
+        except (subprocess.CalledProcessError, OSError) as e:
+            result["compiled"] = False
+            result["compile_errors"] = [{"message": str(e)}]
+    result["seconds"] = round(time.monotonic() - start, 3)
+    return result
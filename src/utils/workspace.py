@@ -0,0 +1,366 @@
+# Per-thread workspaces, so concurrent graph threads (e.g. on the LangGraph server) never
+# share a generated project, its Maven target or its running app. A run either names its
+# workspace in config["configurable"]["workspace"] (the CLI and batch pass their base
+# directory), or gets one under WORKSPACE_ROOT for its thread_id. Tools resolve every
+# project path they are given against the workspace of the run they execute in.
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from functools import lru_cache
+
+from langchain_core.runnables import ensure_config
+
+from constants import (
+    DEFAULT_BASE_DIR,
+    WORKSPACE_MAX_ACTIVE,
+    WORKSPACE_MAX_BYTES,
+    WORKSPACE_POOL_SIZE,
+    WORKSPACE_IDLE_SECONDS,
+    WORKSPACE_ROOT,
+    WORKSPACE_TTL_SECONDS,
+)
+from src.utils.common import is_within
+from src.utils.spring_initializr import extract_template
+
+logger = logging.getLogger(__name__)
+
+_LAST_USED = ".last_used"
+_POOL = ".pool"
+# Left out of quotas and when a workspace is merged into another project
+_BUILD_OUTPUT = {"target", "build", "node_modules"}
+_merge_lock = threading.Lock()
+# Expired workspaces are looked for at most this often, when a workspace is acquired
+_CLEANUP_INTERVAL_SECONDS = 300
+# A workspace's size is measured again after this long, in between writes are added to it
+_SIZE_RESCAN_SECONDS = 60
+
+
+class WorkspaceQuotaError(RuntimeError):
+    """Raised when no workspace can be created, or a workspace outgrows its disk quota."""
+
+
+def _size(path: str) -> int:
+    total = 0
+    for directory, subdirectories, names in os.walk(path):
+        subdirectories[:] = [d for d in subdirectories if d not in _BUILD_OUTPUT]
+        for name in names:
+            try:
+                total += os.lstat(os.path.join(directory, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+class WorkspaceManager:
+    """
+    Workspaces of graph threads under `root`, one directory per thread, plus a pool of
+    extracted project templates that new projects are moved from instead of extracted.
+
+    Args:
+        root (str): Directory holding the workspaces.
+        max_active (int): Workspaces that may exist at once; expired ones are removed to
+            make room.
+        max_bytes (int): Disk quota of one workspace (0 = unlimited).
+        ttl_seconds (float): Workspaces unused for longer are removed by `cleanup`, which
+            runs every few minutes when a workspace is acquired.
+        idle_seconds (float): When `max_active` workspaces exist, the least recently used
+            one unused for longer is removed to make room for a new one.
+        pool_size (int): Extracted templates kept ready per template.
+    """
+
+    def __init__(
+        self,
+        root: str = WORKSPACE_ROOT,
+        max_active: int = WORKSPACE_MAX_ACTIVE,
+        max_bytes: int = WORKSPACE_MAX_BYTES,
+        ttl_seconds: float = WORKSPACE_TTL_SECONDS,
+        idle_seconds: float = WORKSPACE_IDLE_SECONDS,
+        pool_size: int = WORKSPACE_POOL_SIZE,
+    ):
+        self.root = os.path.abspath(root)
+        self.max_active = max_active
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.idle_seconds = idle_seconds
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._refilling = set()
+        self._last_cleanup = 0.0
+        # Workspace path -> (bytes used, time.monotonic() of the last full measurement)
+        self._sizes = {}
+
+    def path(self, thread_id: str) -> str:
+        # Readable and collision free, whatever characters the thread id contains
+        name = re.sub(r"[^\w.-]", "_", thread_id)[:64]
+        digest = hashlib.sha256(thread_id.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.root, f"{name}-{digest}")
+
+    def _workspaces(self) -> list:
+        if not os.path.isdir(self.root):
+            return []
+        return [
+            os.path.join(self.root, name)
+            for name in os.listdir(self.root)
+            if not name.startswith(".") and os.path.isdir(os.path.join(self.root, name))
+        ]
+
+    def acquire(self, thread_id: str) -> str:
+        """The workspace of `thread_id`, created on first use."""
+        path = self.path(thread_id)
+        with self._lock:
+            if time.monotonic() - self._last_cleanup > _CLEANUP_INTERVAL_SECONDS:
+                self._cleanup()
+            if not os.path.isdir(path):
+                if len(self._workspaces()) >= self.max_active:
+                    self._evict_idle()
+                if len(self._workspaces()) >= self.max_active:
+                    raise WorkspaceQuotaError(
+                        f"{self.max_active} workspaces are in use (WORKSPACE_MAX_ACTIVE),"
+                        " release one or wait for them to become idle"
+                    )
+                os.makedirs(path)
+            # Marks the workspace as in use for the expiry; every tool call of a run
+            # resolves its paths through here, so a running thread's workspace stays fresh
+            with open(os.path.join(path, _LAST_USED), "a"):
+                os.utime(os.path.join(path, _LAST_USED))
+        return path
+
+    def _remove(self, path: str):
+        shutil.rmtree(path, ignore_errors=True)
+        self._sizes.pop(path, None)
+
+    def release(self, thread_id: str):
+        """Remove the workspace of `thread_id`."""
+        with self._lock:
+            self._remove(self.path(thread_id))
+
+    def _last_used(self, path: str) -> float:
+        try:
+            return os.stat(os.path.join(path, _LAST_USED)).st_mtime
+        except OSError:
+            return os.stat(path).st_mtime
+
+    def _cleanup(self) -> list:
+        self._last_cleanup = time.monotonic()
+        expired = []
+        for path in self._workspaces():
+            if time.time() - self._last_used(path) > self.ttl_seconds:
+                self._remove(path)
+                expired.append(path)
+        return expired
+
+    def _evict_idle(self):
+        # Room for one more: the least recently used workspace, if it has been idle long enough
+        idle = sorted(
+            (self._last_used(path), path)
+            for path in self._workspaces()
+            if time.time() - self._last_used(path) > self.idle_seconds
+        )
+        if idle:
+            logger.warning("Removing idle workspace %s to make room for a new one", idle[0][1])
+            self._remove(idle[0][1])
+
+    def cleanup(self) -> list:
+        """Remove the workspaces unused for longer than the TTL; returns their paths."""
+        with self._lock:
+            return self._cleanup()
+
+    def check_quota(self, writes: dict):
+        """
+        Raise WorkspaceQuotaError when writing `writes` (file path -> new size in bytes)
+        would take the managed workspace containing them over quota. Build output isn't
+        counted; the size is measured once a minute and kept up to date with the writes
+        checked in between.
+        """
+        if not self.max_bytes or not writes:
+            return
+        paths = {os.path.abspath(path): size for path, size in writes.items()}
+        first = next(iter(paths))
+        if not is_within(self.root, first) or first == self.root:
+            return
+        workspace = os.path.join(self.root, os.path.relpath(first, self.root).split(os.sep)[0])
+        with self._lock:
+            size, measured = self._sizes.get(workspace, (None, 0.0))
+            if size is None or time.monotonic() - measured > _SIZE_RESCAN_SECONDS:
+                size, measured = _size(workspace), time.monotonic()
+            for path, new_size in paths.items():
+                try:
+                    size += new_size - os.lstat(path).st_size
+                except OSError:
+                    size += new_size
+            if size > self.max_bytes:
+                raise WorkspaceQuotaError(
+                    f"Workspace {workspace} would use {size} bytes, over its {self.max_bytes}"
+                    " bytes quota (WORKSPACE_MAX_BYTES)"
+                )
+            self._sizes[workspace] = (size, measured)
+
+    def _pool_dir(self, archive_path: str) -> str:
+        return os.path.join(self.root, _POOL, os.path.splitext(os.path.basename(archive_path))[0])
+
+    def _refill(self, archive_path: str):
+        pool_dir = self._pool_dir(archive_path)
+        try:
+            os.makedirs(pool_dir, exist_ok=True)
+            while len(os.listdir(pool_dir)) < self.pool_size:
+                # Extracted next to the pool and renamed in, so takers never see a partial tree
+                staging = tempfile.mkdtemp(dir=os.path.dirname(pool_dir))
+                with zipfile.ZipFile(archive_path) as zip_ref:
+                    zip_ref.extractall(staging)
+                os.rename(staging, os.path.join(pool_dir, uuid.uuid4().hex))
+        except OSError as e:
+            logger.warning("Could not refill the template pool %s: %s", pool_dir, e)
+        finally:
+            with self._lock:
+                self._refilling.discard(archive_path)
+
+    def _schedule_refill(self, archive_path: str):
+        with self._lock:
+            if archive_path in self._refilling:
+                return
+            self._refilling.add(archive_path)
+        threading.Thread(target=self._refill, args=(archive_path,), daemon=True).start()
+
+    def take_template(self, archive_path: str, base_dir: str, artifact_id: str):
+        """
+        Move an extracted copy of `archive_path` from the pool to `base_dir/artifact_id`,
+        and top the pool up in the background.
+
+        Returns:
+            str: The project path, or None when the pool had no copy ready.
+        """
+        if not self.pool_size:
+            return None
+        pool_dir = self._pool_dir(archive_path)
+        target = os.path.join(base_dir, artifact_id)
+        project_path = None
+        if os.path.isdir(pool_dir) and not os.path.exists(target):
+            for entry in sorted(os.listdir(pool_dir)):
+                try:
+                    os.makedirs(base_dir, exist_ok=True)
+                    os.rename(os.path.join(pool_dir, entry, artifact_id), target)
+                except OSError:
+                    # Taken by another thread, or on another file system
+                    continue
+                shutil.rmtree(os.path.join(pool_dir, entry), ignore_errors=True)
+                project_path = target
+                break
+        self._schedule_refill(archive_path)
+        return project_path
+
+
+@lru_cache(maxsize=1)
+def get_workspace_manager() -> WorkspaceManager:
+    return WorkspaceManager()
+
+
+def current_workspace(configurable: dict = None):
+    """
+    Workspace of the run the caller executes in: the configured one, else the thread's
+    managed workspace, or None outside of a thread when workspaces are disabled.
+
+    Args:
+        configurable (dict): Run settings to use instead of the current run config, e.g.
+            a callback's metadata.
+    """
+    if configurable is None:
+        configurable = ensure_config().get("configurable", {})
+    if configurable.get("workspace"):
+        return os.path.abspath(configurable["workspace"])
+    thread_id = configurable.get("thread_id")
+    if thread_id is None or not WORKSPACE_ROOT:
+        return None
+    return get_workspace_manager().acquire(str(thread_id))
+
+
+def resolve_path(path: str, configurable: dict = None, strict: bool = True) -> str:
+    """
+    Map a project path given by an agent into the run's workspace. Paths under the
+    default base directory are moved into the workspace, other relative paths are taken
+    relative to it.
+
+    Args:
+        strict (bool): Raise for paths outside the workspace. Otherwise (for reads) a path
+            is only mapped when the mapped file exists, so inputs such as PHP sources are
+            read where they are.
+
+    Raises:
+        PermissionError: If the path points outside the workspace.
+    """
+    workspace = current_workspace(configurable)
+    if workspace is None:
+        return path
+    absolute = os.path.abspath(path)
+    resolved = None
+    if is_within(workspace, absolute):
+        resolved = absolute
+    elif is_within(os.path.abspath(DEFAULT_BASE_DIR), absolute):
+        resolved = os.path.join(workspace, os.path.relpath(absolute, os.path.abspath(DEFAULT_BASE_DIR)))
+    elif not os.path.isabs(path):
+        resolved = os.path.join(workspace, path)
+    if resolved is not None and is_within(workspace, os.path.normpath(resolved)):
+        resolved = os.path.normpath(resolved)
+        if strict or os.path.exists(resolved):
+            return resolved
+    if not strict:
+        return path
+    raise PermissionError(f"{path} is outside the workspace of this run ({workspace})")
+
+
+def check_quota(writes: dict):
+    """
+    Raise WorkspaceQuotaError when writing `writes` (file path -> new size in bytes) would
+    take the managed workspace containing them over quota, see WorkspaceManager.check_quota.
+    """
+    if WORKSPACE_ROOT:
+        get_workspace_manager().check_quota(writes)
+
+
+def extract_project(archive_path: str, base_dir: str, artifact_id: str) -> str:
+    """Like extract_template, but moves a pooled copy of the template into place when one is ready."""
+    if WORKSPACE_ROOT:
+        project_path = get_workspace_manager().take_template(archive_path, base_dir, artifact_id)
+        if project_path is not None:
+            return project_path
+    return extract_template(archive_path, base_dir, artifact_id)
+
+
+def merge_workspace(workspace: str, target: str, files: list) -> list:
+    """
+    Copy the project tree a run generated in `workspace` into `target`. The files the run
+    wrote replace the ones in `target`, every other file (pom.xml, the application class)
+    is only copied when `target` doesn't have it yet. Build output and hidden files are
+    left out; merges run one at a time.
+
+    Args:
+        files (list): Paths the run wrote, in `workspace`.
+
+    Returns:
+        list: `files` mapped into `target` (paths outside `workspace` are kept as they are).
+    """
+    workspace, target = os.path.abspath(workspace), os.path.abspath(target)
+    written = {os.path.abspath(path) for path in files}
+    with _merge_lock:
+        for directory, subdirectories, names in os.walk(workspace):
+            subdirectories[:] = [
+                d for d in subdirectories if d not in _BUILD_OUTPUT and not d.startswith(".")
+            ]
+            for name in names:
+                if name.startswith(".") or name.endswith(".partial"):
+                    continue
+                source = os.path.join(directory, name)
+                destination = os.path.join(target, os.path.relpath(source, workspace))
+                if source in written or not os.path.exists(destination):
+                    os.makedirs(os.path.dirname(destination), exist_ok=True)
+                    shutil.copy2(source, destination)
+    return sorted(
+        os.path.join(target, os.path.relpath(path, workspace)) if is_within(workspace, path) else path
+        for path in written
+    )
@@ -0,0 +1,116 @@
+import operator
+import time
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import END, START, StateGraph
+
+from src.utils.checkpointer import MAX_DELTA_CHAIN, SqliteCheckpointSaver
+
+
+def _save_steps(saver, steps: int, thread_id: str = "thread"):
+    """Save one checkpoint per step, each adding a message; step 10 replaces the history."""
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    checkpoint = empty_checkpoint()
+    messages, saved = [], []
+    for step in range(steps):
+        # Like compact_messages, which replaces old messages with a summary
+        messages = ["summary"] if step == 10 else [*messages, f"message {step}"]
+        versions = {
+            channel: saver.get_next_version(checkpoint["channel_versions"].get(channel), None)
+            for channel in ("messages", "step")
+        }
+        checkpoint = {
+            **checkpoint,
+            "id": f"{step:08}",
+            "channel_values": {"messages": messages, "step": step},
+            "channel_versions": {**checkpoint["channel_versions"], **versions},
+        }
+        config = saver.put(config, checkpoint, {"step": step}, versions)
+        saved.append((config, list(messages)))
+    return saved
+
+
+def _chain_lengths(saver) -> list:
+    # Delta rows between each stored version of `messages` and its full copy
+    rows = dict(
+        saver._conn.execute(
+            "SELECT version, base_version FROM channel_blobs WHERE channel = 'messages'"
+        ).fetchall()
+    )
+    lengths = []
+    for version in rows:
+        length = 0
+        while rows[version] is not None:
+            version, length = rows[version], length + 1
+        lengths.append(length)
+    return lengths
+
+
+def test_messages_round_trip_over_more_deltas_than_a_chain_holds(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "checkpoints.sqlite"))
+
+    saved = _save_steps(saver, 3 * MAX_DELTA_CHAIN)
+
+    for config, messages in saved:
+        values = saver.get_tuple(config).checkpoint["channel_values"]
+        assert values["messages"] == messages
+    assert max(_chain_lengths(saver)) == MAX_DELTA_CHAIN
+    assert saver.get_tuple(saved[0][0]).checkpoint["channel_values"]["step"] == 0
+
+
+def test_checkpoints_reload_in_a_fresh_saver(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    saved = _save_steps(SqliteCheckpointSaver(path), MAX_DELTA_CHAIN + 5)
+
+    saver = SqliteCheckpointSaver(path)
+
+    latest = saver.get_tuple({"configurable": {"thread_id": "thread"}})
+    assert latest.config == saved[-1][0]
+    assert latest.checkpoint["channel_values"] == {"messages": saved[-1][1], "step": MAX_DELTA_CHAIN + 4}
+    assert [item.config for item in saver.list({"configurable": {"thread_id": "thread"}})] == [
+        config for config, _ in reversed(saved)
+    ]
+
+
+class _State(TypedDict):
+    log: Annotated[list, operator.add]
+
+
+def test_writes_of_finished_tasks_survive_a_failed_step(tmp_path):
+    calls = {"ok": 0, "flaky": 0}
+
+    def ok(state):
+        calls["ok"] += 1
+        return {"log": ["ok"]}
+
+    def flaky(state):
+        calls["flaky"] += 1
+        if calls["flaky"] == 1:
+            # Fails once the other task of the step has finished
+            time.sleep(0.2)
+            raise RuntimeError("flaky failed")
+        return {"log": ["flaky"]}
+
+    builder = StateGraph(_State)
+    builder.add_node("ok", ok)
+    builder.add_node("flaky", flaky)
+    builder.add_edge(START, "ok")
+    builder.add_edge(START, "flaky")
+    builder.add_edge("ok", END)
+    builder.add_edge("flaky", END)
+    path = str(tmp_path / "checkpoints.sqlite")
+    config = {"configurable": {"thread_id": "thread"}}
+
+    with pytest.raises(RuntimeError):
+        builder.compile(checkpointer=SqliteCheckpointSaver(path)).invoke({"log": []}, config)
+    pending = SqliteCheckpointSaver(path).get_tuple(config).pending_writes
+    assert ("log", ["ok"]) in [(channel, value) for _, channel, value in pending]
+
+    # Resumed from a fresh saver, only the failed task runs again
+    graph = builder.compile(checkpointer=SqliteCheckpointSaver(path))
+    result = graph.invoke(None, config)
+
+    assert sorted(result["log"]) == ["flaky", "ok"]
+    assert calls == {"ok": 1, "flaky": 2}
@@ -0,0 +1,37 @@
+import os
+
+from src.utils.common import atomic_write, code_only, is_within, line_number
+
+
+def test_code_only_blanks_comments_and_strings_per_language():
+    java = 'String s = "a // b"; // note\nchar c = \'}\'; /* x\n y */ int i;'
+    php = "$s = 'a\n# b'; # note\n$t = \"}\"; // end"
+
+    java_code, php_code = code_only(java, "java"), code_only(php, "php")
+
+    # Offsets and lines are kept
+    assert (len(java_code), len(php_code)) == (len(java), len(php))
+    assert (java_code.count("\n"), php_code.count("\n")) == (java.count("\n"), php.count("\n"))
+    assert java_code.split() == ["String", "s", "=", ";", "char", "c", "=", ";", "int", "i;"]
+    assert php_code.split() == ["$s", "=", ";", "$t", "=", ";"]
+    assert code_only(php, "php", strings=False).split() == ["$s", "=", "'a", "#", "b';", "$t", "=", '"}";']
+    assert line_number(java, java.index("int i")) == 3
+
+
+def test_atomic_write_keeps_the_mode_of_the_replaced_file(tmp_path):
+    path = str(tmp_path / "nested" / "mvnw")
+    atomic_write(path, "#!/bin/sh\n")
+    os.chmod(path, 0o755)
+
+    atomic_write(path, b"#!/bin/sh\necho\n")
+
+    with open(path, "rb") as file:
+        assert file.read() == b"#!/bin/sh\necho\n"
+    assert os.stat(path).st_mode & 0o777 == 0o755
+    assert os.listdir(os.path.dirname(path)) == ["mvnw"]
+
+
+def test_is_within():
+    assert is_within("/work/a", "/work/a/b.txt")
+    assert is_within("/work/a", "/work/a")
+    assert not is_within("/work/a", "/work/ab/b.txt")
@@ -0,0 +1,193 @@
+import os
+import stat
+import time
+
+from src.utils.java_validator import compile_errors
+
+SOURCES = {
+    "MyappApplication.java": """package com.example.myapp;
+
+public class MyappApplication {}
+""",
+    "repository/UserRepository.java": """package com.example.myapp.repository;
+
+import org.springframework.data.jpa.repository.JpaRepository;
+
+public interface UserRepository extends JpaRepository<Object, Long> {}
+""",
+    "service/UserService.java": """package com.example.myapp.service;
+
+import com.example.myapp.repository.UserRepository;
+
+public class UserService {
+    private UserRepository repository;
+
+    public Object all() {
+        return repository.findAll();
+    }
+}
+""",
+    "config/WebConfig.java": """package com.example.myapp.config;
+
+import org.springframework.web.servlet.config.annotation.*;
+
+public class WebConfig implements WebMvcConfigurer {
+    @Override
+    public void addCorsMappings(CorsRegistry registry) {}
+}
+""",
+    # With the Spring dependencies, javac still finds the misspelled package, the String
+    # assigned to an int, the unknown method and variable, and the @Override
+    "controller/BadController.java": """package com.example.myapp.controller;
+
+import org.springframework.web.bind.annotation.GetMapping;
+import org.springframework.web.bind.annotation.RestController;
+import com.example.myapp.modle.User;
+import com.example.myapp.service.UserService;
+
+@RestController
+public class BadController {
+    private UserService userService;
+
+    @GetMapping("/users")
+    public int users() {
+        int count = "many";
+        userService.missing();
+        return undefinedVariable;
+    }
+
+    @Override
+    public String name() {
+        return "bad";
+    }
+}
+""",
+}
+
+# What javac prints for these sources without the Spring jars on the classpath, per error
+JAVAC_ERRORS = [
+    """{java}/com/example/myapp/controller/BadController.java:3: error: package org.springframework.web.bind.annotation does not exist
+import org.springframework.web.bind.annotation.GetMapping;
+                                              ^
+""",
+    """{java}/com/example/myapp/controller/BadController.java:4: error: package org.springframework.web.bind.annotation does not exist
+import org.springframework.web.bind.annotation.RestController;
+                                              ^
+""",
+    """{java}/com/example/myapp/controller/BadController.java:5: error: package com.example.myapp.modle does not exist
+import com.example.myapp.modle.User;
+                              ^
+""",
+    """{java}/com/example/myapp/repository/UserRepository.java:3: error: package org.springframework.data.jpa.repository does not exist
+import org.springframework.data.jpa.repository.JpaRepository;
+                                              ^
+""",
+    """{java}/com/example/myapp/repository/UserRepository.java:5: error: cannot find symbol
+public interface UserRepository extends JpaRepository<Object, Long> {{}}
+                                        ^
+  symbol: class JpaRepository
+""",
+    """{java}/com/example/myapp/config/WebConfig.java:3: error: package org.springframework.web.servlet.config.annotation does not exist
+import org.springframework.web.servlet.config.annotation.*;
+^
+""",
+    """{java}/com/example/myapp/config/WebConfig.java:5: error: cannot find symbol
+public class WebConfig implements WebMvcConfigurer {{
+                                  ^
+  symbol: class WebMvcConfigurer
+""",
+    """{java}/com/example/myapp/config/WebConfig.java:7: error: cannot find symbol
+    public void addCorsMappings(CorsRegistry registry) {{}}
+                                ^
+  symbol:   class CorsRegistry
+  location: class WebConfig
+""",
+    """{java}/com/example/myapp/config/WebConfig.java:6: error: method does not override or implement a method from a supertype
+    @Override
+    ^
+""",
+    """{java}/com/example/myapp/controller/BadController.java:8: error: cannot find symbol
+@RestController
+ ^
+  symbol: class RestController
+""",
+    """{java}/com/example/myapp/controller/BadController.java:12: error: cannot find symbol
+    @GetMapping("/users")
+     ^
+  symbol:   class GetMapping
+  location: class BadController
+""",
+    """{java}/com/example/myapp/service/UserService.java:9: error: cannot find symbol
+        return repository.findAll();
+                         ^
+  symbol:   method findAll()
+  location: variable repository of type UserRepository
+""",
+    """{java}/com/example/myapp/controller/BadController.java:19: error: method does not override or implement a method from a supertype
+    @Override
+    ^
+""",
+    """{java}/com/example/myapp/controller/BadController.java:14: error: incompatible types: String cannot be converted to int
+        int count = "many";
+                    ^
+""",
+    """{java}/com/example/myapp/controller/BadController.java:15: error: cannot find symbol
+        userService.missing();
+                   ^
+  symbol:   method missing()
+  location: variable userService of type UserService
+""",
+    """{java}/com/example/myapp/controller/BadController.java:16: error: cannot find symbol
+        return undefinedVariable;
+               ^
+  symbol:   variable undefinedVariable
+  location: class BadController
+""",
+]
+
+
+def _project(tmp_path, monkeypatch, javac_errors):
+    """A project without a resolved classpath, and a javac printing `javac_errors`."""
+    java = tmp_path / "app" / "src" / "main" / "java"
+    for name, source in SOURCES.items():
+        path = java / "com" / "example" / "myapp" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+    (tmp_path / "app" / "pom.xml").write_text("<project/>")
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "javac.txt").write_text("".join(javac_errors).format(java=java))
+    javac = bin_dir / "javac"
+    javac.write_text('#!/bin/sh\ncat "$(dirname "$0")/javac.txt" >&2\nexit 1\n')
+    javac.chmod(javac.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return java / "com" / "example" / "myapp"
+
+
+def test_errors_in_the_code_are_reported_without_the_classpath(tmp_path, monkeypatch):
+    package = _project(tmp_path, monkeypatch, JAVAC_ERRORS)
+    paths = [str(package / name) for name in SOURCES]
+
+    compiled, errors = compile_errors(paths, time.monotonic() + 30)
+
+    assert compiled is False
+    reported = {(os.path.basename(error["file"]), int(error["line"]), error["message"]) for error in errors}
+    assert reported == {
+        ("BadController.java", 5, "package com.example.myapp.modle does not exist"),
+        ("BadController.java", 19, "method does not override or implement a method from a supertype"),
+        ("BadController.java", 14, "incompatible types: String cannot be converted to int"),
+        ("BadController.java", 15, "cannot find symbol"),
+        ("BadController.java", 16, "cannot find symbol"),
+    }
+    assert {error.get("symbol") for error in errors if error["message"] == "cannot find symbol"} == {
+        "method missing()",
+        "variable undefinedVariable",
+    }
+
+
+def test_errors_of_missing_dependencies_alone_are_ignored(tmp_path, monkeypatch):
+    javac_errors = [error for error in JAVAC_ERRORS if "BadController" not in error]
+    package = _project(tmp_path, monkeypatch, javac_errors)
+    paths = [str(package / name) for name in SOURCES if name != "controller/BadController.java"]
+
+    assert compile_errors(paths, time.monotonic() + 30) == (True, [])
@@ -0,0 +1,145 @@
+import asyncio
+import http.server
+import json
+import threading
+import time
+
+import httpx
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_openai import ChatOpenAI
+
+from src.utils.models import (
+    _AsyncDeadlineTransport,
+    _BufferedFallbacks,
+    _DeadlineTransport,
+    _fallback_errors,
+)
+
+
+class SlowCompletions(http.server.BaseHTTPRequestHandler):
+    """OpenAI chat completions endpoint streaming one token every 0.2 seconds."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i in range(20):
+                chunk = {
+                    "id": "slow",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": "slow",
+                    "choices": [{"index": 0, "delta": {"content": f"t{i} "}, "finish_reason": None}],
+                }
+                self._send(f"data: {json.dumps(chunk)}\n\n")
+                time.sleep(0.2)
+            self._send("data: [DONE]\n\n")
+            self._send("")
+        except OSError:
+            pass
+
+    def _send(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class Ok(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(handler):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def slow_server():
+    server = _serve(SlowCompletions)
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def ok_server():
+    server = _serve(Ok)
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def _slow_model(url):
+    return ChatOpenAI(
+        model_name="slow",
+        api_key="test",
+        base_url=url,
+        streaming=True,
+        timeout=1,
+        max_retries=0,
+        http_client=httpx.Client(transport=_DeadlineTransport()),
+        http_async_client=httpx.AsyncClient(transport=_AsyncDeadlineTransport()),
+    )
+
+
+def _tier(url):
+    fallback = GenericFakeChatModel(messages=iter([AIMessage(content="from the fallback")]))
+    return _BufferedFallbacks(
+        runnable=_slow_model(url), fallbacks=[fallback], exceptions_to_handle=_fallback_errors()
+    )
+
+
+def test_slow_streamed_response_is_cut_at_the_deadline(slow_server):
+    start = time.monotonic()
+    with pytest.raises(httpx.ReadTimeout):
+        _slow_model(slow_server).invoke("hi")
+    assert time.monotonic() - start < 2
+
+
+def test_response_cut_mid_stream_falls_back(slow_server):
+    chunks = list(_tier(slow_server).stream("hi"))
+
+    assert [chunk.content for chunk in chunks] == ["from the fallback"]
+
+
+def test_response_cut_mid_astream_falls_back(slow_server):
+    async def collect():
+        return [chunk async for chunk in _tier(slow_server).astream("hi")]
+
+    chunks = asyncio.run(collect())
+
+    assert [chunk.content for chunk in chunks] == ["from the fallback"]
+
+
+def test_each_event_loop_gets_its_own_pool_closed_with_the_loop(ok_server):
+    transport = _AsyncDeadlineTransport()
+    client = httpx.AsyncClient(transport=transport)
+
+    async def get():
+        response = await client.get(ok_server)
+        return response.text, await transport._pool()
+
+    first_text, first_pool = asyncio.run(get())
+    second_text, second_pool = asyncio.run(get())
+
+    assert first_text == second_text == "ok"
+    assert first_pool is not second_pool
+    assert first_pool._pool.connections == second_pool._pool.connections == []
@@ -0,0 +1,93 @@
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import tool
+
+from benchmarks.fakes import ScriptedChatModel
+from src.utils import nodes
+from src.utils.llm_cache import PersistentLLMCache
+
+
+class StreamingScriptedChatModel(ScriptedChatModel):
+    """ScriptedChatModel that also streams, like the provider models do."""
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._generate(messages, stop, run_manager, **kwargs).generations[0].message
+        chunk = AIMessageChunk(
+            content=message.content,
+            tool_call_chunks=[
+                {"name": call["name"], "args": "{}", "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ],
+        )
+        yield ChatGenerationChunk(message=chunk)
+
+
+@tool
+def ping() -> str:
+    """Answer pong."""
+    return "pong"
+
+
+def test_repeated_agent_run_is_served_from_the_cache(tmp_path, monkeypatch):
+    cache = PersistentLLMCache(str(tmp_path / "llm_cache.sqlite"))
+    model = StreamingScriptedChatModel(cache=cache)
+    monkeypatch.setattr(nodes, "get_model", lambda spec: model)
+    agent = nodes.create_agent("groq", "You are a tester.", [ping])
+    state = {"messages": [HumanMessage(content="Ping the server.")]}
+
+    first = agent.invoke(state)
+    second = agent.invoke(state)
+
+    # A tool call and the final answer, computed once and then read from the cache
+    assert model.calls == 2
+    assert cache.stats()["hits"] == 2
+    assert second["output"] == first["output"]
+    assert [a.tool for a, _ in second["intermediate_steps"]] == ["ping"]
+
+
+MEMBERS = ["Initialization", "Controller_Writer", "Testing"]
+
+
+def _stalled_state():
+    # Controller_Writer returned the same result twice in a row
+    result = {"name": "Controller_Writer", "output": "written", "tool_calls": []}
+    return {
+        "messages": [HumanMessage(content="Migrate the project.")],
+        "results": [
+            {"name": "Initialization", "output": "created", "tool_calls": [], "step": 1},
+            {**result, "step": 3},
+            {**result, "step": 5},
+        ],
+    }
+
+
+def _scripted_supervisor(monkeypatch, decisions):
+    seen = []
+
+    def decide(state):
+        seen.append(state["messages"])
+        return {"next": decisions[len(seen) - 1]}
+
+    monkeypatch.setattr(nodes, "_get_supervisor_chain", lambda spec: RunnableLambda(decide))
+    return seen
+
+
+def test_repeated_decision_goes_back_to_the_supervisor_with_a_loop_note(monkeypatch):
+    seen = _scripted_supervisor(monkeypatch, ["Controller_Writer", "Testing"])
+
+    update = nodes.supervisor_node(_stalled_state(), "groq", MEMBERS)
+
+    assert update["next"] == "Testing"
+    assert len(seen) == 2
+    assert seen[1][-1].content.startswith("Routing loop detected: Controller_Writer")
+    assert update["loop_steps_saved"] == 2
+
+
+def test_decision_repeating_again_finishes_the_run(monkeypatch):
+    _scripted_supervisor(monkeypatch, ["Controller_Writer", "Controller_Writer"])
+
+    update = nodes.supervisor_node(_stalled_state(), "groq", MEMBERS)
+
+    # Testing, the next member that has not run yet, is not forced on the supervisor
+    assert update["next"] == "FINISH"
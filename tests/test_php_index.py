@@ -0,0 +1,47 @@
+from langchain_core.runnables import RunnableLambda
+
+from src.utils import php_index
+from src.utils.php_index import get_php_index
+
+USERS = """<?php
+class UserController {
+    public function index() { return listUsers(); }
+}
+"""
+HELPERS = """<?php
+function listUsers() { return []; }
+"""
+
+
+def _project(tmp_path, monkeypatch, marker=True):
+    monkeypatch.setattr(php_index, "PHP_INDEX_DIR", str(tmp_path / "index"))
+    php_index._get_index.cache_clear()
+    root = tmp_path / "project"
+    (root / "controllers").mkdir(parents=True)
+    (root / "lib").mkdir()
+    (root / "controllers" / "UserController.php").write_text(USERS)
+    (root / "lib" / "helpers.php").write_text(HELPERS)
+    if marker:
+        (root / "composer.json").write_text("{}")
+    return root
+
+
+def test_index_of_a_file_is_rooted_at_its_project(tmp_path, monkeypatch):
+    root = _project(tmp_path, monkeypatch)
+
+    index = get_php_index(str(root / "controllers" / "UserController.php"))
+
+    assert index.root == str(root)
+    assert [symbol["file"] for symbol in index.find("listUsers")] == [str(root / "lib" / "helpers.php")]
+
+
+def test_index_of_a_file_is_rooted_at_the_runs_php_root(tmp_path, monkeypatch):
+    root = _project(tmp_path, monkeypatch, marker=False)
+    file_path = str(root / "controllers" / "UserController.php")
+
+    index = RunnableLambda(lambda _: get_php_index(file_path)).invoke(
+        None, {"configurable": {"php_root": str(root)}}
+    )
+
+    assert index.root == str(root)
+    assert index.callers("listUsers")[0]["name"] == "UserController::index"
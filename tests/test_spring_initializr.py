@@ -0,0 +1,26 @@
+from src.utils.spring_initializr import initializr_params, template_path
+
+PARAMS = initializr_params(
+    group_id="com.example",
+    artifact_id="myapp",
+    name="MyApp",
+    description="Migrated application",
+    package_name="com.example.myapp",
+    dependencies="web,data-jpa",
+    java_version="17",
+    type="maven-project",
+    language="java",
+    boot_version="3.3.3",
+    packaging="jar",
+)
+
+
+def test_templates_of_different_servers_are_cached_apart(tmp_path):
+    real = template_path(PARAMS, "https://start.spring.io/starter.zip", str(tmp_path))
+    stand_in = template_path(PARAMS, "http://127.0.0.1:8765/starter.zip", str(tmp_path))
+
+    assert real != stand_in
+    # Parameter order doesn't matter
+    reordered = dict(reversed(list(PARAMS.items())))
+    assert template_path(reordered, "https://start.spring.io/starter.zip", str(tmp_path)) == real
+
@@ -0,0 +1,47 @@
+import re
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.utils import state
+from src.utils.artifacts import ArtifactStore, is_handle
+from src.utils.state import compact_messages
+
+
+def _bulky(label: str) -> str:
+    # Well over BULKY_MESSAGE_TOKENS
+    return "\n".join(f"{label} line {i} " + "x" * 40 for i in range(200))
+
+
+def test_task_and_recent_messages_survive_the_budget(monkeypatch):
+    monkeypatch.setattr(state, "MESSAGE_TOKEN_BUDGET", 50)
+    history = [HumanMessage(content="Migrate the PHP project.")]
+    history += [AIMessage(content=f"step {i} " + "y" * 100) for i in range(10)]
+
+    compacted = compact_messages(history[:6], history[6:])
+
+    assert compacted[0] == history[0]
+    assert compacted[-state.KEEP_RECENT_MESSAGES:] == history[-state.KEEP_RECENT_MESSAGES:]
+    assert len(compacted) == 1 + state.KEEP_RECENT_MESSAGES
+
+
+def test_bulky_messages_collapse_to_artifact_handles(tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path))
+    monkeypatch.setattr(state, "get_artifact_store", lambda: store)
+    history = [
+        HumanMessage(content=_bulky("task")),
+        HumanMessage(content=_bulky("php"), name="Code_converter"),
+        AIMessage(content="done"),
+        HumanMessage(content=_bulky("java"), name="Controller_Writer"),
+    ]
+
+    compacted = compact_messages(history[:2], history[2:])
+
+    # The task and the recent messages are kept as they are
+    assert compacted[0] == history[0]
+    assert compacted[2:] == history[2:]
+    collapsed = compacted[1]
+    assert collapsed.name == "Code_converter"
+    handle = re.search(r"artifact:[0-9a-f]+", collapsed.content).group(0)
+    assert is_handle(handle)
+    assert store.get(handle) == history[1].content
+    assert len(collapsed.content) < len(history[1].content) // 10
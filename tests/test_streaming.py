@@ -0,0 +1,64 @@
+import json
+import os
+import uuid
+
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+from src.utils import streaming
+from src.utils.streaming import StreamingFileWriter, partial_path, streamed_partial
+from src.utils.workspace import WorkspaceManager
+
+
+def _stream_tool_call(writer, name, args, size=7):
+    """Feed the JSON arguments of one tool call to `writer` in `size` character chunks."""
+    run_id = uuid.uuid4()
+    writer.on_chat_model_start(None, [], run_id=run_id, metadata={"ls_provider": "openai"})
+    text = json.dumps(args)
+    for start in range(0, len(text), size):
+        tool_call_chunk = {"args": text[start : start + size], "index": 0}
+        if start == 0:
+            tool_call_chunk.update(name=name, id="call_1")
+        chunk = ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[tool_call_chunk]))
+        writer.on_llm_new_token("", chunk=chunk, run_id=run_id)
+    writer.on_llm_end(None, run_id=run_id)
+
+
+def test_write_java_files_arguments_are_streamed_per_file(tmp_path):
+    files = {
+        str(tmp_path / "controller" / "A.java"): 'class A {\n  String s = "\\"x\\" é";\n}\n',
+        str(tmp_path / "service" / "B.java"): "class B {}\n",
+    }
+    writer = StreamingFileWriter("write_java_files", files_key="files")
+
+    _stream_tool_call(writer, "write_java_files", {"files": files})
+
+    for path, content in files.items():
+        with open(partial_path(path), encoding="utf-8") as file:
+            assert file.read() == content
+        assert streamed_partial(path, content) == partial_path(path)
+
+
+def test_streamed_partial_with_other_content_is_discarded(tmp_path):
+    path = str(tmp_path / "A.java")
+    writer = StreamingFileWriter("write_controller_code")
+
+    _stream_tool_call(writer, "write_controller_code", {"file_path": path, "java_code": "class A {}"})
+
+    assert streamed_partial(path, "class B {}") is None
+    assert not os.path.exists(partial_path(path))
+
+
+def test_partial_files_count_towards_the_workspace_quota(tmp_path, monkeypatch):
+    manager = WorkspaceManager(str(tmp_path), max_bytes=100, pool_size=0)
+    workspace = manager.acquire("thread")
+    monkeypatch.setattr(streaming, "check_quota", manager.check_quota)
+    small = os.path.join(workspace, "Small.java")
+    large = os.path.join(workspace, "Large.java")
+    writer = StreamingFileWriter("write_java_files", files_key="files")
+
+    _stream_tool_call(writer, "write_java_files", {"files": {small: "class S {}", large: "x" * 500}})
+
+    assert streamed_partial(small, "class S {}") == partial_path(small)
+    assert not os.path.exists(partial_path(large))
+    assert streamed_partial(large, "x" * 500) is None
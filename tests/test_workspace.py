@@ -0,0 +1,63 @@
+import os
+import time
+
+import pytest
+
+from src.utils.workspace import WorkspaceManager, WorkspaceQuotaError
+
+
+def _age(manager, thread_id, seconds):
+    path = os.path.join(manager.path(thread_id), ".last_used")
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_least_recently_used_idle_workspace_makes_room(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), max_active=2, idle_seconds=60, pool_size=0)
+    manager.acquire("old")
+    manager.acquire("recent")
+    _age(manager, "old", 120)
+    _age(manager, "recent", 90)
+
+    manager.acquire("new")
+
+    assert not os.path.exists(manager.path("old"))
+    assert os.path.isdir(manager.path("recent"))
+    assert os.path.isdir(manager.path("new"))
+
+
+def test_busy_workspaces_are_not_evicted(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), max_active=1, idle_seconds=60, pool_size=0)
+    manager.acquire("busy")
+
+    with pytest.raises(WorkspaceQuotaError):
+        manager.acquire("new")
+    assert os.path.isdir(manager.path("busy"))
+
+
+def test_expired_workspaces_are_removed_on_acquire(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), ttl_seconds=60, pool_size=0)
+    manager.acquire("expired")
+    _age(manager, "expired", 120)
+    manager._last_cleanup = 0.0
+
+    manager.acquire("other")
+
+    assert not os.path.exists(manager.path("expired"))
+
+
+def test_quota_counts_writes_but_not_build_output(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), max_bytes=1000, pool_size=0)
+    workspace = manager.acquire("thread")
+    os.makedirs(os.path.join(workspace, "app", "target"))
+    with open(os.path.join(workspace, "app", "target", "app.jar"), "wb") as file:
+        file.write(b"x" * 5000)
+    source = os.path.join(workspace, "app", "Main.java")
+
+    manager.check_quota({source: 600})
+    with open(source, "w") as file:
+        file.write("x" * 600)
+    # Replacing the file only adds the difference
+    manager.check_quota({source: 900})
+    with pytest.raises(WorkspaceQuotaError):
+        manager.check_quota({source: 900, os.path.join(workspace, "app", "Other.java"): 200})